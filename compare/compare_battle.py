@@ -1,17 +1,23 @@
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Set, Tuple
+
+from compare.hero_actions import HeroActionOutcome, predict_hero_actions, predict_attack_queues, list_hero_actions, \
+    ActionFilter, ExecuteQueue, PruningStats
+from compare.speculation import speculator, Speculation
+from constants import RUN_STATS
 
 from data.mappers import pickup_name_mapper
-from data.other_enums import GamePhase
+from data.other_enums import GamePhase, TurnVerdict
 from data.room.room_enums import PickupEnum
 from data.skill.skill_enums import SkillEnum
-from data.snapshot.permutate_queues import permutate_possible_attack_queues
+from data.snapshot.fingerprint import PredictionIndex, get_fingerprint
 from data.snapshot.prediction_error import PredictionError
 from data.snapshot.predictions import Predictions
 from data.snapshot.simulation import Simulation
 from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_log import undo_log, get_undo_sections, get_mutable_containers, dump_state
 from data.snapshot.validate_simulation import is_good_prediction
-from data.weapon.weapon import Weapon
 from history.history import History
+from history.potions.potion_simulation import PotionSimulation
 from logger import logger
 
 
@@ -77,23 +83,30 @@ def battle_finished(previous_snapshot: Snapshot) -> History:
 
 class SimulationResults:
     all_answers: List[str]
-    non_execute_answers: int
+    non_execute_states: Set[Tuple[Optional[str], str]]  # potions description and resulting state of such answers
     victory: bool
     new_history: Optional[History]
     guesses: List[Dict[int, PickupEnum]]
+    pruning: PruningStats
 
     def __init__(self,
                  all_answers: List[str] = None,
-                 non_execute_answers: int = 0,
+                 non_execute_states: Set[Tuple[Optional[str], str]] = None,
                  victory: bool = False,
                  new_history: Optional[History] = None,
                  guesses: List[Dict[int, PickupEnum]] = None,
                  ):
         self.all_answers = all_answers or []
-        self.non_execute_answers = non_execute_answers
+        self.non_execute_states = non_execute_states or set()
         self.victory = victory
         self.new_history = new_history
         self.guesses = guesses or []
+        self.pruning = PruningStats()
+
+    @property
+    def non_execute_answers(self) -> int:
+        # Executions don't count: the orders of a queue often end the same. Other answers ending the same count once.
+        return len(self.non_execute_states)
 
     def add(self, others: List):
         for other in others:
@@ -103,19 +116,23 @@ class SimulationResults:
                 self.all_answers.extend(other.all_answers)
             if len(other.guesses):
                 self.guesses.extend(other.guesses)
-            self.non_execute_answers += other.non_execute_answers
+            self.non_execute_states.update(other.non_execute_states)
             if other.victory:
                 self.victory = True
             if self.new_history is None and other.new_history is not None:
                 self.new_history = other.new_history
+            self.pruning.add(other.pruning)
 
 
-def test_simulation(simulation: Optional[Simulation], new_snapshot: Snapshot,
-                    previous_hero_cell: int, name: str, description: str,
-                    potions_description: Optional[str]) -> List[SimulationResults]:
+def test_simulation(outcome: HeroActionOutcome, new_snapshot: Snapshot, potions_description: Optional[str],
+                    candidates: Optional[Set[int]] = None) -> List[SimulationResults]:
+    logger.queue_messages(outcome.messages)
+    name = outcome.name
+    description = outcome.description
+    simulation = outcome.simulation
     if simulation is None:
-        logger.queue_debug_error(f'Simulation "{name}": impossible')
-        logger.queue_debug_error(f"{potions_description}")
+        logger.queue_debug_error(lambda: f'Simulation "{name}": impossible')
+        logger.queue_debug_error(lambda: f"{potions_description}")
         logger.queue_debug_error("")
         return []
 
@@ -124,9 +141,7 @@ def test_simulation(simulation: Optional[Simulation], new_snapshot: Snapshot,
         full_description = potions_description + '; ' + description
     else:
         full_description = description
-    enemy_attack_order = simulation.simulate_enemies(
-        previous_hero_cell=previous_hero_cell,
-    )
+    enemy_attack_order = outcome.enemy_attack_order
     results = []
     for order_name, simulated_order in enemy_attack_order.items():
         simulated_order_name = "" if len(enemy_attack_order) == 1 else f" (order_name)"
@@ -141,30 +156,42 @@ def test_simulation(simulation: Optional[Simulation], new_snapshot: Snapshot,
                     guesses=[simulation.predictions.potion_simulation.guesses],
                 ))
                 continue
+        if candidates is not None and id(simulated_order) not in candidates:
+            logger.queue_debug_warn(lambda: f'Simulation "{name}"{simulated_order_name}: wrong (fingerprint)')
+            logger.queue_debug_success("")
+            continue
         try:
             result = is_good_prediction(new_snapshot, simulated_order)
             if result:
-                logger.queue_debug_success(f'Simulation "{name}"{simulated_order_name}: correct!')
+                logger.queue_debug_success(lambda: f'Simulation "{name}"{simulated_order_name}: correct!')
             else:
-                logger.queue_debug_warn(f'Simulation "{name}"{simulated_order_name}: wrong')
+                logger.queue_debug_warn(lambda: f'Simulation "{name}"{simulated_order_name}: wrong')
             logger.queue_debug_success("")
+            non_execute_states = None
+            if result and not isinstance(outcome.hero_action, ExecuteQueue):
+                non_execute_states = {(potions_description, repr(dump_state(get_undo_sections(simulated_order))))}
             results.append(SimulationResults(
                 all_answers=[full_description] if result else None,
-                non_execute_answers=0 if name.startswith("execute") or not result else 1,
+                non_execute_states=non_execute_states,
                 new_history=simulated_order.history if result else None,
                 guesses=[simulation.predictions.potion_simulation.guesses] if result else None,
             ))
             continue
         except PredictionError as error:
-            logger.queue_debug_error(f'Simulation "{name}{simulated_order_name}" error: {error}')
+            logger.queue_debug_error(lambda: f'Simulation "{name}{simulated_order_name}" error: {error}')
             logger.queue_debug_error("")
 
     return results
 
 
 def battle_update(previous_snapshot: Snapshot, new_snapshot: Snapshot) -> History:
-    if previous_snapshot.game_stats.turns == new_snapshot.game_stats.turns:
+    # Wait for the background simulations before anything touches the previous snapshot.
+    speculation = speculator.take(previous_snapshot)
+    # The run stats hold the turn count, unchanged they need no decoding to tell the turn has not passed.
+    unchanged_stats = new_snapshot.payload is not None and not new_snapshot.payload.has_changed(RUN_STATS)
+    if unchanged_stats or previous_snapshot.game_stats.turns == new_snapshot.game_stats.turns:
         # TODO still unclear why this happens
+        new_snapshot.verdict = TurnVerdict.SKIPPED
         return previous_snapshot.history
 
     # WHAT TIME IS IT
@@ -193,17 +220,7 @@ def battle_update(previous_snapshot: Snapshot, new_snapshot: Snapshot) -> Histor
     # logger.debug_text(f"BOARD SIZE: {new_snapshot.room.board_size}")
     # logger.detail_text("")
 
-    # Account for switching the queue order.
-    permutated_attack_queues = permutate_possible_attack_queues(
-        attack_queue=previous_snapshot.room.hero.attack_queue,
-        hero_deck=previous_snapshot.hero_deck
-    )
-    current_attack_queue = previous_snapshot.room.hero.attack_queue[:]
-    possible_attack_queues = [current_attack_queue]
-    for perm in permutated_attack_queues:
-        if not Weapon.is_list_equal(current_attack_queue, perm):
-            possible_attack_queues.append(perm)
-    predictions = Predictions(potential_hero_attack_queues=possible_attack_queues)
+    predictions = predict_attack_queues(previous_snapshot)
 
     # Learn as much as possible about potions. 
     potion_simulations = previous_snapshot.history.potions.potion_update(
@@ -212,30 +229,36 @@ def battle_update(previous_snapshot: Snapshot, new_snapshot: Snapshot) -> Histor
         selling_allowed=previous_snapshot.skills.has_skill(SkillEnum.ROGUE_RETAIL)
     )
 
-    # Begin simulations.
-    results = SimulationResults()
-    for potion_simulation in potion_simulations:
-        # Simulate potions.
-        initial_simulation = Simulation.of(previous_snapshot)
-        initial_simulation.apply_potion_simulation(potion_simulation)
-        initial_simulation.hero_potion_ids = new_snapshot.hero_potion_ids[:]
-        initial_predictions = predictions.clone()
-        initial_predictions.potion_simulation = potion_simulation
-
-        # Simulate possible hero actions.
-        new_results = simulate_hero_actions(initial_simulation, new_snapshot, predictions)
-        results.add([new_results])
+    # Begin simulations. Their messages are only shown when the turn is not solved, so they are not even made
+    # the first time around.
+    with logger.muted():
+        results = simulate_potion_scenarios(previous_snapshot, new_snapshot, predictions, potion_simulations,
+                                            speculation, use_index=True)
+    if not len(results.all_answers):
+        # Either the turn is unexplained or the fingerprint or the action filter lacks a tolerance; recheck every
+        # hero action the slow way. This also brings back the detailed debug output of every simulation.
+        logger.clear_queue()
+        logger.queue_debug_warn("No fingerprint matched, comparing every simulation")
+        results = simulate_potion_scenarios(previous_snapshot, new_snapshot, predictions, potion_simulations,
+                                            None, use_index=False)
+    elif not results.victory and results.non_execute_answers > 1:
+        # Same again with every hero action, to have the messages of the ambiguous turn.
+        results = simulate_potion_scenarios(previous_snapshot, new_snapshot, predictions, potion_simulations,
+                                            None, use_index=False)
 
     if not results.victory and results.non_execute_answers > 1:
+        new_snapshot.verdict = TurnVerdict.AMBIGUOUS
         logger.execute_queue()
         logger.debug_error("More than one scenario found to be correct!")
         for answer in results.all_answers:
             logger.detail_text(answer)
     elif not len(results.all_answers):
+        new_snapshot.verdict = TurnVerdict.NOT_FOUND
         logger.execute_queue()
         logger.debug_error("Correct scenario has not been found :(")
     else:
         logger.clear_queue()
+        new_snapshot.verdict = TurnVerdict.VICTORY if results.victory else TurnVerdict.SOLVED
         if results.victory:
             if len(results.all_answers) > 1:
                 logger.debug_success(f"Battle won! Possible paths to victory: {len(results.all_answers)}")
@@ -245,262 +268,168 @@ def battle_update(previous_snapshot: Snapshot, new_snapshot: Snapshot) -> Histor
             logger.detail_text(results.all_answers[0])
 
     logger.debug_info(f"Potion simulations: {len(potion_simulations)}")
+    if results.pruning.considered:
+        logger.debug_info(results.pruning.pretty_print())
     if results.new_history is not None:
         results.new_history.potions.confirmed_guesses(results.guesses)
     return results.new_history or previous_snapshot.history
 
 
-def simulate_hero_actions(initial_simulation: Simulation, new_snapshot: Snapshot,
-                          predictions: Predictions) -> SimulationResults:
+def simulate_potion_scenarios(previous_snapshot: Snapshot, new_snapshot: Snapshot, predictions: Predictions,
+                              potion_simulations: List[PotionSimulation], speculation: Optional[Speculation],
+                              use_index: bool) -> SimulationResults:
     results = SimulationResults()
-    turn_around_is_free = new_snapshot.skills.has_skill(SkillEnum.TWO_FACED_DANGER)
-    previous_hero_cell = initial_simulation.room.hero.position.cell
-    potions_description = predictions.potion_simulation.potion_description
-
-    name = "move right"
-    description = "Hero has moved right"
-    logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-    simulation = Simulation.simulation_move_right(initial_simulation, predictions)
-    results.add(test_simulation(
-        simulation=simulation,
-        new_snapshot=new_snapshot,
-        previous_hero_cell=previous_hero_cell,
-        name=name,
-        description=description,
-        potions_description=potions_description,
-    ))
-
-    if turn_around_is_free:
-        name = "turn and move right"
-        description = "Hero has turned moved right"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_move_right(initial_simulation, predictions)
-        if simulation is not None:
-            simulation.room.hero.position.flip()
-            simulation.game_stats.turn_arounds += 1
-        results.add(test_simulation(
-            simulation=simulation,
-            new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
-            potions_description=potions_description,
-        ))
+    for potion_simulation in potion_simulations:
+        initial_predictions = predictions.clone()
+        initial_predictions.potion_simulation = potion_simulation
 
-    name = "move left"
-    description = "Hero has moved left"
-    logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-    simulation = Simulation.simulation_move_left(initial_simulation, predictions)
-    results.add(test_simulation(
-        simulation=simulation,
-        new_snapshot=new_snapshot,
-        previous_hero_cell=previous_hero_cell,
-        name=name,
-        description=description,
-        potions_description=potions_description,
-    ))
-
-    if turn_around_is_free:
-        name = "turn and move left"
-        description = "Hero has turned moved left"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_move_left(initial_simulation, predictions)
-        if simulation is not None:
-            simulation.room.hero.position.flip()
-            simulation.game_stats.turn_arounds += 1
-        results.add(test_simulation(
-            simulation=simulation,
-            new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
-            potions_description=potions_description,
-        ))
 
-    if turn_around_is_free:
-        name = "turn around twice"
-        description = "Hero has turned around twice (or more)"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_idle(initial_simulation, predictions)
-        simulation.room.hero.state.curse = True
-        simulation.predictions.allow_more_turn_arounds = True
-        results.add(test_simulation(
-            simulation=simulation,
-            new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
-            potions_description=potions_description,
-        ))
+        # Simulate possible hero actions, unless that was already done while waiting for this save.
+        outcomes = None
+        if speculation is not None and speculation.matches(new_snapshot, potion_simulation):
+            speculator.record_use(speculation)
+            outcomes = speculation.take()
+        if outcomes is None and undo_log.enabled:
+            if undo_log.differential_check:
+                new_results = check_in_place(previous_snapshot, new_snapshot, predictions, potion_simulation,
+                                             use_index)
+            else:
+                initial_simulation = get_initial_simulation(previous_snapshot, new_snapshot, potion_simulation)
+                new_results = simulate_hero_actions_in_place(initial_simulation, new_snapshot, predictions, use_index)
+        else:
+            initial_simulation = get_initial_simulation(previous_snapshot, new_snapshot, potion_simulation)
+            new_results = simulate_hero_actions(initial_simulation, new_snapshot, predictions, outcomes, use_index)
+        results.add([new_results])
+    return results
 
-        name = "turn around thrice"
-        description = "Hero has turned around thrice (or more)"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_idle(initial_simulation, predictions)
-        simulation.room.hero.state.curse = True
-        simulation.room.hero.position.flip()
-        simulation.predictions.allow_more_turn_arounds = True
-        results.add(test_simulation(
-            simulation=simulation,
-            new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
-            potions_description=potions_description,
-        ))
-    else:
-        name = "turn around"
-        description = "Hero has turned around"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_turn_around(initial_simulation, predictions)
-        results.add(test_simulation(
-            simulation=simulation,
-            new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
-            potions_description=potions_description,
-        ))
 
-    name = "wait"
-    description = "Hero has waited a turn"
-    logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-    simulation = Simulation.simulation_wait(initial_simulation, predictions)
-    results.add(test_simulation(
-        simulation=simulation,
-        new_snapshot=new_snapshot,
-        previous_hero_cell=previous_hero_cell,
-        name=name,
-        description=description,
-        potions_description=potions_description,
-    ))
-
-    if turn_around_is_free:
-        name = "turn and wait"
-        description = "Hero has turned and waited a turn"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_wait(initial_simulation, predictions)
-        simulation.room.hero.position.flip()
-        simulation.game_stats.turn_arounds += 1
+def get_initial_simulation(previous_snapshot: Snapshot, new_snapshot: Snapshot,
+                           potion_simulation: PotionSimulation) -> Simulation:
+    # Simulate potions.
+    initial_simulation = Simulation.of(previous_snapshot)
+    initial_simulation.apply_potion_simulation(potion_simulation)
+    initial_simulation.hero_potion_ids = new_snapshot.hero_potion_ids[:]
+    return initial_simulation
+
+
+def simulate_hero_actions(initial_simulation: Simulation, new_snapshot: Snapshot, predictions: Predictions,
+                          outcomes: Optional[List[HeroActionOutcome]] = None,
+                          use_index: bool = False) -> SimulationResults:
+    action_filter = None
+    if outcomes is None:
+        turn_around_is_free = new_snapshot.skills.has_skill(SkillEnum.TWO_FACED_DANGER)
+        if use_index:
+            action_filter = ActionFilter(initial_simulation, new_snapshot, predictions)
+        outcomes = predict_hero_actions(initial_simulation, predictions, turn_around_is_free, action_filter)
+    candidates = None
+    if use_index:
+        # Only the outcomes with the same fingerprint as the new save get compared in full.
+        index = PredictionIndex()
+        for outcome in outcomes:
+            for simulated_order in (outcome.enemy_attack_order or {}).values():
+                index.add(simulated_order)
+        candidates = {id(simulated_order) for simulated_order in index.candidates(new_snapshot)}
+    potions_description = predictions.potion_simulation.potion_description
+    results = SimulationResults()
+    for outcome in outcomes:
         results.add(test_simulation(
-            simulation=simulation,
+            outcome=outcome,
             new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
             potions_description=potions_description,
+            candidates=candidates,
         ))
+    if action_filter is not None:
+        results.pruning.add(action_filter.stats)
+    return results
 
-    name = "sig. move"
-    description = "Hero has executed their signature move"
-    logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-    simulation = Simulation.simulation_signature_move(initial_simulation, predictions)
-    results.add(test_simulation(
-        simulation=simulation,
-        new_snapshot=new_snapshot,
-        previous_hero_cell=previous_hero_cell,
-        name=name,
-        description=description,
-        potions_description=potions_description,
-    ))
-
-    if turn_around_is_free:
-        name = "turn + sig. move"
-        description = "Hero has turned and executed their signature move"
-        logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-        simulation = Simulation.simulation_turn_and_signature_move(initial_simulation, predictions)
-        results.add(test_simulation(
-            simulation=simulation,
-            new_snapshot=new_snapshot,
-            previous_hero_cell=previous_hero_cell,
-            name=name,
-            description=description,
-            potions_description=potions_description,
-        ))
 
-    for weapon in initial_simulation.hero_deck:
-        # Immediates are handled elsewhere.
-        if weapon.is_immediate():
-            continue
-        is_in_queue = 0
-        number_copies = 0
-        for potential in initial_simulation.hero_deck:
-            if weapon.cooldown_charge == weapon.cooldown and potential.is_equal(weapon):
-                number_copies += 1
-        for potential in initial_simulation.room.hero.attack_queue:
-            if potential.is_equal(weapon):
-                is_in_queue += 1
-        if is_in_queue < number_copies:
-            name = f"add {weapon.debug_print()}"
-            description = f"Hero has added {weapon.pretty_print()} to the queue"
-            logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-            simulation = Simulation.simulation_adding_weapon_to_queue(initial_simulation, weapon.clone())
-            results.add(test_simulation(
-                simulation=simulation,
+def simulate_hero_actions_in_place(initial_simulation: Simulation, new_snapshot: Snapshot, predictions: Predictions,
+                                   use_index: bool = False) -> SimulationResults:
+    """
+    Same as simulate_hero_actions, except that no simulation gets its own copy of the state:
+    every hero action changes the initial simulation and gets rolled back once compared.
+    """
+    if initial_simulation.frozen:
+        raise ValueError("Initial simulation is already shared with other simulations")
+    # The rollbacks must not reach the previous snapshot.
+    get_undo_sections(initial_simulation)
+    turn_around_is_free = new_snapshot.skills.has_skill(SkillEnum.TWO_FACED_DANGER)
+    previous_hero_cell = initial_simulation.room.hero.position.cell
+    potions_description = predictions.potion_simulation.potion_description
+    fingerprint = get_fingerprint(new_snapshot) if use_index else None
+    action_filter = ActionFilter(initial_simulation, new_snapshot, predictions) if use_index else None
+    results = SimulationResults()
+    undo_log.start()
+    try:
+        hero_actions = list_hero_actions(initial_simulation, predictions, turn_around_is_free, action_filter)
+        while True:
+            undo_log.checkpoint(get_mutable_containers(initial_simulation))
+            try:
+                hero_action, simulation = next(hero_actions)
+            except StopIteration:
+                break
+            enemy_attack_order = None
+            candidates = None
+            if simulation is not None:
+                enemy_attack_order = simulation.simulate_enemies(previous_hero_cell=previous_hero_cell)
+                if use_index:
+                    candidates = {
+                        id(simulated_order) for simulated_order in enemy_attack_order.values()
+                        if get_fingerprint(simulated_order) == fingerprint
+                    }
+            new_results = test_simulation(
+                outcome=HeroActionOutcome(hero_action, simulation, enemy_attack_order, []),
                 new_snapshot=new_snapshot,
-                previous_hero_cell=previous_hero_cell,
-                name=name,
-                description=description,
                 potions_description=potions_description,
-            ))
-
-            if turn_around_is_free:
-                name = f"turn + add {weapon.debug_print()}"
-                description = f"Hero has turned and added {weapon.pretty_print()} to the queue"
-                logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-                simulation = Simulation.simulation_adding_weapon_to_queue(initial_simulation, weapon.clone())
-                simulation.room.hero.position.flip()
-                simulation.game_stats.turn_arounds += 1
-                results.add(test_simulation(
-                    simulation=simulation,
-                    new_snapshot=new_snapshot,
-                    previous_hero_cell=previous_hero_cell,
-                    name=name,
-                    description=description,
-                    potions_description=potions_description,
-                ))
-
-    for attack_queue in [predictions.potential_hero_attack_queues[0]]:
-        # possible_attack_queues: TODO uncomment, for now one only
-        if len(attack_queue):
-            name = f"execute {Weapon.short_print_list(attack_queue)}"
-            description = f"Hero has executed the queue: {Weapon.short_print_list(attack_queue)}"
-            logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-            simulation = Simulation.simulation_execute_queue(
-                snapshot=initial_simulation,
-                attack_queue=attack_queue,
-                previous_hero_cell=previous_hero_cell,
+                candidates=candidates,
             )
-            results.add(test_simulation(
-                simulation=simulation,
-                new_snapshot=new_snapshot,
-                previous_hero_cell=previous_hero_cell,
-                name=name,
-                description=description,
-                potions_description=potions_description,
-            ))
+            for new_result in new_results:
+                if new_result.new_history is not None:
+                    # Keep what the rollback is about to undo.
+                    new_result.new_history = new_result.new_history.clone(initial_simulation.parent)
+            results.add(new_results)
+            undo_log.rollback()
+    finally:
+        undo_log.stop()
+    if action_filter is not None:
+        results.pruning.add(action_filter.stats)
+    return results
 
-            if turn_around_is_free:
-                name = f"turn + execute {Weapon.short_print_list(attack_queue)}"
-                description = f"Hero has turned and executed the queue: {Weapon.short_print_list(attack_queue)}"
-                logger.queue_debug_info(f'Start simulation {potions_description}:"{name}"')
-                simulation = Simulation.simulation_turn_and_execute_queue(
-                    snapshot=initial_simulation,
-                    attack_queue=attack_queue,
-                    previous_hero_cell=previous_hero_cell,
-                )
-                results.add(test_simulation(
-                    simulation=simulation,
-                    new_snapshot=new_snapshot,
-                    previous_hero_cell=previous_hero_cell,
-                    name=name,
-                    description=description,
-                    potions_description=potions_description,
-                ))
 
+def check_in_place(previous_snapshot: Snapshot, new_snapshot: Snapshot, predictions: Predictions,
+                   potion_simulation: PotionSimulation, use_index: bool) -> SimulationResults:
+    """
+    Simulate the hero actions both in place and with clones, and report any difference.
+    The results of the clones are the ones used.
+    """
+    initial_simulation = get_initial_simulation(previous_snapshot, new_snapshot, potion_simulation)
+    state_before = dump_state(get_undo_sections(initial_simulation))
+    queue = logger.queue
+    logger.queue = []
+    try:
+        in_place_results = simulate_hero_actions_in_place(initial_simulation, new_snapshot, predictions, use_index)
+    finally:
+        logger.queue = queue
+    state_after = dump_state(get_undo_sections(initial_simulation))
+    initial_simulation = get_initial_simulation(previous_snapshot, new_snapshot, potion_simulation)
+    results = simulate_hero_actions(initial_simulation, new_snapshot, predictions, None, use_index)
+
+    undo_log.checks += 1
+    if state_before != state_after:
+        undo_log.mismatches += 1
+        logger.debug_error(f"Undo log: rollback did not restore the state ({potion_simulation.potion_description})")
+    elif get_results_summary(in_place_results) != get_results_summary(results):
+        undo_log.mismatches += 1
+        logger.debug_error(f"Undo log: in place simulation differs ({potion_simulation.potion_description})")
+        logger.debug_error(f"in place: {in_place_results.all_answers}, with clones: {results.all_answers}")
     return results
 
 
+def get_results_summary(results: SimulationResults) -> Tuple:
+    new_history = None if results.new_history is None else dump_state(results.new_history.room)
+    return (results.all_answers, results.non_execute_answers, results.victory, results.guesses, new_history)
+
+
 def battle_ended(previous_snapshot: Snapshot, new_snapshot: Snapshot) -> History:
     # TODO!
     return battle_update(previous_snapshot, new_snapshot)
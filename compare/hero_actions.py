@@ -0,0 +1,443 @@
+from typing import Optional, List, Dict, Iterator, Tuple, Set
+
+from data.other_enums import GamePhase
+from data.snapshot.copy_on_write import read_section
+from data.snapshot.permutate_queues import permutate_possible_attack_queues
+from data.snapshot.predictions import Predictions
+from data.snapshot.simulation import Simulation
+from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_log import undo_log
+from data.weapon.weapon import Weapon
+from logger import logger, Message
+
+
+class HeroActionOutcome:
+    """
+    A hero action followed by the enemy turn, not yet compared with the new save.
+    """
+    hero_action: "HeroAction"
+    name: str
+    description: str
+    simulation: Optional[Simulation]  # None if the action was impossible
+    enemy_attack_order: Optional[Dict[str, Simulation]]
+    messages: List[Message]  # queued while simulating, shown once compared
+
+    def __init__(self,
+                 hero_action: "HeroAction",
+                 simulation: Optional[Simulation],
+                 enemy_attack_order: Optional[Dict[str, Simulation]],
+                 messages: List[Message],
+                 ):
+        self.hero_action = hero_action
+        self.name = hero_action.get_name()
+        self.description = hero_action.get_description()
+        self.simulation = simulation
+        self.enemy_attack_order = enemy_attack_order
+        self.messages = messages
+
+
+def predict_attack_queues(previous_snapshot: Snapshot) -> Predictions:
+    # Account for switching the queue order.
+    permutated_attack_queues = permutate_possible_attack_queues(
+        attack_queue=previous_snapshot.room.hero.attack_queue,
+        hero_deck=previous_snapshot.hero_deck
+    )
+    current_attack_queue = previous_snapshot.room.hero.attack_queue[:]
+    possible_attack_queues = [current_attack_queue]
+    for perm in permutated_attack_queues:
+        if not Weapon.is_list_equal(current_attack_queue, perm):
+            possible_attack_queues.append(perm)
+    return Predictions(potential_hero_attack_queues=possible_attack_queues)
+
+
+def predict_hero_actions(initial_simulation: Simulation, predictions: Predictions, turn_around_is_free: bool,
+                         action_filter: Optional["ActionFilter"] = None) -> List[HeroActionOutcome]:
+    """
+    Simulate every hero action together with the following enemy turn.
+    Needs nothing from the new save, so it can run before that one arrives; unless filtered by it.
+    """
+    previous_hero_cell = read_section(initial_simulation, "room").hero.position.cell
+    outcomes = []
+    queue = logger.queue
+    logger.queue = []
+    try:
+        hero_actions = list_hero_actions(initial_simulation, predictions, turn_around_is_free, action_filter)
+        for hero_action, simulation in hero_actions:
+            enemy_attack_order = None
+            if simulation is not None:
+                enemy_attack_order = simulation.simulate_enemies(
+                    previous_hero_cell=previous_hero_cell,
+                )
+            # Every outcome keeps its own messages, so that they still come out in order when compared.
+            outcomes.append(HeroActionOutcome(hero_action, simulation, enemy_attack_order, logger.queue))
+            logger.queue = []
+    finally:
+        logger.queue = queue
+    return outcomes
+
+
+class HeroAction:
+    """
+    Something the hero can do in a turn, simulated only when asked to.
+    With the Two-Faced Danger skill, most actions can also come after a free turn around.
+    """
+    turned: bool  # turned around for free first
+
+    def __init__(self, turned: bool = False):
+        self.turned = turned
+
+    def get_name(self) -> str:
+        raise TypeError("Naming not allowed on the base class")
+
+    def get_description(self) -> str:
+        raise TypeError("Describing not allowed on the base class")
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        """
+        Resulting simulation, None if the action is impossible.
+        """
+        raise TypeError("Simulating not allowed on the base class")
+
+    @staticmethod
+    def turn(simulation: Optional[Simulation]) -> Optional[Simulation]:
+        if simulation is not None:
+            simulation.room.hero.position.flip()
+            simulation.game_stats.turn_arounds += 1
+        return simulation
+
+
+class Move(HeroAction):
+    right: bool
+
+    def __init__(self, right: bool, turned: bool = False):
+        super().__init__(turned)
+        self.right = right
+
+    def get_name(self) -> str:
+        side = "right" if self.right else "left"
+        return f"turn and move {side}" if self.turned else f"move {side}"
+
+    def get_description(self) -> str:
+        side = "right" if self.right else "left"
+        return f"Hero has turned moved {side}" if self.turned else f"Hero has moved {side}"
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        if self.right:
+            simulation = Simulation.simulation_move_right(initial_simulation, predictions)
+        else:
+            simulation = Simulation.simulation_move_left(initial_simulation, predictions)
+        return self.turn(simulation) if self.turned else simulation
+
+
+class TurnAround(HeroAction):
+    times: int  # more than once only when turning around is free
+
+    def __init__(self, times: int = 1):
+        super().__init__(times > 1)
+        self.times = times
+
+    def get_name(self) -> str:
+        return {1: "turn around", 2: "turn around twice", 3: "turn around thrice"}[self.times]
+
+    def get_description(self) -> str:
+        return {
+            1: "Hero has turned around",
+            2: "Hero has turned around twice (or more)",
+            3: "Hero has turned around thrice (or more)",
+        }[self.times]
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        if self.times == 1:
+            return Simulation.simulation_turn_around(initial_simulation, predictions)
+        simulation = Simulation.simulation_idle(initial_simulation, predictions)
+        simulation.room.hero.state.curse = True
+        if self.times % 2:
+            simulation.room.hero.position.flip()
+        simulation.predictions.allow_more_turn_arounds = True
+        return simulation
+
+
+class Wait(HeroAction):
+    def get_name(self) -> str:
+        return "turn and wait" if self.turned else "wait"
+
+    def get_description(self) -> str:
+        return "Hero has turned and waited a turn" if self.turned else "Hero has waited a turn"
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        simulation = Simulation.simulation_wait(initial_simulation, predictions)
+        return self.turn(simulation) if self.turned else simulation
+
+
+class SignatureMove(HeroAction):
+    def get_name(self) -> str:
+        return "turn + sig. move" if self.turned else "sig. move"
+
+    def get_description(self) -> str:
+        if self.turned:
+            return "Hero has turned and executed their signature move"
+        return "Hero has executed their signature move"
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        if self.turned:
+            return Simulation.simulation_turn_and_signature_move(initial_simulation, predictions)
+        return Simulation.simulation_signature_move(initial_simulation, predictions)
+
+
+class AddTile(HeroAction):
+    weapon: Weapon  # from the deck, cloned when added
+
+    def __init__(self, weapon: Weapon, turned: bool = False):
+        super().__init__(turned)
+        self.weapon = weapon
+
+    def get_name(self) -> str:
+        return f"turn + add {self.weapon.debug_print()}" if self.turned else f"add {self.weapon.debug_print()}"
+
+    def get_description(self) -> str:
+        if self.turned:
+            return f"Hero has turned and added {self.weapon.pretty_print()} to the queue"
+        return f"Hero has added {self.weapon.pretty_print()} to the queue"
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        simulation = Simulation.simulation_adding_weapon_to_queue(initial_simulation, self.weapon.clone())
+        return self.turn(simulation) if self.turned else simulation
+
+
+class QueueExecutions:
+    """
+    The queue orders one turn may have executed. Orders starting with the same tiles share the simulation of those:
+    each order resumes from the longest start already executed, only the rest of its tiles are simulated.
+    A shorter order is the start of the longer ones, so it costs no execution at all once those came.
+    """
+    initial_simulation: Simulation
+    previous_hero_cell: int
+    shared_starts: Set[Tuple]  # keys of the first tiles (or all of them) of more than one order
+    executed: Dict[Tuple, Tuple[Simulation, List[Weapon], List[Message]]]  # (turned, *keys): simulation so far
+
+    def __init__(self, initial_simulation: Simulation, previous_hero_cell: int, attack_queues: List[List[Weapon]]):
+        self.initial_simulation = initial_simulation
+        self.previous_hero_cell = previous_hero_cell
+        starts: Dict[Tuple, int] = {}
+        for attack_queue in attack_queues:
+            keys = tuple(weapon.get_key() for weapon in attack_queue)
+            for length in range(1, len(keys) + 1):
+                starts[keys[:length]] = starts.get(keys[:length], 0) + 1
+        self.shared_starts = {start for start, count in starts.items() if count > 1}
+        self.executed = {}
+
+    def simulate(self, attack_queue: List[Weapon], turned: bool) -> Simulation:
+        if undo_log.is_recording():
+            # Everything happens in the initial simulation, there is no simulation to resume from.
+            return Simulation.simulation_execute_queue_internal(
+                self.initial_simulation, attack_queue, self.previous_hero_cell, turned)
+        keys = tuple(weapon.get_key() for weapon in attack_queue)
+        first_message = len(logger.queue)
+        length = len(keys)
+        while length and (turned, *keys[:length]) not in self.executed:
+            length -= 1
+        if length:
+            simulation, executed, messages = self.executed[(turned, *keys[:length])]
+            logger.queue_messages(messages)
+            simulation = Simulation.of(simulation, simulation.predictions)
+            executed = [weapon.clone() for weapon in executed]
+        else:
+            simulation = Simulation.simulation_start_queue(self.initial_simulation, turned)
+            executed = []
+        for weapon in attack_queue[length:]:
+            weapon = weapon.clone()
+            simulation.execute_weapon(
+                attacker=simulation.room.hero,
+                weapon=weapon,
+                previous_hero_cell=self.previous_hero_cell,
+            )
+            executed.append(weapon)
+            if keys[:len(executed)] in self.shared_starts:
+                self.executed[(turned, *keys[:len(executed)])] = (
+                    simulation, [weapon.clone() for weapon in executed], logger.queue[first_message:])
+                simulation = Simulation.of(simulation, simulation.predictions)
+        simulation.finish_queue(executed)
+        return simulation
+
+
+class ExecuteQueue(HeroAction):
+    attack_queue: List[Weapon]
+    previous_hero_cell: int
+    executions: Optional[QueueExecutions]  # shared with the other orders of the turn, if any
+
+    def __init__(self, attack_queue: List[Weapon], previous_hero_cell: int, turned: bool = False,
+                 executions: Optional[QueueExecutions] = None):
+        super().__init__(turned)
+        self.attack_queue = attack_queue
+        self.previous_hero_cell = previous_hero_cell
+        self.executions = executions
+
+    def get_name(self) -> str:
+        queue = Weapon.short_print_list(self.attack_queue)
+        return f"turn + execute {queue}" if self.turned else f"execute {queue}"
+
+    def get_description(self) -> str:
+        queue = Weapon.short_print_list(self.attack_queue)
+        if self.turned:
+            return f"Hero has turned and executed the queue: {queue}"
+        return f"Hero has executed the queue: {queue}"
+
+    def simulate(self, initial_simulation: Simulation, predictions: Predictions) -> Optional[Simulation]:
+        if self.executions is not None:
+            return self.executions.simulate(self.attack_queue, self.turned)
+        if self.turned:
+            return Simulation.simulation_turn_and_execute_queue(
+                snapshot=initial_simulation,
+                attack_queue=self.attack_queue,
+                previous_hero_cell=self.previous_hero_cell,
+            )
+        return Simulation.simulation_execute_queue(
+            snapshot=initial_simulation,
+            attack_queue=self.attack_queue,
+            previous_hero_cell=self.previous_hero_cell,
+        )
+
+
+def generate_hero_actions(initial_simulation: Simulation, predictions: Predictions,
+                          turn_around_is_free: bool) -> Iterator[HeroAction]:
+    """
+    Yield every possible hero action, without simulating any.
+    Each is made only when asked for, so the caller may stop early or pick some of them.
+    """
+    previous_hero_cell = read_section(initial_simulation, "room").hero.position.cell
+    yield Move(right=True)
+    if turn_around_is_free:
+        yield Move(right=True, turned=True)
+    yield Move(right=False)
+    if turn_around_is_free:
+        yield Move(right=False, turned=True)
+
+    if turn_around_is_free:
+        yield TurnAround(times=2)
+        yield TurnAround(times=3)
+    else:
+        yield TurnAround()
+
+    yield Wait()
+    if turn_around_is_free:
+        yield Wait(turned=True)
+
+    yield SignatureMove()
+    if turn_around_is_free:
+        yield SignatureMove(turned=True)
+
+    hero_deck = read_section(initial_simulation, "hero_deck")
+    for weapon in hero_deck:
+        # Immediates are handled elsewhere.
+        if weapon.is_immediate():
+            continue
+        is_in_queue = 0
+        number_copies = 0
+        for potential in hero_deck:
+            if weapon.cooldown_charge == weapon.cooldown and potential.is_equal(weapon):
+                number_copies += 1
+        for potential in read_section(initial_simulation, "room").hero.attack_queue:
+            if potential.is_equal(weapon):
+                is_in_queue += 1
+        if is_in_queue < number_copies:
+            yield AddTile(weapon)
+            if turn_around_is_free:
+                yield AddTile(weapon, turned=True)
+
+    # Every order the queue may have been rearranged into, each distinct one once, see permutate_queues.
+    attack_queues = [attack_queue for attack_queue in predictions.potential_hero_attack_queues if len(attack_queue)]
+    executions = QueueExecutions(initial_simulation, previous_hero_cell, attack_queues)
+    for attack_queue in attack_queues:
+        yield ExecuteQueue(attack_queue, previous_hero_cell, executions=executions)
+        if turn_around_is_free:
+            yield ExecuteQueue(attack_queue, previous_hero_cell, turned=True, executions=executions)
+
+
+class PruningStats:
+    considered: int
+    ruled_out: Dict[str, int]  # by the rule that ruled them out
+
+    def __init__(self):
+        self.considered = 0
+        self.ruled_out = {}
+
+    def add(self, other) -> None:
+        self.considered += other.considered
+        for rule, count in other.ruled_out.items():
+            self.ruled_out[rule] = self.ruled_out.get(rule, 0) + count
+
+    def pretty_print(self) -> str:
+        ruled_out = sum(self.ruled_out.values())
+        result = f"Hero actions: {self.considered}, ruled out before simulating: {ruled_out}"
+        if ruled_out:
+            result += f" ({', '.join(f'{rule}: {count}' for rule, count in sorted(self.ruled_out.items()))})"
+        return result
+
+
+class ActionFilter:
+    """
+    Rules out the hero actions the new save contradicts, before they get simulated.
+    Only checks what is_good_prediction requires exactly and the enemy turn cannot change: the hero's attack queue
+    and the charge of the deck. Enemies push the hero around, so the hero's cell tells nothing for sure.
+    """
+    in_battle: bool  # a won battle is not compared with the simulations
+    actual_queue: List[Weapon]
+    queue_kept: bool  # the queue is one the hero could have without adding or executing
+    deck_recharged: bool  # no tile is less charged than before, as without executing
+    stats: PruningStats
+
+    def __init__(self, initial_simulation: Simulation, new_snapshot: Snapshot, predictions: Predictions):
+        self.in_battle = new_snapshot.game_phase == GamePhase.BATTLE
+        self.stats = PruningStats()
+        if not self.in_battle:
+            return
+        self.actual_queue = new_snapshot.room.hero.attack_queue
+        potential_queues = predictions.potential_hero_attack_queues
+        self.queue_kept = not len(potential_queues) or any(
+            Weapon.is_list_equal(self.actual_queue, potential_queue) for potential_queue in potential_queues)
+        actual_deck = new_snapshot.hero_deck
+        hero_deck = read_section(initial_simulation, "hero_deck")
+        self.deck_recharged = len(actual_deck) == len(hero_deck) and all(
+            actual.cooldown_charge >= weapon.cooldown_charge for actual, weapon in zip(actual_deck, hero_deck))
+
+    def get_broken_rule(self, hero_action: HeroAction) -> Optional[str]:
+        if not self.in_battle:
+            return None
+        if isinstance(hero_action, ExecuteQueue):
+            # Executing empties the queue, nothing else needs to match.
+            return "queue" if len(self.actual_queue) else None
+        if not self.deck_recharged:
+            return "deck"
+        if isinstance(hero_action, AddTile):
+            if not any(weapon.is_equal(hero_action.weapon) for weapon in self.actual_queue):
+                return "queue"
+            return None
+        return None if self.queue_kept else "queue"
+
+    def is_plausible(self, hero_action: HeroAction) -> bool:
+        self.stats.considered += 1
+        rule = self.get_broken_rule(hero_action)
+        if rule is None:
+            return True
+        self.stats.ruled_out[rule] = self.stats.ruled_out.get(rule, 0) + 1
+        return False
+
+
+def list_hero_actions(initial_simulation: Simulation, predictions: Predictions, turn_around_is_free: bool,
+                      action_filter: Optional[ActionFilter] = None
+                      ) -> Iterator[Tuple[HeroAction, Optional[Simulation]]]:
+    """
+    Yield every possible hero action with the resulting simulation (None if impossible).
+    Actions ruled out by the filter are left out altogether.
+    """
+    for hero_action in generate_hero_actions(initial_simulation, predictions, turn_around_is_free):
+        if action_filter is None or action_filter.is_plausible(hero_action):
+            yield simulate_hero_action(hero_action, initial_simulation, predictions)
+
+
+def simulate_hero_action(hero_action: HeroAction, initial_simulation: Simulation,
+                         predictions: Predictions) -> Tuple[HeroAction, Optional[Simulation]]:
+    name = hero_action.get_name()
+    potions_description = predictions.potion_simulation.potion_description
+    logger.queue_debug_info(lambda: f'Start simulation {potions_description}:"{name}"')
+    return hero_action, hero_action.simulate(initial_simulation, predictions)
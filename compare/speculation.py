@@ -0,0 +1,126 @@
+from threading import Thread
+from time import perf_counter
+from typing import Optional, List
+
+from compare.hero_actions import HeroActionOutcome, predict_attack_queues, predict_hero_actions
+from data.other_enums import GamePhase
+from data.skill.skill_enums import SkillEnum
+from data.snapshot.predictions import Predictions
+from data.snapshot.simulation import Simulation
+from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_log import get_undo_sections
+from history.potions.potion_simulation import PotionSimulation
+from logger import logger
+
+
+class Speculation:
+    """
+    Simulates the hero actions of the next turn in the background, assuming no potion gets used or sold.
+    The background thread never reads the snapshot, which the main thread goes on decoding and changing:
+    the initial simulation gets its own copy of every section before the thread starts.
+    """
+    snapshot: Snapshot
+    turn_around_is_free: bool
+    initial_simulation: Optional[Simulation]  # None once the thread is done with it
+    predictions: Optional[Predictions]
+    outcomes: Optional[List[HeroActionOutcome]]
+    error: Optional[Exception]
+    duration: float
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self.turn_around_is_free = snapshot.skills.has_skill(SkillEnum.TWO_FACED_DANGER)
+        self.outcomes = None
+        self.error = None
+        self.duration = 0
+        try:
+            self.initial_simulation = Simulation.of(snapshot)
+            get_undo_sections(self.initial_simulation)
+            self.predictions = predict_attack_queues(snapshot)
+        except Exception as e:
+            # Same thing will fail again when done the usual way, and be reported there.
+            self.initial_simulation = None
+            self.error = e
+        self.thread = Thread(target=self.run, name="speculation", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        if self.initial_simulation is None:
+            return
+        start = perf_counter()
+        try:
+            # Outcomes are only used by the muted first comparison.
+            with logger.muted():
+                self.outcomes = predict_hero_actions(self.initial_simulation, self.predictions,
+                                                     self.turn_around_is_free)
+        except Exception as e:
+            self.error = e
+        self.initial_simulation = None
+        self.predictions = None
+        self.duration = perf_counter() - start
+
+    def wait(self) -> None:
+        self.thread.join()
+
+    def matches(self, new_snapshot: Snapshot, potion_simulation: PotionSimulation) -> bool:
+        return self.outcomes is not None \
+            and not potion_simulation.sold and not potion_simulation.used \
+            and new_snapshot.hero_potion_ids == self.snapshot.hero_potion_ids \
+            and new_snapshot.skills.has_skill(SkillEnum.TWO_FACED_DANGER) == self.turn_around_is_free
+
+    def take(self) -> List[HeroActionOutcome]:
+        if self.thread.is_alive():
+            raise ValueError("Speculation taken before it finished")
+        # Simulations get modified while being compared, so they can only be used once.
+        outcomes = self.outcomes
+        self.outcomes = None
+        for outcome in outcomes:
+            if outcome.simulation is not None:
+                # Potion guesses get updated after the speculation has started.
+                outcome.simulation.history.potions = self.snapshot.history.potions.clone()
+        return outcomes
+
+
+class Speculator:
+    enabled: bool
+    current: Optional[Speculation]
+    total: int
+    used: int
+    time_saved: float
+
+    def __init__(self):
+        self.enabled = False
+        self.current = None
+        self.total = 0
+        self.used = 0
+        self.time_saved = 0
+
+    def start(self, snapshot: Snapshot) -> None:
+        if self.current is not None:
+            self.current.wait()
+            self.current = None
+        if not self.enabled or snapshot.game_phase != GamePhase.BATTLE or snapshot.history is None:
+            return
+        self.current = Speculation(snapshot)
+        self.total += 1
+
+    def take(self, previous_snapshot: Snapshot) -> Optional[Speculation]:
+        speculation = self.current
+        self.current = None
+        if speculation is None:
+            return None
+        speculation.wait()
+        if speculation.snapshot is not previous_snapshot:
+            return None
+        return speculation
+
+    def record_use(self, speculation: Speculation) -> None:
+        self.used += 1
+        self.time_saved += speculation.duration
+
+    def pretty_print(self) -> str:
+        return f"Speculative turns: {self.total}, used: {self.used}, " \
+               f"simulation time saved: {self.time_saved * 1000:.0f} ms"
+
+
+speculator = Speculator()
@@ -16,6 +16,7 @@ from logger import logger
 
 
 class Enemy(Entity):
+    __slots__ = ("enemy_id", "action", "previous_action", "next_weapon", "elite_type", "first_turn", "pattern_index")
     enemy_id: EnemyEnum
     action: EnemyActionEnum
     previous_action: EnemyActionEnum
@@ -102,19 +103,20 @@ class Enemy(Entity):
         )
 
     def clone(self):
-        return Enemy(
-            enemy_id=self.enemy_id,
-            state=self.state.clone(),
-            position=self.position.clone(),
-            hp=self.hp.clone(),
-            action=self.action,
-            previous_action=self.previous_action,
-            next_weapon=self.next_weapon.clone() if self.next_weapon is not None else None,
-            first_turn=self.first_turn,
-            elite_type=self.elite_type,
-            pattern_index=self.pattern_index,
-            attack_queue=[weapon.clone() for weapon in self.attack_queue],
-        )
+        clone = Enemy.__new__(Enemy)
+        clone.entity_type = self.entity_type
+        clone.state = self.state.clone()
+        clone.position = self.position.clone()
+        clone.hp = self.hp.clone()
+        clone.attack_queue = [weapon.clone() for weapon in self.attack_queue]
+        clone.enemy_id = self.enemy_id
+        clone.action = self.action
+        clone.previous_action = self.previous_action
+        clone.next_weapon = self.next_weapon.clone() if self.next_weapon is not None else None
+        clone.elite_type = self.elite_type
+        clone.first_turn = self.first_turn
+        clone.pattern_index = self.pattern_index
+        return clone
 
     def to_dict(self):
         return {
@@ -188,19 +190,20 @@ class Enemy(Entity):
             if debug:
                 raise PredictionError(f"wrong entity type ({name})")
             else:
-                logger.queue_debug_error(f"wrong entity type ({name})")
+                logger.queue_debug_error(lambda: f"wrong entity type ({name})")
             return False
         if self.enemy_id != other.enemy_id:
             if debug:
                 raise PredictionError(f"wrong enemy id ({name}) self {self.enemy_id} other{other.enemy_id}")
             else:
-                logger.queue_debug_error(f"wrong enemy id ({name}) self {self.enemy_id} other{other.enemy_id}")
+                logger.queue_debug_error(lambda: f"wrong enemy id ({name}) self {self.enemy_id} other{other.enemy_id}")
             return False
         if self.first_turn != other.first_turn:
             if debug:
                 raise PredictionError(f"wrong first turn ({name}) self {self.first_turn} other{other.first_turn}")
             else:
-                logger.queue_debug_error(f"wrong first turn ({name}) self {self.first_turn} other{other.first_turn}")
+                logger.queue_debug_error(
+                    lambda: f"wrong first turn ({name}) self {self.first_turn} other{other.first_turn}")
             return False
         if debug:
             other_checks = self.state.is_equal(other.state, debug=name) and \
@@ -305,5 +308,5 @@ class Enemy(Entity):
         elif weapon.attack_effect == WeaponAttackEffectEnum.POISON:
             pass
         else:
-            weapon_clone.attack_effect = None
+            weapon_clone.set_attack_effect(None)
         return twin_target.hit(weapon_clone, None)
@@ -4,12 +4,14 @@ from data.entity.entity_enums import EntityType
 from data.entity.entity_hp import EntityHp
 from data.entity.entity_position import EntityPosition
 from data.entity.entity_state import EntityState
+from data.snapshot.undo_tracked import UndoTracked
 from data.weapon.weapon import Weapon
 from data.weapon.weapon_enums import WeaponEnum, WeaponAttackEffectEnum
 from logger import logger
 
 
-class Entity:
+class Entity(UndoTracked):
+    __slots__ = ("entity_type", "state", "position", "hp", "attack_queue")
     entity_type: EntityType
     state: EntityState
     position: EntityPosition
@@ -69,7 +71,7 @@ class Entity:
         return False
 
     def actual_hit(self, weapon: Weapon) -> int:
-        logger.queue_debug_text(f"{self.get_name()} getting hit with {weapon.pretty_print()}")
+        logger.queue_debug_text(lambda: f"{self.get_name()} getting hit with {weapon.pretty_print()}")
         strength = weapon.strength
         hits = 1 if self.is_hero() else 0
         if self.state.shield:
@@ -95,7 +97,7 @@ class Entity:
 
     def actual_heal(self, weapon: Weapon) -> None:
         # Only happens when a boss hits itself with their corrupted wave.
-        logger.queue_debug_text(f"{self.get_name()} getting healed by {weapon.pretty_print()}")
+        logger.queue_debug_text(lambda: f"{self.get_name()} getting healed by {weapon.pretty_print()}")
         strength = weapon.strength
         if self.hp.hp < self.hp.max_hp:
             self.hp.hp += strength
@@ -1,7 +1,9 @@
 from data.snapshot.prediction_error import PredictionError
+from data.snapshot.undo_tracked import UndoTracked
 
 
-class EntityHp:
+class EntityHp(UndoTracked):
+    __slots__ = ("hp", "max_hp")
     hp: int
     max_hp: int
 
@@ -12,10 +14,10 @@ class EntityHp:
         self.max_hp = max_hp
 
     def clone(self):
-        return EntityHp(
-            hp=self.hp,
-            max_hp=self.max_hp
-        )
+        clone = EntityHp.__new__(EntityHp)
+        clone.hp = self.hp
+        clone.max_hp = self.max_hp
+        return clone
 
     def is_equal(self, other, debug: str = None):
         if not debug:
@@ -1,9 +1,11 @@
 from typing import List, Optional
 
 from data.snapshot.prediction_error import PredictionError
+from data.snapshot.undo_tracked import UndoTracked
 
 
-class EntityPosition:
+class EntityPosition(UndoTracked):
+    __slots__ = ("cell", "facing", "died_in")
     cell: int
     facing: int
     died_in: Optional[int]
@@ -18,11 +20,11 @@ class EntityPosition:
         self.died_in = died_in
 
     def clone(self):
-        return EntityPosition(
-            cell=self.cell,
-            facing=self.facing,
-            died_in=self.died_in,
-        )
+        clone = EntityPosition.__new__(EntityPosition)
+        clone.cell = self.cell
+        clone.facing = self.facing
+        clone.died_in = self.died_in
+        return clone
 
     def clone_on_death(self):
         return EntityPosition(
@@ -1,7 +1,9 @@
 from data.snapshot.prediction_error import PredictionError
+from data.snapshot.undo_tracked import UndoTracked
 
 
-class EntityState:
+class EntityState(UndoTracked):
+    __slots__ = ("shield", "curse", "ice", "poison")
     shield: bool
     curse: bool
     ice: int
@@ -27,12 +29,12 @@ class EntityState:
         )
 
     def clone(self):
-        return EntityState(
-            shield=self.shield,
-            curse=self.curse,
-            ice=self.ice,
-            poison=self.poison,
-        )
+        clone = EntityState.__new__(EntityState)
+        clone.shield = self.shield
+        clone.curse = self.curse
+        clone.ice = self.ice
+        clone.poison = self.poison
+        return clone
 
     def is_equal(self, other, debug: str = None):
         if not debug:
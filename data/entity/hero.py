@@ -13,6 +13,7 @@ from data.weapon.weapon import Weapon
 
 
 class Hero(Entity):
+    __slots__ = ("hero_id", "special_move_cooldown", "has_reactive_shield")
     hero_id: HeroEnum
     special_move_cooldown: int
     has_reactive_shield: bool
@@ -38,15 +39,16 @@ class Hero(Entity):
         self.has_reactive_shield = has_reactive_shield
 
     def clone(self):
-        return Hero(
-            hero_id=self.hero_id,
-            state=self.state.clone(),
-            position=self.position.clone(),
-            hp=self.hp.clone(),
-            attack_queue=[weapon.clone() for weapon in self.attack_queue],
-            special_move_cooldown=self.special_move_cooldown,
-            has_reactive_shield=self.has_reactive_shield,
-        )
+        clone = Hero.__new__(Hero)
+        clone.entity_type = self.entity_type
+        clone.state = self.state.clone()
+        clone.position = self.position.clone()
+        clone.hp = self.hp.clone()
+        clone.attack_queue = [weapon.clone() for weapon in self.attack_queue]
+        clone.hero_id = self.hero_id
+        clone.special_move_cooldown = self.special_move_cooldown
+        clone.has_reactive_shield = self.has_reactive_shield
+        return clone
 
     def to_dict(self):
         return {
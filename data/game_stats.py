@@ -4,10 +4,14 @@ from constants import RUN_STATS, HITS, FRIENDLY_KILLS, HEAL_PICKUPS, POTION_PICK
     COMBAT_ROOMS_CLEARED, COMBOS, TURN_AROUNDS, TIME, COINS, TURNS, NEW_TILES_PICKED, CONSUMABLES_USED, DAY, VERSION
 from data.snapshot.prediction_error import PredictionError
 from data.snapshot.predictions import Predictions
+from data.snapshot.undo_tracked import UndoTracked
 from logger import logger
 
 
-class GameStats:
+class GameStats(UndoTracked):
+    __slots__ = ("version", "turn_arounds", "coins", "combos", "turns", "time", "combat_rooms_cleared", "scroll_pickups",
+                 "potion_pickups", "heal_pickups", "friendly_kills", "hits", "day", "consumables_used",
+                 "new_tiles_picked")
     version: str
     turn_arounds: int
     coins: int
@@ -111,23 +115,23 @@ class GameStats:
         }
 
     def clone(self):
-        return GameStats(
-            version=self.version,
-            turn_arounds=self.turn_arounds,
-            coins=self.coins,
-            combos=self.combos,
-            turns=self.turns,
-            time=self.time,
-            combat_rooms_cleared=self.combat_rooms_cleared,
-            scroll_pickups=self.scroll_pickups,
-            potion_pickups=self.potion_pickups,
-            heal_pickups=self.heal_pickups,
-            friendly_kills=self.friendly_kills,
-            hits=self.hits,
-            day=self.day,
-            consumables_used=self.consumables_used,
-            new_tiles_picked=self.new_tiles_picked
-        )
+        clone = GameStats.__new__(GameStats)
+        clone.version = self.version
+        clone.turn_arounds = self.turn_arounds
+        clone.coins = self.coins
+        clone.combos = self.combos
+        clone.turns = self.turns
+        clone.time = self.time
+        clone.combat_rooms_cleared = self.combat_rooms_cleared
+        clone.scroll_pickups = self.scroll_pickups
+        clone.potion_pickups = self.potion_pickups
+        clone.heal_pickups = self.heal_pickups
+        clone.friendly_kills = self.friendly_kills
+        clone.hits = self.hits
+        clone.day = self.day
+        clone.consumables_used = self.consumables_used
+        clone.new_tiles_picked = self.new_tiles_picked
+        return clone
 
     def debug_print(self) -> str:
         return f"ta {self.turn_arounds} $ {self.coins} cmb {self.combos} scr {self.scroll_pickups} " \
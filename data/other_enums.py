@@ -8,6 +8,14 @@ class GamePhase(Enum):
     SHOP = 3
 
 
+class TurnVerdict(Enum):
+    SKIPPED = 0
+    SOLVED = 1
+    VICTORY = 2
+    AMBIGUOUS = 3
+    NOT_FOUND = 4
+
+
 class WeaponUpgradePlace(Enum):
     REWARD = 0
     SHOP = 1
@@ -14,6 +14,7 @@ from data.room.room_enums import PickupEnum, RoomEnum
 from data.skill.skills import Skills
 from data.snapshot.hit_data import HitData
 from data.snapshot.prediction_error import PredictionError
+from data.snapshot.undo_tracked import UndoTracked
 from data.weapon.weapon import Weapon
 from data.weapon.weapon_enums import WeaponEnum
 from logger import logger
@@ -95,7 +96,7 @@ def get_board_size(room: RoomEnum, progression: int, variant: int) -> int:
     return retval
 
 
-class BattleRoom:
+class BattleRoom(UndoTracked):
     room: RoomEnum
     progression: int
     hero: Hero
@@ -106,6 +107,7 @@ class BattleRoom:
     board_size: int
     variant: int
     is_boss_corrupted: bool
+    occupants: Dict[int, List[Entity]]  # cell: entities there, kept up to date on every move, death and spawn
 
     def __init__(self,
                  room: RoomEnum,
@@ -128,6 +130,8 @@ class BattleRoom:
         self.variant = variant
         self.is_boss_corrupted = is_boss_corrupted
         self.board_size = get_board_size(room, progression, variant)
+        self.occupants = {}
+        self.index_occupants()
 
     @staticmethod
     def from_dict(source: Dict, skills: Skills):
@@ -217,17 +221,21 @@ class BattleRoom:
         for loc in pickups:
             for pickup_type, total in self.pickups[loc].items():
                 pickups[loc][pickup_type] = total
-        return BattleRoom(
-            room=self.room,
-            progression=self.progression,
-            hero=self.hero.clone(),  # reconstructed
-            enemies=[enemy.clone() for enemy in self.enemies],
-            pickups=pickups,
-            wave_number=self.wave_number,
-            until_next_wave=self.until_next_wave,
-            variant=self.variant,
-            is_boss_corrupted=self.is_boss_corrupted,
-        )
+        # Skips the constructor, the board size doesn't need looking up again.
+        clone = BattleRoom.__new__(BattleRoom)
+        clone.room = self.room
+        clone.progression = self.progression
+        clone.hero = self.hero.clone()  # reconstructed
+        clone.enemies = [enemy.clone() for enemy in self.enemies]
+        clone.pickups = pickups
+        clone.wave_number = self.wave_number
+        clone.until_next_wave = self.until_next_wave
+        clone.variant = self.variant
+        clone.is_boss_corrupted = self.is_boss_corrupted
+        clone.board_size = self.board_size
+        clone.occupants = {}
+        clone.index_occupants()
+        return clone
 
     def is_equal(self, other):
         if len(self.pickups) != len(other.pickups):
@@ -265,11 +273,11 @@ class BattleRoom:
                 found = False
                 for index, other_enemy in enumerate(other_enemies):
                     if not found and enemy.is_good_prediction(other_enemy, debug=False):
-                        logger.queue_debug_warn(f"Compare against {other_enemies[index].pretty_print()}")
+                        logger.queue_debug_warn(lambda: f"Compare against {other_enemies[index].pretty_print()}")
                         del other_enemies[index]
                         found = True
                 if not found:
-                    logger.queue_debug_warn(f"Could not find {enemy.pretty_print()}")
+                    logger.queue_debug_warn(lambda: f"Could not find {enemy.pretty_print()}")
                     unaccounted_for_enemies += 1
             if unaccounted_for_enemies != summons:
                 if debug:
@@ -389,17 +397,47 @@ class BattleRoom:
             retval.append(f"{loc}: {', '.join(pps_str)}")
         return ", ".join(retval)
 
+    def index_occupants(self) -> None:
+        self.occupants.clear()
+        for enemy in self.enemies:
+            self.occupants.setdefault(enemy.position.cell, []).append(enemy)
+        if self.hero is not None:
+            self.occupants.setdefault(self.hero.position.cell, []).append(self.hero)
+
+    def set_enemies(self, enemies: List[Enemy]) -> None:
+        self.enemies = enemies
+        self.index_occupants()
+
+    def add_enemy(self, enemy: Enemy) -> None:
+        self.enemies.append(enemy)
+        self.occupants.setdefault(enemy.position.cell, []).append(enemy)
+
+    def move_entity(self, entity: Entity, new_cell: int) -> None:
+        occupants = self.occupants.get(entity.position.cell)
+        if occupants is not None:
+            for index, occupant in enumerate(occupants):
+                if occupant is entity:
+                    del occupants[index]
+                    break
+            if not occupants:
+                del self.occupants[entity.position.cell]
+        entity.position.cell = new_cell
+        self.occupants.setdefault(new_cell, []).append(entity)
+
+    def is_occupied(self, cell: Optional[int]) -> bool:
+        return cell in self.occupants
+
     def get_push_target_in_direction(self, entity: Entity, direction: int, push_range=10) -> Tuple[
         int, Optional[Entity]]:
         current_cell = entity.position.cell
-        logger.queue_debug_text(f"entity {entity.short_print()} getting pushed in direction {direction}")
+        logger.queue_debug_text(lambda: f"entity {entity.short_print()} getting pushed in direction {direction}")
         for i in range(push_range):
             if not self.is_legal_position(current_cell + direction):
                 return current_cell, None
             current_cell += direction
             collisions = self.find_targets([current_cell])
             if len(collisions):
-                logger.queue_debug_text(f"Collided with {collisions[0].pretty_print()}")
+                logger.queue_debug_text(lambda: f"Collided with {collisions[0].pretty_print()}")
                 return current_cell - direction, collisions[0]
             if not self.is_legal_position(current_cell):
                 return current_cell - direction, None
@@ -412,11 +450,8 @@ class BattleRoom:
             current_cell += direction
             if not self.is_legal_position(current_cell):
                 return None
-            for enemy in self.enemies:
-                if enemy.position.cell == current_cell:
-                    return enemy
-            if self.hero.position.cell == current_cell:
-                return self.hero
+            if self.is_occupied(current_cell):
+                return self.find_targets([current_cell])[0]
 
     def get_first_target_space_ahead(self, attacker: Entity) -> Optional[int]:
         direction = attacker.position.get_direction()
@@ -448,7 +483,7 @@ class BattleRoom:
             current_cell += direction
             if not self.is_legal_position(current_cell):
                 return None
-            if len(self.find_targets([current_cell])):
+            if self.is_occupied(current_cell):
                 return current_cell
 
     def get_last_target_space_ahead(self, attacker: Entity) -> Optional[int]:
@@ -458,10 +493,7 @@ class BattleRoom:
             current_cell += direction
             if current_cell == attacker.position.cell:
                 return None
-            for enemy in self.enemies:
-                if enemy.position.cell == current_cell:
-                    return current_cell
-            if self.hero.position.cell == current_cell:
+            if self.is_occupied(current_cell):
                 return current_cell
 
     def get_last_free_space_ahead(self, attacker: Entity) -> int:
@@ -478,7 +510,7 @@ class BattleRoom:
             new_cell = current_cell + direction
             if not self.is_legal_position(current_cell):
                 return current_cell - direction
-            if len(self.find_targets([new_cell])) > 0:
+            if self.is_occupied(new_cell):
                 return current_cell
             current_cell = new_cell
 
@@ -503,6 +535,17 @@ class BattleRoom:
         return targets
 
     def find_targets(self, target_cells: List[Optional[int]]):
+        found = None
+        for cell in target_cells:
+            occupants = self.occupants.get(cell)
+            if occupants:
+                if found is not None or len(occupants) > 1:
+                    # More than one target, they come in the order of the enemy list.
+                    return self.scan_targets(target_cells)
+                found = occupants[0]
+        return [] if found is None else [found]
+
+    def scan_targets(self, target_cells: List[Optional[int]]):
         targets = []
         for enemy in self.enemies:
             if enemy.position.cell in target_cells:
@@ -515,10 +558,10 @@ class BattleRoom:
         List[int], List[int]]:
         attacker_cell = attacker.position.cell
         logger.queue_debug_text(
-            f"Looking for connected targets. Attacker cell: {attacker_cell}, targets: {target_cells}")
+            lambda: f"Looking for connected targets. Attacker cell: {attacker_cell}, targets: {target_cells}")
         shock_targets = set()
         direct_targets = self.find_targets(target_cells)
-        logger.queue_debug_text(f"Targets found: {[e.short_print() for e in direct_targets]}")
+        logger.queue_debug_text(lambda: f"Targets found: {[e.short_print() for e in direct_targets]}")
         for direct_target in direct_targets:
             current_cell = direct_target.position.cell
             while True:
@@ -527,7 +570,7 @@ class BattleRoom:
                     break
                 if current_cell in shock_targets or current_cell == attacker_cell:
                     continue
-                if not len(self.find_targets([current_cell])) > 0:
+                if not self.is_occupied(current_cell):
                     break
                 shock_targets.add(current_cell)
             current_cell = direct_target.position.cell
@@ -537,7 +580,7 @@ class BattleRoom:
                     break
                 if current_cell in shock_targets or current_cell == attacker_cell:
                     continue
-                if not len(self.find_targets([current_cell])) > 0:
+                if not self.is_occupied(current_cell):
                     break
                 shock_targets.add(current_cell)
         return [dt.position.cell for dt in direct_targets], list(shock_targets)
@@ -556,9 +599,9 @@ class BattleRoom:
             direct_target_cells = target_cells
             shock_target_cells = []
         direct_targets = self.find_targets(direct_target_cells)
-        logger.queue_debug_text(f"direct targets: {[', '.join(t.short_print() for t in direct_targets)]}")
+        logger.queue_debug_text(lambda: f"direct targets: {[', '.join(t.short_print() for t in direct_targets)]}")
         shock_targets = self.find_targets(shock_target_cells)
-        logger.queue_debug_text(f"shock targets: {[', '.join(t.short_print() for t in shock_targets)]}")
+        logger.queue_debug_text(lambda: f"shock targets: {[', '.join(t.short_print() for t in shock_targets)]}")
         if not len(direct_targets):
             return hit_data
         for target in direct_targets:
@@ -585,9 +628,9 @@ class BattleRoom:
                 direction = attacker.position.get_direction_towards(target)
                 stop_cell, stop_target = self.get_push_target_in_direction(target, direction)
                 if stop_target is None:
-                    logger.queue_debug_text(f"stop cell: {stop_cell} stop_target: NONE")
+                    logger.queue_debug_text(lambda: f"stop cell: {stop_cell} stop_target: NONE")
                 else:
-                    logger.queue_debug_text(f"stop cell: {stop_cell} stop_target: {stop_target.short_print()}")
+                    logger.queue_debug_text(lambda: f"stop cell: {stop_cell} stop_target: {stop_target.short_print()}")
                 if stop_target:
                     hit_data.hits += target.hit(stop_weapon, twin_target)
                     hit_data.hits += stop_target.hit(stop_weapon, twin_target)
@@ -0,0 +1,138 @@
+from collections.abc import Sequence, Mapping
+from typing import Callable, Any
+
+from data.snapshot.undo_log import undo_log
+from data.snapshot.undo_tracked import UndoTracked
+from history.history import History
+
+# Everything a read-only view hands out views of, besides lists and dicts.
+VIEWED_CLASSES = (UndoTracked, History)
+
+
+class ReadOnlyView:
+    """
+    Object of a section shared with other simulations: reading goes through, assigning a field raises.
+    Methods run on the object itself, only what is written through the view is caught.
+    """
+    __slots__ = ("wrapped",)
+
+    def __init__(self, wrapped):
+        object.__setattr__(self, "wrapped", wrapped)
+
+    @property
+    def __class__(self):
+        # So that isinstance still sees the wrapped class.
+        return type(self.wrapped)
+
+    def __getattr__(self, name: str):
+        return read_only(getattr(self.wrapped, name))
+
+    def __setattr__(self, name: str, value) -> None:
+        raise TypeError(f"Writing {name} not allowed on a shared section")
+
+    def __delattr__(self, name: str) -> None:
+        raise TypeError(f"Deleting {name} not allowed on a shared section")
+
+
+class ReadOnlyList(Sequence):
+    __slots__ = ("wrapped",)
+
+    def __init__(self, wrapped: list):
+        self.wrapped = wrapped
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [read_only(item) for item in self.wrapped[index]]
+        return read_only(self.wrapped[index])
+
+    def __len__(self) -> int:
+        return len(self.wrapped)
+
+    def __contains__(self, value) -> bool:
+        return get_wrapped(value) in self.wrapped
+
+
+class ReadOnlyDict(Mapping):
+    __slots__ = ("wrapped",)
+
+    def __init__(self, wrapped: dict):
+        self.wrapped = wrapped
+
+    def __getitem__(self, key):
+        return read_only(self.wrapped[key])
+
+    def __iter__(self):
+        return iter(self.wrapped)
+
+    def __len__(self) -> int:
+        return len(self.wrapped)
+
+    def __contains__(self, key) -> bool:
+        return key in self.wrapped
+
+
+def read_only(value):
+    if type(value) in (ReadOnlyView, ReadOnlyList, ReadOnlyDict):
+        return value
+    if isinstance(value, list):
+        return ReadOnlyList(value)
+    if isinstance(value, dict):
+        return ReadOnlyDict(value)
+    if isinstance(value, VIEWED_CLASSES):
+        return ReadOnlyView(value)
+    return value
+
+
+def get_wrapped(value):
+    return object.__getattribute__(value, "wrapped") if type(value) in (ReadOnlyView, ReadOnlyList, ReadOnlyDict) \
+        else value
+
+
+def get_section_owner(snapshot, name: str):
+    # Skip the frozen ancestors that never needed their own copy.
+    while name not in vars(snapshot) and getattr(snapshot, "parent", None) is not None:
+        snapshot = snapshot.parent
+    return snapshot
+
+
+def read_section(simulation, name: str):
+    """
+    The section as the simulation sees it, without making it copy one it doesn't own; only for reading.
+    """
+    owner = get_section_owner(simulation, name)
+    value = getattr(owner, name)
+    return value if owner is simulation or undo_log.is_recording() else read_only(value)
+
+
+class CopyOnWriteSection:
+    """
+    Simulation attribute shared with the snapshot the simulation was made from.
+    A simulation gets its private copy on first access, as it is about to be changed;
+    code that only reads a section it may not own goes through read_section instead.
+    Once other simulations have been made from it, a simulation is frozen: it never
+    copies anything anymore and hands out read-only views of what the snapshot owning the object shares.
+    The copy is stored on the instance, so later reads don't go through here at all.
+    While the undo log records, nothing is copied: the simulation changes the shared object and gets rolled back.
+    """
+    name: str
+    copier: Callable[[Any, Any], Any]
+
+    def __init__(self, copier: Callable[[Any, Any], Any]):
+        self.copier = copier
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        source = get_section_owner(instance.parent, self.name)
+        value = getattr(source, self.name)
+        if instance.frozen:
+            return read_only(value)
+        if undo_log.is_recording():
+            setattr(instance, self.name, value)
+            return value
+        value = self.copier(value, source)
+        setattr(instance, self.name, value)
+        return value
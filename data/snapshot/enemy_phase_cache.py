@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Tuple, List, Dict
+
+from data.game_stats import GameStats
+from data.room.room_battle import BattleRoom
+from data.snapshot.copy_on_write import get_section_owner
+from data.snapshot.state_hash import get_state_hash
+from data.snapshot.undo_log import undo_log
+from data.weapon.weapon import Weapon
+from history.history_room import CorruptedWave
+from logger import logger, Message, LogType
+
+# Off unless asked for: hashing every state and keeping the entries costs about what the reuse saves.
+DEFAULT_CAPACITY = 0
+
+
+class EnemyPhaseResult:
+    """
+    Everything the enemy phase changes. Simulations are only compared once their enemies are done,
+    so the objects are shared with the simulation they were computed for instead of copied.
+    Every hit gets its own copy, nothing it does reaches the entry.
+    """
+    game_stats: GameStats
+    hero_deck: List[Weapon]
+    room: BattleRoom
+    hero_attack_queue: List[Weapon]
+    traps: Dict[int, int]
+    thorns: Dict[int, Weapon]
+    bombs: Dict[int, List[List[int]]]
+    corrupted_waves: List[CorruptedWave]
+    combo_started: bool
+    summons: int  # added during the phase
+    enemies_cleared: bool
+    new_potions: int  # added during the phase
+    allow_more_coins: bool
+    messages: List[Message]
+
+    def __init__(self, simulation, summons: int, new_potions: int, messages: List[Message]):
+        # Read without making the simulation copy what the enemies left untouched.
+        self.game_stats = get_section(simulation, "game_stats")
+        self.hero_deck = get_section(simulation, "hero_deck")
+        self.room = get_section(simulation, "room")
+        self.hero_attack_queue = self.room.hero.attack_queue
+        room_history = simulation.history.room
+        self.traps = room_history.traps
+        self.thorns = room_history.thorns
+        self.bombs = room_history.bombs
+        self.corrupted_waves = room_history.corrupted_waves
+        predictions = simulation.predictions
+        self.combo_started = predictions.combo_started
+        self.summons = summons
+        self.enemies_cleared = predictions.enemies_cleared
+        self.new_potions = new_potions
+        self.allow_more_coins = predictions.allow_more_coins
+        self.messages = messages
+
+    def apply(self, simulation) -> None:
+        simulation.game_stats = self.game_stats.clone()
+        simulation.hero_deck = [weapon.clone() for weapon in self.hero_deck]
+        simulation.room = self.room.clone()
+        simulation.room.hero.attack_queue = [weapon.clone() for weapon in self.hero_attack_queue]
+        room_history = simulation.history.room
+        room_history.traps = self.traps.copy()
+        room_history.thorns = {cell: weapon.clone() for cell, weapon in self.thorns.items()}
+        room_history.bombs = {cell: [bomb[:] for bomb in bombs] for cell, bombs in self.bombs.items()}
+        room_history.corrupted_waves = [wave.clone() for wave in self.corrupted_waves]
+        predictions = simulation.predictions
+        predictions.combo_started = self.combo_started
+        predictions.summons += self.summons
+        predictions.enemies_cleared = self.enemies_cleared
+        predictions.new_potions += self.new_potions
+        predictions.allow_more_coins = self.allow_more_coins
+        logger.queue_messages(self.messages)
+
+
+def get_section(simulation, name: str):
+    return getattr(get_section_owner(simulation, name), name)
+
+
+class EnemyPhaseCache:
+    """
+    Transposition table of the enemy phase: many hero actions hand the enemies the same board,
+    it only gets resolved once. Keyed by the state hash and whatever else the phase reads.
+    Least recently used entries go first once full.
+    """
+    capacity: int  # 0 disables the cache
+    entries: "OrderedDict[Tuple, EnemyPhaseResult]"
+    lock: Lock  # the speculator simulates in the background
+    hits: int
+    misses: int
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_usable(self, simulation) -> bool:
+        if not self.capacity or undo_log.is_recording():
+            return False
+        # Bomb timers are shared with the parent's history, so the phase is not a function of the state alone.
+        return not get_section(simulation, "history").room.bombs
+
+    def get_key(self, simulation, previous_hero_cell: int) -> Tuple:
+        predictions = simulation.predictions
+        # Phases resolved without logging have no messages to replay.
+        return (get_state_hash(simulation), previous_hero_cell, predictions.combo_started,
+                predictions.allow_more_coins, simulation.skills, logger.is_queued(LogType.DEBUG))
+
+    def simulate(self, simulation, previous_hero_cell: int) -> None:
+        if not self.is_usable(simulation):
+            simulation.resolve_enemies(previous_hero_cell)
+            return
+        key = self.get_key(simulation, previous_hero_cell)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if result is not None:
+            result.apply(simulation)
+            return
+
+        predictions = simulation.predictions
+        summons = predictions.summons
+        new_potions = predictions.new_potions
+        first_message = len(logger.queue)
+        simulation.resolve_enemies(previous_hero_cell)
+        result = EnemyPhaseResult(
+            simulation=simulation,
+            summons=predictions.summons - summons,
+            new_potions=predictions.new_potions - new_potions,
+            messages=logger.queue[first_message:],
+        )
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = result
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries = OrderedDict()
+
+    def pretty_print(self) -> str:
+        return f"Enemy phases reused: {self.hits}, resolved: {self.misses}"
+
+
+enemy_phase_cache = EnemyPhaseCache()
@@ -0,0 +1,47 @@
+from typing import Dict, List, Tuple
+
+from data.snapshot.snapshot import Snapshot
+
+
+def get_fingerprint(snapshot: Snapshot) -> Tuple:
+    """
+    Everything is_good_prediction requires to be exactly equal; values compared with any tolerance are left out.
+    So equal fingerprints are necessary for a good prediction, but not sufficient.
+    """
+    game_stats = snapshot.game_stats
+    room = snapshot.room
+    hero = room.hero
+    return (
+        snapshot.game_phase,
+        game_stats.combos,
+        game_stats.turns,
+        game_stats.combat_rooms_cleared,
+        game_stats.friendly_kills,
+        game_stats.hits,
+        game_stats.consumables_used,
+        room.room,
+        room.progression,
+        hero.entity_type,
+        hero.hero_id,
+        hero.state.shield,
+        hero.state.curse,
+        hero.state.ice,
+        hero.state.poison,
+        hero.position.cell,
+        hero.position.facing,
+        hero.hp.hp,
+        hero.hp.max_hp,
+    )
+
+
+class PredictionIndex:
+    buckets: Dict[Tuple, List[Snapshot]]
+
+    def __init__(self):
+        self.buckets = {}
+
+    def add(self, simulation: Snapshot) -> None:
+        self.buckets.setdefault(get_fingerprint(simulation), []).append(simulation)
+
+    def candidates(self, actual_snapshot: Snapshot) -> List[Snapshot]:
+        return self.buckets.get(get_fingerprint(actual_snapshot), [])
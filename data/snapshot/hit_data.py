@@ -1,4 +1,5 @@
 class HitData:
+    __slots__ = ("hits", "targets_hit", "kills")
     hits: int
     targets_hit: int
     kills: int
@@ -0,0 +1,40 @@
+from typing import Callable, Any, Tuple
+
+from data.snapshot.section_cache import section_cache
+
+
+class LazySection:
+    """
+    Snapshot attribute decoded from the raw save data on first access.
+    Assigning to it (e.g. when building a Simulation) skips decoding altogether.
+    If the raw sections it comes from are named, an unchanged section reuses
+    the object built for the previous snapshot instead.
+    """
+    name: str
+    loader: Callable[[Any], Any]
+    raw_sections: Tuple[str, ...]
+
+    def __init__(self, loader: Callable[[Any], Any], *raw_sections: str):
+        self.loader = loader
+        self.raw_sections = raw_sections
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        decoded = instance.decoded
+        if self.name not in decoded:
+            decoded[self.name] = self.load(instance)
+        return decoded[self.name]
+
+    def __set__(self, instance, value):
+        instance.decoded[self.name] = value
+
+    def load(self, instance) -> Any:
+        digests = instance.section_digests
+        if not self.raw_sections or digests is None:
+            return self.loader(instance)
+        key = tuple(digests.get(section, "") for section in self.raw_sections)
+        return section_cache.get(self.name, key, lambda: self.loader(instance))
@@ -1,5 +1,4 @@
-from itertools import permutations, combinations
-from typing import List
+from typing import List, Optional, Dict, Tuple
 
 from data.weapon.weapon import Weapon
 
@@ -23,33 +22,49 @@ def get_attack_queue_plus_immediates(attack_queue: List[Weapon], hero_deck: List
     return potential_weapons
 
 
+def get_distinct_orders(weapons: List[Weapon], max_length: int,
+                        required: Optional[Weapon] = None) -> List[List[Weapon]]:
+    """
+    Every order of 1 to max_length of the weapons, shortest first; with the required one in it, if any.
+    Equal weapons are interchangeable, so each order comes once however many copies there are.
+    """
+    counts: Dict[Tuple, int] = {}
+    representatives: Dict[Tuple, Weapon] = {}
+    for weapon in weapons:
+        key = weapon.get_key()
+        counts[key] = counts.get(key, 0) + 1
+        representatives.setdefault(key, weapon)
+    required_key = required.get_key() if required is not None else None
+    orders = []
+
+    def extend(order: List[Weapon], length: int, has_required: bool) -> None:
+        if len(order) == length:
+            if has_required:
+                orders.append(order[:])
+            return
+        for key, count in counts.items():
+            if not count:
+                continue
+            counts[key] -= 1
+            order.append(representatives[key])
+            extend(order, length, has_required or key == required_key)
+            order.pop()
+            counts[key] += 1
+
+    for length in range(1, max_length + 1):
+        extend([], length, required is None)
+    return orders
+
+
 def permutate_possible_attack_queues(attack_queue: List[Weapon], hero_deck: List[Weapon]) -> List[List[Weapon]]:
     potential_weapons = get_attack_queue_plus_immediates(attack_queue, hero_deck)
     max_queue_length = min(len(potential_weapons), 3)
-    possible_queues = [[]]
-    # Pick i (from 1 to max) items
-    for i in range(max_queue_length):
-        possible_queues.extend(permutations(potential_weapons, i + 1))
-    return possible_queues
+    return [[]] + get_distinct_orders(potential_weapons, max_queue_length)
 
 
 def permutate_possible_attack_queues_with_new_weapon(attack_queue: List[Weapon], hero_deck: List[Weapon],
                                                      new_weapon: Weapon) -> List[List[Weapon]]:
     potential_weapons = get_attack_queue_plus_immediates(attack_queue, hero_deck)
-    max_queue_length = min(len(potential_weapons), 2)
-    possible_queues_without: List[List[Weapon]] = [[]]
-    # Pick i (from 1 to max) items
-    for i in range(max_queue_length):
-        perms = combinations(potential_weapons, i + 1)
-        for perm in perms:
-            possible_queues_without.append(perm)
-    possible_queues: List[List[Weapon]] = []  # empty one is already here from previous
-    for queue in possible_queues_without:
-        queue_with = []
-        for weapon in queue:
-            queue_with.append(weapon)
-        queue_with.append(new_weapon)
-        perms = permutations(queue_with, len(queue_with))
-        for perm in perms:
-            possible_queues.append(perm)
-    return possible_queues
+    # Up to two of the others together with the new one, in any order.
+    max_queue_length = min(len(potential_weapons), 2) + 1
+    return get_distinct_orders(potential_weapons + [new_weapon], max_queue_length, required=new_weapon)
@@ -0,0 +1,73 @@
+from typing import List, Optional, Dict, Set
+
+from data.weapon.weapon import Weapon
+
+
+class PotentialDeck:
+    """
+    The decks the hero may have after executing the queue: every used tile went back to one of the deck slots of its
+    kind, in queue order, so a later tile covers an earlier one put in the same slot.
+    Rather than listing every such deck, the used tiles are assigned to slots against the actual deck, see match.
+    """
+    recharged_deck: List[Weapon]  # no tile put back, every slot charged one more
+    used_weapons: List[Weapon]  # in the order they were executed
+    slots: List[List[int]]  # per used weapon, the slots it can go back to
+
+    def __init__(self, recharged_deck: List[Weapon], used_weapons: List[Weapon], slots: List[List[int]]):
+        self.recharged_deck = recharged_deck
+        self.used_weapons = used_weapons
+        self.slots = slots
+
+    def match(self, actual_deck: List[Weapon]) -> Optional[List[Weapon]]:
+        """
+        A potential deck equal to the actual one, None if there is none.
+        Tiles of a kind share their slots, and only the last of them is sure to stay where it went: the others can
+        hide under it. So a kind checks out when the last tile and some of the others fill distinct slots, covering
+        at least every slot where the recharged tile is not the actual one; a bipartite matching of tiles to slots.
+        """
+        if len(actual_deck) != len(self.recharged_deck):
+            return None
+        deck = self.recharged_deck[:]
+        kinds: Dict[int, List[int]] = {}  # first used index of a kind: every used index of it
+        for index, weapon in enumerate(self.used_weapons):
+            first = next(other for other in range(index + 1) if self.used_weapons[other].is_same_tile(weapon))
+            kinds.setdefault(first, []).append(index)
+        for indices in kinds.values():
+            assignment = self.match_kind(indices, actual_deck)
+            if assignment is None:
+                return None
+            for slot, index in assignment.items():
+                deck[slot] = self.used_weapons[index]
+        # Slots no tile went back to stay recharged.
+        return deck if Weapon.is_list_equal(actual_deck, deck) else None
+
+    def match_kind(self, indices: List[int], actual_deck: List[Weapon]) -> Optional[Dict[int, int]]:
+        slots = self.slots[indices[0]]
+        forced = [slot for slot in slots if not self.recharged_deck[slot].is_equal(actual_deck[slot])]
+        last = indices[-1]
+        for last_slot in slots:
+            if not self.used_weapons[last].is_equal(actual_deck[last_slot]):
+                continue
+            assignment = {last_slot: last}  # slot: used index
+            slot_of = {}  # used index: slot, for the others
+            if all(slot == last_slot or self.assign(slot, indices[:-1], actual_deck, assignment, slot_of, set())
+                   for slot in forced):
+                return assignment
+        return None
+
+    def assign(self, slot: int, indices: List[int], actual_deck: List[Weapon], assignment: Dict[int, int],
+               slot_of: Dict[int, int], visited: Set[int]) -> bool:
+        # Augmenting path, a tile already placed may move to another slot to make room.
+        for index in indices:
+            if index in visited or not self.used_weapons[index].is_equal(actual_deck[slot]):
+                continue
+            visited.add(index)
+            if index not in slot_of or self.assign(slot_of[index], indices, actual_deck, assignment, slot_of, visited):
+                slot_of[index] = slot
+                assignment[slot] = index
+                return True
+        return False
+
+    def debug_print(self) -> str:
+        return f"{Weapon.debug_print_list(self.recharged_deck)} with {Weapon.debug_print_list(self.used_weapons)} " \
+               f"put back"
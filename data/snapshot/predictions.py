@@ -1,12 +1,13 @@
-from typing import List
+from typing import List, Optional
 
+from data.snapshot.potential_deck import PotentialDeck
 from data.weapon.weapon import Weapon
 from history.potions.history_potions import PotionSimulation
 
 
 class Predictions:
     potential_hero_attack_queues: List[List[Weapon]]
-    potential_hero_decks: List[List[Weapon]]
+    potential_hero_deck: Optional[PotentialDeck]
     combo_started: bool
     summons: int
     enemies_cleared: bool
@@ -17,7 +18,7 @@ class Predictions:
 
     def __init__(self,
                  potential_hero_attack_queues: List[List[Weapon]] = None,
-                 potential_hero_decks: List[List[Weapon]] = None,
+                 potential_hero_deck: Optional[PotentialDeck] = None,
                  combo_started: bool = None,
                  summons: int = 0,
                  enemies_cleared: bool = False,
@@ -27,7 +28,7 @@ class Predictions:
                  potion_simulation: PotionSimulation = None,
                  ):
         self.potential_hero_attack_queues = potential_hero_attack_queues or []
-        self.potential_hero_decks = potential_hero_decks or []
+        self.potential_hero_deck = potential_hero_deck
         self.combo_started = combo_started
         self.summons = summons
         self.enemies_cleared = enemies_cleared
@@ -40,7 +41,7 @@ class Predictions:
         # The weapons in here won't be interacted with, so don't need cloning.
         return Predictions(
             potential_hero_attack_queues=self.potential_hero_attack_queues,
-            potential_hero_decks=self.potential_hero_decks,
+            potential_hero_deck=self.potential_hero_deck,
             combo_started=self.combo_started,
             summons=self.summons,
             enemies_cleared=self.enemies_cleared,
@@ -0,0 +1,42 @@
+import hashlib
+import json
+from typing import Dict, Set, Optional
+
+
+def get_digest(source: bytes) -> str:
+    return hashlib.blake2b(source, digest_size=16).hexdigest()
+
+
+def get_section_digests(raw_data: Dict) -> Dict[str, str]:
+    return {
+        section: get_digest(json.dumps(value, sort_keys=True, separators=(',', ':')).encode())
+        for section, value in raw_data.items()
+    }
+
+
+class SavePayload:
+    digest: str
+    raw_data: Dict
+    section_digests: Dict[str, str]
+    changed_sections: Set[str]
+
+    def __init__(self,
+                 digest: str,
+                 raw_data: Dict,
+                 previous: Optional['SavePayload'] = None,
+                 ):
+        self.digest = digest
+        self.raw_data = raw_data
+        self.section_digests = get_section_digests(raw_data)
+        if previous is None:
+            self.changed_sections = set(self.section_digests.keys())
+        else:
+            self.changed_sections = {
+                section for section, digest in self.section_digests.items()
+                if previous.section_digests.get(section) != digest
+            }
+            # Sections which disappeared count as changed too.
+            self.changed_sections.update(set(previous.section_digests.keys()) - set(self.section_digests.keys()))
+
+    def has_changed(self, *sections: str) -> bool:
+        return not self.changed_sections.isdisjoint(sections)
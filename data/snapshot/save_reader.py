@@ -0,0 +1,91 @@
+import base64
+import binascii
+import json
+import os
+from json import JSONDecodeError
+from time import sleep, perf_counter
+from typing import Dict, Optional, Tuple
+
+from data.snapshot.save_payload import SavePayload, get_digest
+from data.snapshot.torn_save_error import TornSaveError
+from logger import logger
+
+
+class SaveReader:
+    settle_window: float
+    max_attempts: int
+    initial_backoff: float
+    max_backoff: float
+    total_reads: int
+    torn_reads: int
+    duplicate_reads: int
+    last_payload: Optional[SavePayload]
+
+    def __init__(self,
+                 settle_window: float = 0.01,
+                 max_attempts: int = 8,
+                 initial_backoff: float = 0.02,
+                 max_backoff: float = 0.5,
+                 ):
+        self.settle_window = settle_window
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.total_reads = 0
+        self.torn_reads = 0
+        self.duplicate_reads = 0
+        self.last_payload = None
+
+    @staticmethod
+    def get_signature(filename: str) -> Tuple[int, int]:
+        stat = os.stat(filename)
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self, filename: str) -> Optional[SavePayload]:
+        """
+        Returns None if the file holds exactly what was read last time.
+        Duplicates are dropped before any decoding happens.
+        """
+        backoff = self.initial_backoff
+        for attempt in range(self.max_attempts):
+            duplicate, payload = self.try_read(filename)
+            if duplicate:
+                self.duplicate_reads += 1
+                return None
+            if payload is not None:
+                self.total_reads += 1
+                self.last_payload = payload
+                return payload
+            self.torn_reads += 1
+            logger.debug_error(f"Read of the file occured as it was being written to "
+                               f"(attempt {attempt + 1}/{self.max_attempts})")
+            sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+        raise TornSaveError(f"Could not get a complete read of {filename} in {self.max_attempts} attempts")
+
+    def try_read(self, filename: str) -> Tuple[bool, Optional[SavePayload]]:
+        started = perf_counter()
+        signature = self.get_signature(filename)
+        with open(filename, mode='rb') as source_file:
+            source = source_file.read()
+        digest = get_digest(source)
+        if self.last_payload is not None and self.last_payload.digest == digest:
+            return True, None
+        try:
+            raw_data = json.loads(base64.b64decode(source))
+        except (JSONDecodeError, binascii.Error, UnicodeDecodeError):
+            return False, None
+        # Only trust the read if nobody touched the file during the whole settle window.
+        remaining = self.settle_window - (perf_counter() - started)
+        if remaining > 0:
+            sleep(remaining)
+        if self.get_signature(filename) != signature:
+            return False, None
+        return False, SavePayload(digest=digest, raw_data=raw_data, previous=self.last_payload)
+
+    def pretty_print(self) -> str:
+        return f"Save file reads: {self.total_reads}, torn reads: {self.torn_reads}, " \
+               f"unchanged rewrites skipped: {self.duplicate_reads}"
+
+
+save_reader = SaveReader()
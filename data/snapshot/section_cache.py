@@ -0,0 +1,35 @@
+from typing import Dict, Tuple, Callable, Any
+
+
+class SectionCache:
+    """
+    Remembers the last object built for every snapshot section, keyed by the digests
+    of the raw save sections it was decoded from. Byte-identical sections are not rebuilt.
+    """
+    entries: Dict[str, Tuple[Tuple[str, ...], Any]]
+    hits: int
+    misses: int
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, key: Tuple[str, ...], loader: Callable[[], Any]) -> Any:
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = loader()
+        self.entries[name] = (key, value)
+        return value
+
+    def clear(self) -> None:
+        self.entries = {}
+
+    def pretty_print(self) -> str:
+        return f"Snapshot sections reused: {self.hits}, rebuilt: {self.misses}"
+
+
+section_cache = SectionCache()
@@ -1,9 +1,8 @@
 from typing import List, Optional, Dict
 
-from data.entity.construct_entity import EntityConstructor
 from data.entity.enemy import Enemy
 from data.entity.entity import Entity
-from data.entity.entity_enums import EnemyActionEnum, HeroEnum, EntityType, EnemyEnum
+from data.entity.entity_enums import EnemyActionEnum, HeroEnum, EnemyEnum
 from data.entity.hero import Hero
 from data.game_stats import GameStats
 from data.other_enums import GamePhase
@@ -13,19 +12,33 @@ from data.room.room_reward import RewardRoom
 from data.shop.room_shop import ShopRoom
 from data.skill.skill_enums import SkillEnum
 from data.skill.skills import Skills
+from data.snapshot.copy_on_write import CopyOnWriteSection, read_section
+from data.snapshot.enemy_phase_cache import enemy_phase_cache
 from data.snapshot.hit_data import HitData
 from data.snapshot.permutate_queues import permutate_possible_attack_queues_with_new_weapon
+from data.snapshot.potential_deck import PotentialDeck
 from data.snapshot.prediction_error import PredictionError
 from data.snapshot.predictions import Predictions
 from data.snapshot.snapshot import Snapshot
+from data.snapshot.weapon_registry import get_weapon_handler
 from data.weapon.weapon import Weapon
 from data.weapon.weapon_enums import WeaponEnum, WeaponAttackEffectEnum
+from history.history import History
 from history.potions.history_potions import PotionSimulation
 from logger import logger
 
 
 class Simulation(Snapshot):
+    # Only copied once a simulation actually uses them.
+    game_stats: GameStats = CopyOnWriteSection(lambda game_stats, source: game_stats.clone())
+    hero_deck: List[Weapon] = CopyOnWriteSection(lambda hero_deck, source: [weapon.clone() for weapon in hero_deck])
+    hero_potion_ids: List[int] = CopyOnWriteSection(lambda hero_potion_ids, source: hero_potion_ids[:])
+    room: BattleRoom = CopyOnWriteSection(lambda room, source: room.clone())
+    history: History = CopyOnWriteSection(lambda history, source: history.clone(source))
     predictions: Predictions
+    parent: Optional[Snapshot]  # None unless made with Simulation.of
+    frozen: bool
+    state_hashes: Dict[str, int]  # section: its hash, only kept once frozen, see get_state_hash
 
     def __init__(self,
                  skills: Skills,
@@ -49,20 +62,27 @@ class Simulation(Snapshot):
         )
         self.predictions = predictions or Predictions()
 
+    def init_lazy(self, raw_data: Optional[Dict]) -> None:
+        self.parent = None
+        self.frozen = False
+        self.state_hashes = {}
+        super().init_lazy(raw_data)
+
     @staticmethod
     def of(snapshot: Snapshot, predictions: Optional[Predictions] = None):
-        simulation = Simulation(
-            skills=snapshot.skills,  # can be copied, cannot change during battle
-            game_stats=snapshot.game_stats.clone(),  # reconstructed
-            hero_deck=[weapon.clone() for weapon in snapshot.hero_deck],  # reconstructed
-            hero_potion_ids=snapshot.hero_potion_ids[:],  # reconstructed
-            game_phase=snapshot.game_phase,  # can be copied, cannot change during battle
-            room=snapshot.room.clone(),  # reconstructed
-            shop=snapshot.shop,  # can be copied, cannot change during battle
-            reward=snapshot.reward,  # can be copied, cannot change during battle
-            predictions=predictions.clone() if predictions is not None else None,
-        )
-        simulation.history = snapshot.history.clone(snapshot)
+        simulation = Simulation.__new__(Simulation)
+        simulation.init_lazy(None)
+        simulation.parent = snapshot
+        simulation.skills = snapshot.skills  # can be copied, cannot change during battle
+        simulation.game_phase = snapshot.game_phase  # can be copied, cannot change during battle
+        simulation.shop = snapshot.shop  # can be copied, cannot change during battle
+        simulation.reward = snapshot.reward  # can be copied, cannot change during battle
+        # Game stats, deck, potions, room and history get copied on first use, see CopyOnWriteSection.
+        del simulation.history
+        simulation.predictions = predictions.clone() if predictions is not None else Predictions()
+        if isinstance(snapshot, Simulation):
+            # Its children rely on it not changing anymore.
+            snapshot.frozen = True
         return simulation
 
     # def clone_simulation(self):
@@ -82,7 +102,7 @@ class Simulation(Snapshot):
 
     def apply_potion_simulation(self, potion_simulation: PotionSimulation):
         for used in potion_simulation.used:
-            logger.queue_debug_text(f"applying potion {used}")
+            logger.queue_debug_text(lambda: f"applying potion {used}")
             self.game_stats.consumables_used += 1
             if used == PickupEnum.EDAMAME_BREW:
                 self.room.hero.hp.hp = min(self.room.hero.hp.hp+3, self.room.hero.hp.max_hp)
@@ -135,7 +155,7 @@ class Simulation(Snapshot):
     @staticmethod
     def simulation_move(snapshot: Snapshot, predictions: Optional[Predictions], new_cell: int):
         # Are there enemies there? (Specials handled separately!)
-        if len(snapshot.room.find_targets([new_cell])) > 0:
+        if snapshot.room.is_occupied(new_cell):
             return None
         # All good, let's go.
         # logger.debug_info(f"BEFORE MOVE SIMULATION - ENEMIES:")
@@ -218,12 +238,7 @@ class Simulation(Snapshot):
     @staticmethod
     def simulation_execute_queue_internal(snapshot: Snapshot, attack_queue: List[Weapon], previous_hero_cell: int,
                                           turn: bool):
-        # Prepare simulation.
-        simulation = Simulation.of(snapshot)
-        # Turn if needed.
-        if turn:
-            simulation.room.hero.position.flip()
-            simulation.game_stats.turn_arounds += 1
+        simulation = Simulation.simulation_start_queue(snapshot, turn)
         # Execute the queue.
         attack_queue = [weapon.clone() for weapon in attack_queue]
         for weapon in attack_queue:
@@ -232,278 +247,56 @@ class Simulation(Snapshot):
                 weapon=weapon,
                 previous_hero_cell=previous_hero_cell,
             )
-        # Permutate possible deck arrangements after weapon usage.
-        possible_deck_weapons_used = {}
-        for index, weapon in enumerate(attack_queue):
+        simulation.finish_queue(attack_queue)
+        return simulation
+
+    @staticmethod
+    def simulation_start_queue(snapshot: Snapshot, turn: bool):
+        # Prepare simulation.
+        simulation = Simulation.of(snapshot)
+        # Turn if needed.
+        if turn:
+            simulation.room.hero.position.flip()
+            simulation.game_stats.turn_arounds += 1
+        return simulation
+
+    def finish_queue(self, attack_queue: List[Weapon]) -> None:
+        """
+        Wrap up the turn once the weapons of the queue, clones executed in order, went off.
+        """
+        # Where each used weapon may have gone back to, see PotentialDeck.
+        hero_deck = read_section(self, "hero_deck")
+        slots = []
+        for weapon in attack_queue:
             possible_deck_indices = []
-            for deck_index, deck_weapon in enumerate(simulation.hero_deck):
+            for deck_index, deck_weapon in enumerate(hero_deck):
                 if deck_weapon.is_same_tile(weapon):
                     possible_deck_indices.append(deck_index)
             if not len(possible_deck_indices):
                 raise PredictionError(f"Could not find the tile corresponding to {weapon.pretty_print()} in the deck")
-            possible_deck_weapons_used[index] = possible_deck_indices
-        simulated_decks = [[weapon.clone() for weapon in simulation.hero_deck]]
-        for weapon in simulated_decks[0]:
+            slots.append(possible_deck_indices)
+        recharged_deck = [weapon.clone() for weapon in hero_deck]
+        for weapon in recharged_deck:
             if weapon.cooldown_charge < weapon.cooldown:
                 weapon.cooldown_charge += 1
-        for index, possible_deck_indices in possible_deck_weapons_used.items():
-            new_simulated_decks = []
-            for sim_deck in simulated_decks:
-                for pdi in possible_deck_indices:
-                    new_sim_deck = sim_deck[:]
-                    new_sim_deck[pdi] = attack_queue[index]
-                    new_simulated_decks.append(new_sim_deck)
-            simulated_decks = new_simulated_decks
+        potential_hero_deck = PotentialDeck(recharged_deck, attack_queue, slots)
         # Other considerations.
-        simulation.room.hero.attack_queue = []
-        simulation.simulate_passing_turn(skip_attack_queue=True)
-        simulation.predictions.potential_hero_decks = simulated_decks
-        return simulation
+        self.room.hero.attack_queue = []
+        self.simulate_passing_turn(skip_attack_queue=True)
+        self.predictions.potential_hero_deck = potential_hero_deck
 
     def execute_weapon(self, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
-        # SEPARATE LOGIC
-        if weapon.weapon_type == WeaponEnum.KUNAI:
-            return self.execute_kunai(attacker, weapon, previous_hero_cell)
-        elif weapon.weapon_type == WeaponEnum.HOOKBLADE:
-            # Sanity check.
-            if weapon.strength != weapon.base_strength:
-                raise ValueError(
-                    f"Hookblade's base strength isn't what I thought. Strength: {weapon.strength} base: {weapon.base_strength}")
-            return self.execute_hookblade(attacker, weapon, previous_hero_cell)
-        elif weapon.weapon_type == WeaponEnum.METEOR_HAMMER:
-            targets = [self.room.get_first_target_space_ahead_in_range(attacker, 3)]
-            hit_data = self.room.hit_entities(attacker, targets, weapon)
-            if hit_data.targets_hit > 0:
-                targets = attacker.position.get_spaces([-1])
-                hit_data2 = self.room.hit_entities(attacker, targets, weapon)
-                hit_data.merge(hit_data2)
-            return self.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
-        elif weapon.weapon_type == WeaponEnum.BLAZING_SUISEI:
-            targets = [self.room.get_first_target_space_ahead_in_range(attacker, 3)]
-            hit_data = self.room.hit_entities(attacker, targets, weapon)
-            killed = True in [enemy.hp.hp <= 0 for enemy in self.room.enemies]
-            if killed:
-                targets = [targets[0] - 1, targets[0] + 1]
-                hit_data2 = self.room.hit_entities(attacker, targets, Weapon.explosion(2))
-                hit_data.merge(hit_data2)
-            return self.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
-
-        hit_data = HitData.empty()
-        attacker_cell = attacker.position.cell
-        targets: Optional[List[int]] = None
-
-        # MELEE ATTACKS
-        if weapon.weapon_type in [WeaponEnum.KATANA, WeaponEnum.SAI, WeaponEnum.BO, WeaponEnum.TETSUBO,
-                                  WeaponEnum.BLADE_OF_PATIENCE, WeaponEnum.DRAGON_PUNCH]:
-            targets = attacker.position.get_spaces([1])
-        elif weapon.weapon_type == WeaponEnum.SPEAR:
-            targets = attacker.position.get_spaces([1, 2])
-        elif weapon.weapon_type == WeaponEnum.BACK_STRIKE:
-            targets = attacker.position.get_spaces([-1])
-        elif weapon.weapon_type in [WeaponEnum.SWIRL, WeaponEnum.TWIN_TESSEN]:
-            targets = attacker.position.get_spaces([-1, 1])
-        elif weapon.weapon_type == WeaponEnum.NAGIBOKU:
-            targets = attacker.position.get_spaces([-2, -1, 1, 2])
-
-        # RANGED ATTACKS
-        elif weapon.weapon_type in [WeaponEnum.ARROW, WeaponEnum.SHURIKEN, WeaponEnum.GRAPPLING_HOOK,
-                                    WeaponEnum.KI_PUSH, WeaponEnum.TANEGASHIMA]:
-            targets = [self.room.get_first_target_space_ahead(attacker)]
-        elif weapon.weapon_type == WeaponEnum.MON:
-            targets = [self.room.get_first_target_space_ahead(attacker)]
-            self.game_stats.coins -= 1
-        elif weapon.weapon_type == WeaponEnum.LIGHTINING:
-            targets = [self.room.get_last_target_space_ahead(attacker)]
-        elif weapon.weapon_type == WeaponEnum.EARTH_IMPALE:
-            targets = attacker.position.get_spaces([-2, 2])
-        elif weapon.weapon_type == WeaponEnum.SHADOW_KAMA:
-            targets = attacker.position.get_spaces([2])
-        elif weapon.weapon_type == WeaponEnum.CROSSBOW:
-            targets = self.room.get_crossbow_targets_spaces(attacker)
-        elif weapon.weapon_type == WeaponEnum.VOLLEY:
-            # enemy only! hero is always the target
-            targets = [previous_hero_cell]
-        elif weapon.weapon_type == WeaponEnum.CHAKRAM:
-            targets = self.room.get_first_target_spaces_around(attacker)
-            chakram_to_attack_with = weapon.clone()
-            weapon.strength = weapon.base_strength
-            hit_data = self.room.hit_entities(attacker, targets, chakram_to_attack_with,
-                                              simulate_move=self.simulate_move)
-
-        # GLOBAL ATTACKS
-        elif weapon.weapon_type == WeaponEnum.CORRUPTED_EXPLOSION:
-            targets = self.room.get_all_targets_cells()
-        elif weapon.weapon_type == WeaponEnum.SCAR_STRIKE:
-            targets = self.room.get_all_hurt_enemies_cells()
-
-        if targets is not None:
-            logger.queue_debug_text(f"{attacker.short_print()} attacking cells {targets} with {weapon.short_print()}")
-            hit_data = self.room.hit_entities(attacker, targets, weapon, simulate_move=self.simulate_move)
-            return self.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
-
-        # IN-MEMORY ATTACKS
-        elif weapon.weapon_type == WeaponEnum.CORRUPTED_WAVE_LTR:
-            self.history.room.spawn_corrupted_wave(cell=0, facing=1, strength=weapon.strength)
-        elif weapon.weapon_type == WeaponEnum.CORRUPTED_WAVE_RTL:
-            self.history.room.spawn_corrupted_wave(cell=self.room.board_size, facing=0, strength=weapon.strength)
-        elif weapon.weapon_type == WeaponEnum.CORRUPTED_BARRAGE:
-            self.history.room.spawn_corrupted_wave(cell=attacker.position.cell + 1, facing=1, strength=weapon.strength)
-            self.history.room.spawn_corrupted_wave(cell=attacker.position.cell - 1, facing=0, strength=weapon.strength)
-        elif weapon.weapon_type == WeaponEnum.TRAP:
-            targets = attacker.position.get_spaces([1])
-            if not self.room.is_legal_position(targets[0]):
-                pass
-            self.history.room.set_trap(targets[0], weapon.strength)
-        elif weapon.weapon_type == WeaponEnum.BOMB:
-            targets = attacker.position.get_spaces([1])
-            if not self.room.is_legal_position(targets[0]):
-                pass
-            self.history.room.add_bomb(targets[0], weapon.strength)
-
-        # MOVE
-        elif weapon.weapon_type == WeaponEnum.MIRROR:
-            hit_data = self.simulate_swap(attacker, self.room.board_size - attacker.position.cell - 1,
-                                          target_required=False, flip_targets=True)
-        elif weapon.weapon_type == WeaponEnum.DASH:
-            target_cell = self.room.get_last_free_space_ahead(attacker)
-            hit_data = self.simulate_move(attacker, target_cell, dash=True)
-        elif weapon.weapon_type == WeaponEnum.SWAP_TOSS:
-            if not self.room.is_edge_space(attacker_cell):
-                target1 = self.room.find_targets([attacker_cell - 1])
-                target2 = self.room.find_targets([attacker_cell + 1])
-                if (not len(target1) or not target1[0].is_heavy()) and (not len(target2) or not target2[0].is_heavy()):
-                    if len(target1):
-                        hit_data2 = self.simulate_move(target1[0], attacker_cell + 1)
-                        hit_data.merge(hit_data2)
-                    if len(target2):
-                        hit_data2 = self.simulate_move(target2[0], attacker_cell - 1)
-                        hit_data.merge(hit_data2)
-        elif weapon.weapon_type == WeaponEnum.ORIGIN_OF_SYMMETRY:
-            hit_data = self.simulate_swap(attacker, (self.room.board_size - 1) // 2, target_required=False)
-        elif weapon.weapon_type == WeaponEnum.BOSS_SWAP:
-            the_boss_cell = self.room.get_the_boss().position.cell
-            hit_data = self.simulate_swap(attacker, the_boss_cell)
-
-        # MOVE AND ATTACK
-        elif weapon.weapon_type == WeaponEnum.SHARP_TURN:
-            targets = attacker.position.get_spaces([-1, 1])
-            hit_data = self.room.hit_entities(attacker, targets, weapon)
-            attacker.position.flip()
-            if attacker.entity_type == EntityType.HERO:
-                self.game_stats.turn_arounds += 1
-        elif weapon.weapon_type == WeaponEnum.CHARGE:
-            target_cell = self.room.get_last_free_space_ahead(attacker)
-            logger.queue_debug_text(f"move to cell {target_cell}")
-            hit_data = self.simulate_move(attacker, target_cell, dash=True)
-            if attacker.hp.hp > 0:
-                target = attacker.position.get_spaces([1])
-                logger.queue_debug_text(f"attack cell {target}")
-                hit_data2 = self.room.hit_entities(attacker, target, weapon)
-                logger.queue_debug_text(f"hits {hit_data.hits}")
-                hit_data.merge(hit_data2)
-        elif weapon.weapon_type == WeaponEnum.BACK_CHARGE:
-            target_cell = self.room.get_last_free_space_behind(attacker)
-            hit_data = self.simulate_move(attacker, target_cell, dash=True)
-            if attacker.hp.hp > 0:
-                targets = attacker.position.get_spaces([-1])
-                hit_data2 = self.room.hit_entities(attacker, targets, weapon)
-                hit_data.merge(hit_data2)
-        elif weapon.weapon_type == WeaponEnum.SHADOW_DASH:
-            direct_targets, shock_targets = self.room.find_connected_targets(
-                attacker,
-                [self.room.get_first_target_space_ahead(attacker)],
-            )
-            all_targets: List[int] = direct_targets + shock_targets
-            logger.queue_debug_text(f"all targets: {all_targets}")
-            if len(all_targets):
-                if attacker.position.facing == 1:
-                    new_cell = max(all_targets) + 1
-                else:
-                    new_cell = min(all_targets) - 1
-                if self.room.is_legal_position(new_cell):
-                    hit_data = self.simulate_move(attacker, new_cell, dash=True)
-                    hit_data2 = self.room.hit_entities(attacker, all_targets, weapon)
-                    hit_data.merge(hit_data2)
-        elif weapon.weapon_type == WeaponEnum.BACK_SHADOW_DASH:
-            direct_targets, shock_targets = self.room.find_connected_targets(
-                attacker,
-                [self.room.get_first_target_space_behind(attacker)],
-            )
-            all_targets: List[int] = direct_targets + shock_targets
-            if len(all_targets):
-                if attacker.position.facing == 1:
-                    new_cell = min(all_targets) - 1
-                else:
-                    new_cell = max(all_targets) + 1
-                if self.room.is_legal_position(new_cell):
-                    hit_data = self.simulate_move(attacker, new_cell, dash=True)
-                    hit_data2 = self.room.hit_entities(attacker, all_targets, weapon)
-                    hit_data.merge(hit_data2)
-        elif weapon.weapon_type == WeaponEnum.SMOKE_BOMB:
-            target = self.room.get_first_target_space_ahead(attacker)
-            target_entity = self.room.find_targets([target])
-            if len(target_entity) and not target_entity[0].is_heavy():
-                hit_data = self.simulate_swap(attacker, target)
-                hit_data2 = self.room.hit_entities(attacker, [target], weapon)
-                hit_data.merge(hit_data2)
-        elif weapon.weapon_type == WeaponEnum.BACK_SMOKE_BOMB:
-            target = self.room.get_first_target_space_behind(attacker)
-            target_entity = self.room.find_targets([target])
-            if len(target_entity) and not target_entity[0].is_heavy():
-                hit_data = self.simulate_swap(attacker, target)
-                hit_data2 = self.room.hit_entities(attacker, [target], weapon)
-                hit_data.merge(hit_data2)
-
-        # SUMMONS
-        elif weapon.weapon_type == WeaponEnum.BOSS_SUMMON:
-            self.predictions.summons += 1
-            pass
-        elif weapon.weapon_type == WeaponEnum.THORNS:
-            targets = attacker.position.get_spaces([1])
-            target_entity = self.room.find_targets(targets)
-            if len(target_entity) or not self.room.is_legal_position(targets[0]):
-                pass
-            self.room.enemies.append(EntityConstructor.thorns(targets[0]))
-            self.history.room.summon_thorns(targets[0], weapon.clone())
-        elif weapon.weapon_type == WeaponEnum.BARRICADE:
-            targets = attacker.position.get_spaces([1])
-            target_entity = self.room.find_targets(targets)
-            if len(target_entity) or not self.room.is_legal_position(targets[0]):
-                pass
-            self.room.enemies.append(EntityConstructor.barricade(targets[0]))
-
-        # OTHER
-        elif weapon.weapon_type == WeaponEnum.MAKU:
-            # TODO: allow this to happen, ensure this causes "too many enemies" error
-            logger.queue_debug_error("Make i.e. scene change, WTF is going to happen?")
-            pass
-        elif weapon.weapon_type == WeaponEnum.SIGNATURE_MOVE:
-            if not attacker.is_hero() or not isinstance(attacker, Hero):
-                raise PredictionError("enemies are not allowed to execute signature move")
-            hit_data = self.execute_signature_move(attacker)
-        elif weapon.weapon_type == WeaponEnum.COPYCAT_MIRROR:
-            # We don't care about enemy attack queues
-            pass
-        elif weapon.weapon_type == WeaponEnum.SHIELD_SELF:
-            attacker.state.shield = True
-        elif weapon.weapon_type == WeaponEnum.SHIELD_ALLY:
-            # Is used at a higher level differently, should never come here.
-            raise PredictionError(f"Shielding ally should have been processed elsewhere")
-        elif weapon.weapon_type == WeaponEnum.CURSE:
-            target = self.room.get_first_target_space_ahead(attacker)
-            if target is not None:
-                self.room.curse_entities(attacker, [target])
-
-        return self.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
+        # Each weapon type has its handler, see weapon_registry.
+        get_weapon_handler(weapon.weapon_type).execute(self, attacker, weapon, previous_hero_cell)
 
     def execute_weapon_aftermath(self, attacker: Entity, weapon: Optional[Weapon],
                                  previous_hero_cell: int, hit_data: HitData, cause: str = ""):
         # Put weapon on cooldown.
         if weapon is not None:
-            logger.queue_debug_text(f"Aftermath of {weapon.pretty_print()}")
+            logger.queue_debug_text(lambda: f"Aftermath of {weapon.pretty_print()}")
             weapon.cooldown_charge = 0
         else:
-            logger.queue_debug_text(f"Aftermath of {cause}")
+            logger.queue_debug_text(lambda: f"Aftermath of {cause}")
 
         # Clear out the dead.
         enemies_left = []
@@ -513,10 +306,10 @@ class Simulation(Snapshot):
         logger.queue_debug_text("cleaning up enemies")
         for enemy in self.room.enemies:
             if enemy.hp.hp > 0:
-                logger.queue_debug_text(f"{enemy.short_print()} is OK")
+                logger.queue_debug_text(lambda: f"{enemy.short_print()} is OK")
                 enemies_left.append(enemy)
             else:
-                logger.queue_debug_text(f"{enemy.short_print()} died")
+                logger.queue_debug_text(lambda: f"{enemy.short_print()} died")
                 # Mark boss being killed.
                 if enemy.is_boss():
                     boss_killed = True
@@ -537,9 +330,11 @@ class Simulation(Snapshot):
                 for queue_weapon in self.room.hero.attack_queue:
                     if queue_weapon.weapon_type == WeaponEnum.CHAKRAM and queue_weapon.strength < 9:
                         queue_weapon.strength += 1
-                for deck_weapon in self.hero_deck:
-                    if deck_weapon.weapon_type == WeaponEnum.CHAKRAM and deck_weapon.strength < 9:
-                        deck_weapon.strength += 1
+                if any(deck_weapon.weapon_type == WeaponEnum.CHAKRAM
+                       for deck_weapon in read_section(self, "hero_deck")):
+                    for deck_weapon in self.hero_deck:
+                        if deck_weapon.weapon_type == WeaponEnum.CHAKRAM and deck_weapon.strength < 9:
+                            deck_weapon.strength += 1
                 # Increase combo unless boss room; summon can start a combo, but not count towards it?.
                 if not self.room.is_boss_room() and not enemy.is_thorns():
                     if not self.predictions.combo_started:
@@ -558,7 +353,7 @@ class Simulation(Snapshot):
                 if enemy.is_corrupted():
                     logger.queue_debug_text("spawning corrupted progeny")
                     enemies_left.append(enemy.corrupted_progeny())
-        self.room.enemies = enemies_left
+        self.room.set_enemies(enemies_left)
         if not len(enemies_left) or boss_killed:
             self.predictions.enemies_cleared = True
 
@@ -597,7 +392,7 @@ class Simulation(Snapshot):
         # Perform double attack if applicable.
         if weapon is not None:
             undoubled_weapon = weapon.clone()
-            undoubled_weapon.attack_effect = None
+            undoubled_weapon.set_attack_effect(None)
             weapon.strength = weapon.base_strength
             if weapon.attack_effect is not None and weapon.attack_effect == WeaponAttackEffectEnum.DOUBLE_STRIKE:
                 return self.execute_weapon(attacker, undoubled_weapon, previous_hero_cell)
@@ -612,7 +407,7 @@ class Simulation(Snapshot):
             if weapon.attack_effect == WeaponAttackEffectEnum.DOUBLE_STRIKE:
                 kunai_total *= 2
             else:
-                kunai.attack_effect = weapon.attack_effect
+                kunai.set_attack_effect(weapon.attack_effect)
         for i in range(kunai_total):
             target = self.room.get_first_target_space_ahead(attacker)
             hit_data = self.room.hit_entities(attacker, [target], kunai)
@@ -644,7 +439,7 @@ class Simulation(Snapshot):
                 if weapon.is_double_strike():
                     updated_hookblade = weapon.clone()
                     updated_hookblade.strength = updated_hookblade.base_strength
-                    updated_hookblade.attack_effect = None
+                    updated_hookblade.set_attack_effect(None)
                     return self.execute_hookblade(attacker, updated_hookblade, previous_hero_cell)
 
     def can_execute_signature_move(self, hero: Hero, other_direction=False) -> bool:
@@ -690,7 +485,7 @@ class Simulation(Snapshot):
         direction = hero.position.get_direction() * (-1 if other_direction else 1)
         hero_cell = hero.position.cell
         logger.queue_debug_text(
-            f"{hero.short_print()} in cell {hero.position.cell} executing in direction {direction}")
+            lambda: f"{hero.short_print()} in cell {hero.position.cell} executing in direction {direction}")
         targets = []
         hit_data = HitData.empty()
         if hero.hero_id == HeroEnum.WANDERER:
@@ -769,12 +564,14 @@ class Simulation(Snapshot):
                         if len(self.room.pickups[temp_cell]) == 0:
                             del self.room.pickups[temp_cell]
                 # Actually move.
-                mover.position.cell = new_cell
+                self.room.move_entity(mover, new_cell)
             elif mover.hp.hp > 0:
                 # Move first.
-                mover.position.cell = new_cell
+                self.room.move_entity(mover, new_cell)
                 # Check for traps.
-                trap_strength = self.history.room.check_trap(temp_cell)
+                trap_strength = None
+                if temp_cell in read_section(self, "history").room.traps:
+                    trap_strength = self.history.room.check_trap(temp_cell)
                 if trap_strength:
                     hit_data = self.room.hit_entities(
                         attacker=self.room.hero,
@@ -861,26 +658,33 @@ class Simulation(Snapshot):
         # If enemies are already cleared, skip the simulation (nobody will do anything anyway).
         if self.predictions.enemies_cleared:
             return {"": self}
+        # Hero actions often leave the same board, the enemies then only get resolved once.
+        enemy_phase_cache.simulate(self, previous_hero_cell)
+        return {"": self}
+
+    def resolve_enemies(self, previous_hero_cell: int) -> None:
         logger.queue_debug_text("ENEMIES FOR SIMULATION:")
         for enemy in self.room.enemies:
-            logger.queue_debug_text(enemy.pretty_print())
+            logger.queue_debug_text(enemy.pretty_print)
         # First turn has passed.
         for enemy in self.room.enemies:
             if enemy.enemy_id != EnemyEnum.CORRUPTED_PROGENY:
                 enemy.first_turn = False
         # Then corrupted waves and bombs (for now only Hideyoshi can set bombs).
         the_boss = self.room.get_the_boss()
-        for wave in self.history.room.corrupted_waves:
-            logger.queue_debug_text(f"WAVE str {wave.strength} hitting cell {wave.position.cell}")
+        room_history = read_section(self, "history").room
+        for wave in room_history.corrupted_waves:
+            logger.queue_debug_text(lambda: f"WAVE str {wave.strength} hitting cell {wave.position.cell}")
             hit_data = self.room.hit_entities(
                 attacker=the_boss,
                 target_cells=[wave.position.cell],
                 weapon=Weapon.corrupted_wave(wave.strength)
             )
             self.game_stats.hits += hit_data.hits
-        for bomb in self.history.room.tick_bombs():
+        # Ticking replaces the bombs, only worth a copy of the history when there are any.
+        for bomb in self.history.room.tick_bombs() if room_history.bombs else []:
             cell, strength = bomb
-            logger.queue_debug_text(f"BOMB str {strength} hitting cell {cell}")
+            logger.queue_debug_text(lambda: f"BOMB str {strength} hitting cell {cell}")
             hit_data = self.room.hit_entities(
                 attacker=the_boss,
                 target_cells=[cell - 1, cell, cell + 1],
@@ -893,25 +697,25 @@ class Simulation(Snapshot):
                 continue
             new_cell = None
             if enemy.action == EnemyActionEnum.MOVE_RIGHT:
-                logger.queue_debug_text(f"MOVE {enemy.pretty_print()}")
+                logger.queue_debug_text(lambda: f"MOVE {enemy.pretty_print()}")
                 if enemy.enemy_id in [EnemyEnum.STRIDER, EnemyEnum.FUMIKO]:
                     new_cell = self.room.get_last_free_space_in_direction(enemy, 1)
                 else:
                     new_cell = enemy.position.cell + 1
             elif enemy.action == EnemyActionEnum.MOVE_LEFT:
-                logger.queue_debug_text(f"MOVE {enemy.pretty_print()}")
+                logger.queue_debug_text(lambda: f"MOVE {enemy.pretty_print()}")
                 if enemy.enemy_id in [EnemyEnum.STRIDER, EnemyEnum.FUMIKO]:
                     new_cell = self.room.get_last_free_space_in_direction(enemy, -1)
                 else:
                     new_cell = enemy.position.cell - 1
             elif enemy.action == EnemyActionEnum.TURN_AROUND:
-                logger.queue_debug_text(f"TURN {enemy.pretty_print()}")
+                logger.queue_debug_text(lambda: f"TURN {enemy.pretty_print()}")
                 enemy.position.flip()
             elif enemy.action == EnemyActionEnum.TURN_AROUND_BOSS:
-                logger.queue_debug_text(f"TURN_BOSS {enemy.pretty_print()}")
+                logger.queue_debug_text(lambda: f"TURN_BOSS {enemy.pretty_print()}")
                 enemy.position.flip()
             if new_cell is not None:
-                if self.room.is_legal_position(new_cell) and len(self.room.find_targets([new_cell])) == 0:
+                if self.room.is_legal_position(new_cell) and not self.room.is_occupied(new_cell):
                     self.simulate_move(enemy, new_cell, dash=True)
         # Not caring about expanding queue.
         # Attacks happen last.
@@ -952,7 +756,6 @@ class Simulation(Snapshot):
         )
         if not len(self.room.enemies):
             self.predictions.enemies_cleared = True
-        return {"": self}
 
         # if len(enemies_that_attack) <= 1:
         #     logger.queue_debug_text(f"Only {len(enemies_that_attack)} enemies want to attack")
@@ -1,34 +1,53 @@
-import base64
-import json
-from json import JSONDecodeError
 from typing import List, Optional, Dict
 
 from constants import MAP_SELECTION, DECK, POTIONS, SHOP_COMPONENT, MAP_SAVE, VERSION, RUN_NUMBER, RUN_IN_PROGRESS, \
     HERO, RUN_STATS, SKILLS, SKILL_LEVELS, PICKUPS, PICKUP_LOCATIONS, PROGRESSION_DATA, CORRUPTED_BOSS_SECTORS, \
-    COMBAT_ROOM, SHOP_ROOM, REWARD_ROOM, CURRENT_LOCATION, CURRENT_LOCATION_NAME, UNCOVERED_LOCATIONS
+    COMBAT_ROOM, SHOP_ROOM, REWARD_ROOM, CURRENT_LOCATION, CURRENT_LOCATION_NAME, UNCOVERED_LOCATIONS, REWARD, \
+    IN_PROGRESS
 from data.game_stats import GameStats
 from data.mappers import shop_name_mapper
-from data.other_enums import GamePhase
+from data.other_enums import GamePhase, TurnVerdict
 from data.room.room_battle import BattleRoom
 from data.room.room_reward import RewardRoom
+from data.snapshot.lazy_section import LazySection
+from data.snapshot.save_payload import SavePayload
+from data.snapshot.save_reader import save_reader
 from data.shop.room_shop import ShopRoom
 from data.skill.skills import Skills
 from data.weapon.weapon import Weapon
 from history.history import History
 from history.potions.history_potions import PotionSnapshot
-from logger import logger
+
+
+def get_game_phase(raw_data: Dict) -> GamePhase:
+    # Only the flags are looked at, no room gets decoded.
+    if raw_data[MAP_SELECTION]:
+        return GamePhase.MAP_JOURNEY
+    if raw_data[SHOP_ROOM][REWARD][IN_PROGRESS]:
+        return GamePhase.SHOP
+    if raw_data[REWARD_ROOM][REWARD][IN_PROGRESS]:
+        return GamePhase.BATTLE_REWARDS
+    return GamePhase.BATTLE
 
 
 class Snapshot:
-    skills: Skills
-    game_stats: GameStats
-    hero_deck: List[Weapon]
-    hero_potion_ids: List[int]
-    game_phase: GamePhase
-    room: BattleRoom
-    shop: Optional[ShopRoom]
-    reward: Optional[RewardRoom]
+    # Sections that are never mutated can be shared between consecutive snapshots.
+    skills: Skills = LazySection(lambda snapshot: Skills.from_dict(snapshot.raw_data), SKILLS, SKILL_LEVELS)
+    game_stats: GameStats = LazySection(lambda snapshot: GameStats.from_dict(snapshot.raw_data))
+    hero_deck: List[Weapon] = LazySection(lambda snapshot: [Weapon.from_dict(x) for x in snapshot.raw_data[DECK]],
+                                          DECK)
+    hero_potion_ids: List[int] = LazySection(lambda snapshot: snapshot.raw_data[POTIONS])
+    game_phase: GamePhase = LazySection(lambda snapshot: get_game_phase(snapshot.raw_data))
+    room: BattleRoom = LazySection(lambda snapshot: BattleRoom.from_dict(snapshot.raw_data, snapshot.skills))
+    shop: Optional[ShopRoom] = LazySection(lambda snapshot: ShopRoom.from_dict(snapshot.raw_data),
+                                           SHOP_ROOM, MAP_SAVE)
+    reward: Optional[RewardRoom] = LazySection(lambda snapshot: RewardRoom.from_dict(snapshot.raw_data), REWARD_ROOM)
     history: Optional[History]
+    payload: Optional[SavePayload]  # None if not read from a file, tells which sections changed
+    raw_data: Optional[Dict]  # None if not read from a file
+    section_digests: Optional[Dict[str, str]]  # None if not read from a file
+    decoded: Dict[str, object]
+    verdict: Optional[TurnVerdict]  # None unless a battle turn was analysed
 
     def __init__(self,
                  skills: Skills,
@@ -40,6 +59,7 @@ class Snapshot:
                  shop: Optional[ShopRoom] = None,
                  reward: Optional[RewardRoom] = None,
                  ):
+        self.init_lazy(None)
         self.skills = skills
         self.game_stats = game_stats
         self.hero_deck = hero_deck
@@ -48,59 +68,47 @@ class Snapshot:
         self.room = room
         self.shop = shop
         self.reward = reward
+
+    def init_lazy(self, raw_data: Optional[Dict]) -> None:
+        self.raw_data = raw_data
+        self.section_digests = None
+        self.decoded = {}
         self.history = None
+        self.payload = None
+        self.verdict = None
 
     @staticmethod
     def from_file(filename: str, first: bool = False):
+        payload = save_reader.read(filename)
+        if payload is None:
+            # Rewritten without any change.
+            return None
+        return Snapshot.from_payload(payload, first)
+
+    @staticmethod
+    def from_payload(payload: SavePayload, first: bool = False):
         map_shops = None
         corrupted_boss_sectors = []
-        try:
-            with open(filename, mode='r') as source_file:
-                source = source_file.read()
-            raw_data = json.loads(base64.b64decode(source))
-            # print('raw_data')
-            # print(raw_data)
-            if first:
-                map_shops = raw_data[MAP_SAVE][SHOP_COMPONENT]
-                corrupted_boss_sectors = raw_data[PROGRESSION_DATA][CORRUPTED_BOSS_SECTORS]
-        except JSONDecodeError as e:
-            logger.debug_error("Read of the file occured as it was being written to")
-            # TODO think about the impact on history etc.
-            return Snapshot.from_file(filename, first)
+        raw_data = payload.raw_data
+        if first:
+            map_shops = raw_data[MAP_SAVE][SHOP_COMPONENT]
+            corrupted_boss_sectors = raw_data[PROGRESSION_DATA][CORRUPTED_BOSS_SECTORS]
         # TODO recheck at some point
         # Uncomment for developer work - check if all data is recorded.
         # test_data(json.loads(json.dumps(raw_data)))
         retval = Snapshot.from_dict(raw_data)
+        retval.payload = payload
+        retval.section_digests = payload.section_digests
         if first:
             retval.history = History(retval, map_shops, corrupted_boss_sectors)
         return retval
 
     @staticmethod
     def from_dict(raw_data: Dict):
-        game_phase = GamePhase.BATTLE
-        map_selection = raw_data[MAP_SELECTION]
-        skills = Skills.from_dict(raw_data)
-
-        reward_room = RewardRoom.from_dict(raw_data)
-        if reward_room is not None:
-            game_phase = GamePhase.BATTLE_REWARDS
-        shop_room = ShopRoom.from_dict(raw_data)
-        if shop_room is not None:
-            game_phase = GamePhase.SHOP
-        if map_selection:
-            game_phase = GamePhase.MAP_JOURNEY
-        battle_room = BattleRoom.from_dict(raw_data, skills)
-
-        return Snapshot(
-            skills=skills,
-            game_stats=GameStats.from_dict(raw_data),
-            hero_deck=[Weapon.from_dict(x) for x in raw_data[DECK]],
-            hero_potion_ids=raw_data[POTIONS],
-            game_phase=game_phase,
-            room=battle_room,
-            shop=shop_room,
-            reward=reward_room,
-        )
+        # Sections are only decoded once something asks for them.
+        snapshot = Snapshot.__new__(Snapshot)
+        snapshot.init_lazy(raw_data)
+        return snapshot
 
     def to_dict(self):
         map_shops = self.history.map.map_shops
@@ -0,0 +1,140 @@
+from hashlib import blake2b
+from operator import attrgetter
+from typing import Dict, Tuple, Callable, Any, List, Optional
+
+from data.entity.enemy import Enemy
+from data.entity.entity import Entity
+from data.game_stats import GameStats
+from data.room.room_battle import BattleRoom
+from data.snapshot.copy_on_write import get_section_owner
+from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_log import undo_log
+from data.weapon.weapon import Weapon
+from history.history import History
+
+
+class ZobristKeys:
+    """
+    Random 64-bit key of every feature of a battle state, e.g. ("potion", 0, 3).
+    Keys are derived from the feature itself, so every process agrees on them.
+    """
+    keys: Dict[Tuple, int]
+
+    def __init__(self):
+        self.keys = {}
+
+    def get(self, feature: Tuple) -> int:
+        key = self.keys.get(feature)
+        if key is None:
+            key = int.from_bytes(blake2b(repr(feature).encode(), digest_size=8).digest(), "little")
+            self.keys[feature] = key
+        return key
+
+
+zobrist_keys = ZobristKeys()
+
+
+# One feature per object: fewer, bigger features hash faster than a key per field.
+# Enums hash in Python, their plain values in C.
+ENTITY_FIELDS = ("entity_type._value_", "state.shield", "state.curse", "state.ice", "state.poison", "position.cell",
+                 "position.facing", "position.died_in", "hp.hp", "hp.max_hp")
+get_hero_features = attrgetter(*ENTITY_FIELDS, "hero_id._value_", "special_move_cooldown", "has_reactive_shield")
+get_enemy_features = attrgetter(*ENTITY_FIELDS, "enemy_id._value_", "action._value_", "previous_action._value_",
+                                "elite_type._value_", "first_turn", "pattern_index")
+get_game_stats_features = attrgetter(*GameStats.__slots__)
+
+
+def hash_weapon(role: Tuple, weapon: Weapon) -> int:
+    # Tile definitions are interned, the object itself stands for its fields.
+    return zobrist_keys.get(role + (weapon.tile, weapon.cooldown_charge, weapon.strength))
+
+
+def hash_entity(role: Tuple, entity: Entity) -> int:
+    if isinstance(entity, Enemy):
+        result = zobrist_keys.get(role + get_enemy_features(entity))
+        if entity.next_weapon is not None:
+            result ^= hash_weapon(role + ("next",), entity.next_weapon)
+    else:
+        result = zobrist_keys.get(role + get_hero_features(entity))
+    for index, weapon in enumerate(entity.attack_queue):
+        result ^= hash_weapon(role + ("queue", index), weapon)
+    return result
+
+
+def hash_game_stats(game_stats: GameStats) -> int:
+    return zobrist_keys.get(("game_stats",) + get_game_stats_features(game_stats))
+
+
+def hash_deck(hero_deck: List[Weapon]) -> int:
+    result = 0
+    for index, weapon in enumerate(hero_deck):
+        result ^= hash_weapon(("deck", index), weapon)
+    return result
+
+
+def hash_potions(hero_potion_ids: List[int]) -> int:
+    result = 0
+    for index, potion_id in enumerate(hero_potion_ids):
+        result ^= zobrist_keys.get(("potion", index, potion_id))
+    return result
+
+
+def hash_room(room: BattleRoom) -> int:
+    result = zobrist_keys.get(("room", room.room, room.progression, room.wave_number, room.until_next_wave,
+                               room.board_size, room.variant, room.is_boss_corrupted))
+    result ^= hash_entity(("hero",), room.hero)
+    for index, enemy in enumerate(room.enemies):
+        result ^= hash_entity(("enemy", index), enemy)
+    for cell, pickups in room.pickups.items():
+        for pickup, count in pickups.items():
+            result ^= zobrist_keys.get(("pickup", cell, pickup, count))
+    return result
+
+
+def hash_history(history: Optional[History]) -> int:
+    if history is None:
+        return 0
+    # Only the room matters in battle, the rest is bookkeeping over the whole run.
+    room_history = history.room
+    result = 0
+    for cell, strength in room_history.traps.items():
+        result ^= zobrist_keys.get(("trap", cell, strength))
+    for cell, weapon in room_history.thorns.items():
+        result ^= hash_weapon(("thorns", cell), weapon)
+    for cell, bombs in room_history.bombs.items():
+        for index, (time, strength) in enumerate(bombs):
+            result ^= zobrist_keys.get(("bomb", cell, index, time, strength))
+    for index, wave in enumerate(room_history.corrupted_waves):
+        result ^= zobrist_keys.get(("wave", index, wave.strength, wave.position.cell, wave.position.facing))
+    return result
+
+
+SECTION_HASHERS: List[Tuple[str, Callable[[Any], int]]] = [
+    ("game_stats", hash_game_stats),
+    ("hero_deck", hash_deck),
+    ("hero_potion_ids", hash_potions),
+    ("room", hash_room),
+    ("history", hash_history),
+]
+
+
+def get_state_hash(snapshot: Snapshot) -> int:
+    """
+    Zobrist hash of the battle state: the XOR of the keys of all its features.
+    Equal states have equal hashes; equal hashes are only very likely equal states.
+    A simulation only rehashes the sections it has its own copy of; the others are
+    hashed once in the frozen simulation they are shared with.
+    """
+    result = 0
+    for name, hasher in SECTION_HASHERS:
+        owner = get_section_owner(snapshot, name)
+        # While the undo log records, shared sections change in place.
+        cached = getattr(owner, "frozen", False) and not undo_log.is_recording()
+        if cached and name in owner.state_hashes:
+            result ^= owner.state_hashes[name]
+            continue
+        section_hash = hasher(getattr(owner, name))
+        if cached:
+            owner.state_hashes[name] = section_hash
+        result ^= section_hash
+    return result
@@ -0,0 +1,2 @@
+class TornSaveError(Exception):
+    pass
@@ -0,0 +1,104 @@
+from typing import List, Any, Union, Dict
+
+from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_tracked import UndoTracked, recording, start_recording, stop_recording, MISSING
+
+
+def get_undo_sections(snapshot: Snapshot) -> List:
+    return [snapshot.game_stats, snapshot.hero_deck, snapshot.hero_potion_ids, snapshot.room, snapshot.history.room]
+
+
+def get_mutable_containers(snapshot: Snapshot) -> List[Union[list, dict]]:
+    """
+    Every list and dict a simulation changes in place instead of assigning a new one.
+    """
+    room = snapshot.room
+    room_history = snapshot.history.room
+    containers = [room.enemies, room.pickups, room.hero.attack_queue, snapshot.hero_deck, snapshot.hero_potion_ids,
+                  room_history.traps, room_history.thorns, room_history.bombs, room_history.corrupted_waves]
+    containers.append(room.occupants)
+    containers.extend(room.occupants.values())
+    containers.extend(room.pickups.values())
+    for bombs in room_history.bombs.values():
+        containers.append(bombs)
+        containers.extend(bombs)
+    return containers
+
+
+def get_fields(instance) -> Dict[str, Any]:
+    fields = dict(getattr(instance, "__dict__", {}))
+    for cls in type(instance).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            fields[name] = getattr(instance, name, MISSING)
+    return fields
+
+
+def dump_state(value) -> Any:
+    """
+    Comparable copy of everything reachable from the value, to verify that a rollback restored it.
+    """
+    if isinstance(value, list):
+        return [dump_state(item) for item in value]
+    if isinstance(value, dict):
+        return sorted(((repr(key), dump_state(item)) for key, item in value.items()), key=lambda item: item[0])
+    if isinstance(value, UndoTracked):
+        return type(value).__name__, dump_state(get_fields(value))
+    return value
+
+
+class UndoLog:
+    """
+    Records every field write of a simulation, so that it can be undone instead of cloning the state.
+    Containers changed in place (lists, dicts) are checkpointed before every simulation.
+    Recording is per thread, see UndoTracked: only the thread that started it gets logged.
+    """
+    enabled: bool
+    differential_check: bool  # also simulate with clones and compare the results
+    total_writes: int
+    total_rollbacks: int
+    checks: int
+    mismatches: int
+
+    def __init__(self):
+        self.enabled = False
+        self.differential_check = False
+        self.total_writes = 0
+        self.total_rollbacks = 0
+        self.checks = 0
+        self.mismatches = 0
+
+    def is_recording(self) -> bool:
+        return recording.writes is not None
+
+    def start(self) -> None:
+        start_recording()
+
+    def stop(self) -> None:
+        stop_recording()
+
+    def checkpoint(self, containers: List[Union[list, dict]]) -> None:
+        recording.containers = [(container, container.copy()) for container in containers]
+
+    def rollback(self) -> None:
+        writes = recording.writes
+        self.total_writes += len(writes)
+        self.total_rollbacks += 1
+        for instance, name, value in reversed(writes):
+            object.__setattr__(instance, name, value)
+        writes.clear()
+        for container, contents in recording.containers:
+            if isinstance(container, list):
+                container[:] = contents
+            else:
+                container.clear()
+                container.update(contents)
+
+    def pretty_print(self) -> str:
+        average = self.total_writes / self.total_rollbacks if self.total_rollbacks else 0
+        result = f"Undo log: {self.total_rollbacks} rollbacks, {average:.1f} writes undone on average"
+        if self.differential_check:
+            result += f", {self.mismatches} mismatches in {self.checks} differential checks"
+        return result
+
+
+undo_log = UndoLog()
@@ -0,0 +1,62 @@
+from threading import local, Lock
+from typing import List, Tuple, Any, Optional, Union
+
+MISSING = object()
+
+
+class Recording(local):
+    """
+    What the undo log is recording, kept per thread: simulations of other threads are never logged.
+    """
+    writes: Optional[List[Tuple[Any, str, Any]]] = None  # None unless recording
+    containers: List[Tuple[Union[list, dict], Union[list, dict]]] = []
+
+
+recording = Recording()
+
+
+def record_setattr(instance, name: str, value) -> None:
+    writes = recording.writes
+    if writes is not None:
+        previous = getattr(instance, name, MISSING)
+        # Objects still being constructed are new, there is nothing to restore.
+        if previous is not MISSING:
+            writes.append((instance, name, previous))
+    object.__setattr__(instance, name, value)
+
+
+class UndoTracked:
+    """
+    Base of everything a simulation changes by assigning to its fields, see UndoLog.
+    Assigning goes through record_setattr only while some thread records: most writes are clones
+    filling in new objects, which have nothing to restore and would otherwise all pay for the check.
+    """
+    __slots__ = ()
+
+
+recorders = 0  # threads recording
+recorders_lock = Lock()
+
+
+def start_recording() -> None:
+    global recorders
+    if recording.writes is not None:
+        raise ValueError("Undo log is already recording")
+    recording.writes = []
+    recording.containers = []
+    with recorders_lock:
+        if not recorders:
+            UndoTracked.__setattr__ = record_setattr
+        recorders += 1
+
+
+def stop_recording() -> None:
+    global recorders
+    if recording.writes is None:
+        return
+    with recorders_lock:
+        recorders -= 1
+        if not recorders:
+            del UndoTracked.__setattr__
+    recording.writes = None
+    recording.containers = []
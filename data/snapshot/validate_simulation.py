@@ -24,12 +24,9 @@ def reduce_potential_decks(actual_snapshot: Snapshot, hero_deck: List[Weapon], p
     List[Weapon]]:
     if actual_snapshot.game_phase == GamePhase.BATTLE_REWARDS:
         return [weapon.clone() for weapon in actual_snapshot.hero_deck]
-    if not len(predictions.potential_hero_decks):
+    if predictions.potential_hero_deck is None:
         return hero_deck
-    for phd in predictions.potential_hero_decks:
-        if Weapon.is_list_equal(actual_snapshot.hero_deck, phd):
-            return phd
-    return None
+    return predictions.potential_hero_deck.match(actual_snapshot.hero_deck)
 
 
 def is_good_prediction(actual_snapshot: Snapshot, simulation: Simulation, debug: bool = True) -> bool:
@@ -51,8 +48,8 @@ def is_good_prediction(actual_snapshot: Snapshot, simulation: Simulation, debug:
     )
     if reduced_hero_deck is None:
         if debug:
-            pot_decks = ' OR '.join(Weapon.debug_print_list(phd) for phd in simulation.predictions.potential_hero_decks)
-            raise PredictionError(f"None of the predicted hero decks check out {pot_decks}")
+            pot_deck = simulation.predictions.potential_hero_deck.debug_print()
+            raise PredictionError(f"None of the predicted hero decks check out {pot_deck}")
         return False
     simulation.hero_deck = reduced_hero_deck
 
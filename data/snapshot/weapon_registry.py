@@ -0,0 +1,438 @@
+from typing import Callable, Dict, List, Optional
+
+from data.entity.construct_entity import EntityConstructor
+from data.entity.entity import Entity
+from data.entity.entity_enums import EntityType
+from data.entity.hero import Hero
+from data.snapshot.hit_data import HitData
+from data.snapshot.prediction_error import PredictionError
+from data.weapon.weapon import Weapon
+from data.weapon.weapon_enums import WeaponEnum
+from logger import logger
+
+# All of them take the simulation, the attacker, the weapon and the previous hero cell.
+TargetFinder = Callable[..., List[Optional[int]]]
+Effect = Callable[..., Optional[HitData]]
+
+
+class WeaponHandler:
+    """
+    Executes one type of weapon for Simulation.execute_weapon.
+    """
+
+    def execute(self, simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+        raise TypeError("Executing not allowed on the base class")
+
+
+class TargetingHandler(WeaponHandler):
+    """
+    Hits the cells found by its targeting pattern.
+    """
+    find_targets: TargetFinder
+
+    def __init__(self, find_targets: TargetFinder):
+        self.find_targets = find_targets
+
+    def execute(self, simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+        targets = self.find_targets(simulation, attacker, weapon, previous_hero_cell)
+        logger.queue_debug_text(
+            lambda: f"{attacker.short_print()} attacking cells {targets} with {weapon.short_print()}")
+        hit_data = simulation.room.hit_entities(attacker, targets, weapon, simulate_move=simulation.simulate_move)
+        simulation.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
+
+
+class EffectHandler(WeaponHandler):
+    """
+    Applies its effect (moving, summoning, remembering...), followed by the usual aftermath.
+    """
+    effect: Effect
+
+    def __init__(self, effect: Effect):
+        self.effect = effect
+
+    def execute(self, simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+        hit_data = self.effect(simulation, attacker, weapon, previous_hero_cell)
+        if hit_data is None:
+            hit_data = HitData.empty()
+        simulation.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
+
+
+class SeparateHandler(WeaponHandler):
+    """
+    Takes care of everything itself, the aftermath included.
+    """
+    run: Callable[..., None]
+
+    def __init__(self, run: Callable[..., None]):
+        self.run = run
+
+    def execute(self, simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+        self.run(simulation, attacker, weapon, previous_hero_cell)
+
+
+weapon_handlers: Dict[WeaponEnum, WeaponHandler] = {}
+default_weapon_handler = EffectHandler(lambda simulation, attacker, weapon, previous_hero_cell: None)
+
+
+def register_weapon(weapon_types: List[WeaponEnum], handler: WeaponHandler) -> None:
+    for weapon_type in weapon_types:
+        if weapon_type in weapon_handlers:
+            raise ValueError(f"Weapon {weapon_type} registered twice")
+        weapon_handlers[weapon_type] = handler
+
+
+def get_weapon_handler(weapon_type: WeaponEnum) -> WeaponHandler:
+    return weapon_handlers.get(weapon_type, default_weapon_handler)
+
+
+# TARGETING PATTERNS
+
+def relative_targets(*offsets: int) -> TargetFinder:
+    offsets = list(offsets)
+
+    def find_targets(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+        return attacker.position.get_spaces(offsets)
+    return find_targets
+
+
+def first_target_ahead(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    return [simulation.room.get_first_target_space_ahead(attacker)]
+
+
+def last_target_ahead(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    return [simulation.room.get_last_target_space_ahead(attacker)]
+
+
+def all_cells(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    return simulation.room.get_all_targets_cells()
+
+
+def hurt_enemies(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    return simulation.room.get_all_hurt_enemies_cells()
+
+
+def crossbow_targets(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    return simulation.room.get_crossbow_targets_spaces(attacker)
+
+
+def volley_targets(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    # enemy only! hero is always the target
+    return [previous_hero_cell]
+
+
+def mon_targets(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    simulation.game_stats.coins -= 1
+    return [simulation.room.get_first_target_space_ahead(attacker)]
+
+
+def chakram_targets(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> List[Optional[int]]:
+    targets = simulation.room.get_first_target_spaces_around(attacker)
+    chakram_to_attack_with = weapon.clone()
+    weapon.strength = weapon.base_strength
+    simulation.room.hit_entities(attacker, targets, chakram_to_attack_with, simulate_move=simulation.simulate_move)
+    return targets
+
+
+# SEPARATE LOGIC
+
+def run_kunai(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    simulation.execute_kunai(attacker, weapon, previous_hero_cell)
+
+
+def run_hookblade(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    # Sanity check.
+    if weapon.strength != weapon.base_strength:
+        raise ValueError(
+            f"Hookblade's base strength isn't what I thought. Strength: {weapon.strength} base: {weapon.base_strength}")
+    simulation.execute_hookblade(attacker, weapon, previous_hero_cell)
+
+
+def run_meteor_hammer(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    targets = [simulation.room.get_first_target_space_ahead_in_range(attacker, 3)]
+    hit_data = simulation.room.hit_entities(attacker, targets, weapon)
+    if hit_data.targets_hit > 0:
+        targets = attacker.position.get_spaces([-1])
+        hit_data2 = simulation.room.hit_entities(attacker, targets, weapon)
+        hit_data.merge(hit_data2)
+    simulation.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
+
+
+def run_blazing_suisei(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    targets = [simulation.room.get_first_target_space_ahead_in_range(attacker, 3)]
+    hit_data = simulation.room.hit_entities(attacker, targets, weapon)
+    killed = True in [enemy.hp.hp <= 0 for enemy in simulation.room.enemies]
+    if killed:
+        targets = [targets[0] - 1, targets[0] + 1]
+        hit_data2 = simulation.room.hit_entities(attacker, targets, Weapon.explosion(2))
+        hit_data.merge(hit_data2)
+    simulation.execute_weapon_aftermath(attacker, weapon, previous_hero_cell, hit_data)
+
+
+# IN-MEMORY EFFECTS
+
+def corrupted_wave_ltr(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    simulation.history.room.spawn_corrupted_wave(cell=0, facing=1, strength=weapon.strength)
+
+
+def corrupted_wave_rtl(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    simulation.history.room.spawn_corrupted_wave(cell=simulation.room.board_size, facing=0, strength=weapon.strength)
+
+
+def corrupted_barrage(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    simulation.history.room.spawn_corrupted_wave(cell=attacker.position.cell + 1, facing=1, strength=weapon.strength)
+    simulation.history.room.spawn_corrupted_wave(cell=attacker.position.cell - 1, facing=0, strength=weapon.strength)
+
+
+def set_trap(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    targets = attacker.position.get_spaces([1])
+    simulation.history.room.set_trap(targets[0], weapon.strength)
+
+
+def add_bomb(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    targets = attacker.position.get_spaces([1])
+    simulation.history.room.add_bomb(targets[0], weapon.strength)
+
+
+# MOVES
+
+def mirror(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    return simulation.simulate_swap(attacker, simulation.room.board_size - attacker.position.cell - 1,
+                                    target_required=False, flip_targets=True)
+
+
+def dash(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    target_cell = simulation.room.get_last_free_space_ahead(attacker)
+    return simulation.simulate_move(attacker, target_cell, dash=True)
+
+
+def swap_toss(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    hit_data = HitData.empty()
+    attacker_cell = attacker.position.cell
+    if not simulation.room.is_edge_space(attacker_cell):
+        target1 = simulation.room.find_targets([attacker_cell - 1])
+        target2 = simulation.room.find_targets([attacker_cell + 1])
+        if (not len(target1) or not target1[0].is_heavy()) and (not len(target2) or not target2[0].is_heavy()):
+            if len(target1):
+                hit_data2 = simulation.simulate_move(target1[0], attacker_cell + 1)
+                hit_data.merge(hit_data2)
+            if len(target2):
+                hit_data2 = simulation.simulate_move(target2[0], attacker_cell - 1)
+                hit_data.merge(hit_data2)
+    return hit_data
+
+
+def origin_of_symmetry(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    return simulation.simulate_swap(attacker, (simulation.room.board_size - 1) // 2, target_required=False)
+
+
+def boss_swap(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    the_boss_cell = simulation.room.get_the_boss().position.cell
+    return simulation.simulate_swap(attacker, the_boss_cell)
+
+
+# MOVES AND ATTACKS
+
+def sharp_turn(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    targets = attacker.position.get_spaces([-1, 1])
+    hit_data = simulation.room.hit_entities(attacker, targets, weapon)
+    attacker.position.flip()
+    if attacker.entity_type == EntityType.HERO:
+        simulation.game_stats.turn_arounds += 1
+    return hit_data
+
+
+def charge(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    target_cell = simulation.room.get_last_free_space_ahead(attacker)
+    logger.queue_debug_text(lambda: f"move to cell {target_cell}")
+    hit_data = simulation.simulate_move(attacker, target_cell, dash=True)
+    if attacker.hp.hp > 0:
+        target = attacker.position.get_spaces([1])
+        logger.queue_debug_text(lambda: f"attack cell {target}")
+        hit_data2 = simulation.room.hit_entities(attacker, target, weapon)
+        logger.queue_debug_text(lambda: f"hits {hit_data.hits}")
+        hit_data.merge(hit_data2)
+    return hit_data
+
+
+def back_charge(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    target_cell = simulation.room.get_last_free_space_behind(attacker)
+    hit_data = simulation.simulate_move(attacker, target_cell, dash=True)
+    if attacker.hp.hp > 0:
+        targets = attacker.position.get_spaces([-1])
+        hit_data2 = simulation.room.hit_entities(attacker, targets, weapon)
+        hit_data.merge(hit_data2)
+    return hit_data
+
+
+def shadow_dash(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> Optional[HitData]:
+    direct_targets, shock_targets = simulation.room.find_connected_targets(
+        attacker,
+        [simulation.room.get_first_target_space_ahead(attacker)],
+    )
+    all_targets: List[int] = direct_targets + shock_targets
+    logger.queue_debug_text(lambda: f"all targets: {all_targets}")
+    if len(all_targets):
+        if attacker.position.facing == 1:
+            new_cell = max(all_targets) + 1
+        else:
+            new_cell = min(all_targets) - 1
+        if simulation.room.is_legal_position(new_cell):
+            hit_data = simulation.simulate_move(attacker, new_cell, dash=True)
+            hit_data2 = simulation.room.hit_entities(attacker, all_targets, weapon)
+            hit_data.merge(hit_data2)
+            return hit_data
+    return None
+
+
+def back_shadow_dash(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> Optional[HitData]:
+    direct_targets, shock_targets = simulation.room.find_connected_targets(
+        attacker,
+        [simulation.room.get_first_target_space_behind(attacker)],
+    )
+    all_targets: List[int] = direct_targets + shock_targets
+    if len(all_targets):
+        if attacker.position.facing == 1:
+            new_cell = min(all_targets) - 1
+        else:
+            new_cell = max(all_targets) + 1
+        if simulation.room.is_legal_position(new_cell):
+            hit_data = simulation.simulate_move(attacker, new_cell, dash=True)
+            hit_data2 = simulation.room.hit_entities(attacker, all_targets, weapon)
+            hit_data.merge(hit_data2)
+            return hit_data
+    return None
+
+
+def smoke_bomb(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> Optional[HitData]:
+    target = simulation.room.get_first_target_space_ahead(attacker)
+    return swap_and_hit(simulation, attacker, weapon, target)
+
+
+def back_smoke_bomb(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> Optional[HitData]:
+    target = simulation.room.get_first_target_space_behind(attacker)
+    return swap_and_hit(simulation, attacker, weapon, target)
+
+
+def swap_and_hit(simulation, attacker: Entity, weapon: Weapon, target: Optional[int]) -> Optional[HitData]:
+    target_entity = simulation.room.find_targets([target])
+    if len(target_entity) and not target_entity[0].is_heavy():
+        hit_data = simulation.simulate_swap(attacker, target)
+        hit_data2 = simulation.room.hit_entities(attacker, [target], weapon)
+        hit_data.merge(hit_data2)
+        return hit_data
+    return None
+
+
+# SUMMONS
+
+def boss_summon(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    simulation.predictions.summons += 1
+
+
+def summon_thorns(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    targets = attacker.position.get_spaces([1])
+    simulation.room.add_enemy(EntityConstructor.thorns(targets[0]))
+    simulation.history.room.summon_thorns(targets[0], weapon.clone())
+
+
+def summon_barricade(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    targets = attacker.position.get_spaces([1])
+    simulation.room.add_enemy(EntityConstructor.barricade(targets[0]))
+
+
+# OTHER
+
+def maku(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    # TODO: allow this to happen, ensure this causes "too many enemies" error
+    logger.queue_debug_error("Make i.e. scene change, WTF is going to happen?")
+
+
+def signature_move(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> HitData:
+    if not attacker.is_hero() or not isinstance(attacker, Hero):
+        raise PredictionError("enemies are not allowed to execute signature move")
+    return simulation.execute_signature_move(attacker)
+
+
+def nothing(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    pass
+
+
+def shield_self(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    attacker.state.shield = True
+
+
+def shield_ally(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    # Is used at a higher level differently, should never come here.
+    raise PredictionError(f"Shielding ally should have been processed elsewhere")
+
+
+def curse(simulation, attacker: Entity, weapon: Weapon, previous_hero_cell: int) -> None:
+    target = simulation.room.get_first_target_space_ahead(attacker)
+    if target is not None:
+        simulation.room.curse_entities(attacker, [target])
+
+
+register_weapon([WeaponEnum.KUNAI], SeparateHandler(run_kunai))
+register_weapon([WeaponEnum.HOOKBLADE], SeparateHandler(run_hookblade))
+register_weapon([WeaponEnum.METEOR_HAMMER], SeparateHandler(run_meteor_hammer))
+register_weapon([WeaponEnum.BLAZING_SUISEI], SeparateHandler(run_blazing_suisei))
+
+# Melee attacks.
+register_weapon([WeaponEnum.KATANA, WeaponEnum.SAI, WeaponEnum.BO, WeaponEnum.TETSUBO, WeaponEnum.BLADE_OF_PATIENCE,
+                 WeaponEnum.DRAGON_PUNCH], TargetingHandler(relative_targets(1)))
+register_weapon([WeaponEnum.SPEAR], TargetingHandler(relative_targets(1, 2)))
+register_weapon([WeaponEnum.BACK_STRIKE], TargetingHandler(relative_targets(-1)))
+register_weapon([WeaponEnum.SWIRL, WeaponEnum.TWIN_TESSEN], TargetingHandler(relative_targets(-1, 1)))
+register_weapon([WeaponEnum.NAGIBOKU], TargetingHandler(relative_targets(-2, -1, 1, 2)))
+
+# Ranged attacks.
+register_weapon([WeaponEnum.ARROW, WeaponEnum.SHURIKEN, WeaponEnum.GRAPPLING_HOOK, WeaponEnum.KI_PUSH,
+                 WeaponEnum.TANEGASHIMA], TargetingHandler(first_target_ahead))
+register_weapon([WeaponEnum.MON], TargetingHandler(mon_targets))
+register_weapon([WeaponEnum.LIGHTINING], TargetingHandler(last_target_ahead))
+register_weapon([WeaponEnum.EARTH_IMPALE], TargetingHandler(relative_targets(-2, 2)))
+register_weapon([WeaponEnum.SHADOW_KAMA], TargetingHandler(relative_targets(2)))
+register_weapon([WeaponEnum.CROSSBOW], TargetingHandler(crossbow_targets))
+register_weapon([WeaponEnum.VOLLEY], TargetingHandler(volley_targets))
+register_weapon([WeaponEnum.CHAKRAM], TargetingHandler(chakram_targets))
+
+# Global attacks.
+register_weapon([WeaponEnum.CORRUPTED_EXPLOSION], TargetingHandler(all_cells))
+register_weapon([WeaponEnum.SCAR_STRIKE], TargetingHandler(hurt_enemies))
+
+# In-memory attacks.
+register_weapon([WeaponEnum.CORRUPTED_WAVE_LTR], EffectHandler(corrupted_wave_ltr))
+register_weapon([WeaponEnum.CORRUPTED_WAVE_RTL], EffectHandler(corrupted_wave_rtl))
+register_weapon([WeaponEnum.CORRUPTED_BARRAGE], EffectHandler(corrupted_barrage))
+register_weapon([WeaponEnum.TRAP], EffectHandler(set_trap))
+register_weapon([WeaponEnum.BOMB], EffectHandler(add_bomb))
+
+# Moves.
+register_weapon([WeaponEnum.MIRROR], EffectHandler(mirror))
+register_weapon([WeaponEnum.DASH], EffectHandler(dash))
+register_weapon([WeaponEnum.SWAP_TOSS], EffectHandler(swap_toss))
+register_weapon([WeaponEnum.ORIGIN_OF_SYMMETRY], EffectHandler(origin_of_symmetry))
+register_weapon([WeaponEnum.BOSS_SWAP], EffectHandler(boss_swap))
+
+# Moves and attacks.
+register_weapon([WeaponEnum.SHARP_TURN], EffectHandler(sharp_turn))
+register_weapon([WeaponEnum.CHARGE], EffectHandler(charge))
+register_weapon([WeaponEnum.BACK_CHARGE], EffectHandler(back_charge))
+register_weapon([WeaponEnum.SHADOW_DASH], EffectHandler(shadow_dash))
+register_weapon([WeaponEnum.BACK_SHADOW_DASH], EffectHandler(back_shadow_dash))
+register_weapon([WeaponEnum.SMOKE_BOMB], EffectHandler(smoke_bomb))
+register_weapon([WeaponEnum.BACK_SMOKE_BOMB], EffectHandler(back_smoke_bomb))
+
+# Summons.
+register_weapon([WeaponEnum.BOSS_SUMMON], EffectHandler(boss_summon))
+register_weapon([WeaponEnum.THORNS], EffectHandler(summon_thorns))
+register_weapon([WeaponEnum.BARRICADE], EffectHandler(summon_barricade))
+
+# Other.
+register_weapon([WeaponEnum.MAKU], EffectHandler(maku))
+register_weapon([WeaponEnum.SIGNATURE_MOVE], EffectHandler(signature_move))
+# We don't care about enemy attack queues
+register_weapon([WeaponEnum.COPYCAT_MIRROR], EffectHandler(nothing))
+register_weapon([WeaponEnum.SHIELD_SELF], EffectHandler(shield_self))
+register_weapon([WeaponEnum.SHIELD_ALLY], EffectHandler(shield_ally))
+register_weapon([WeaponEnum.CURSE], EffectHandler(curse))
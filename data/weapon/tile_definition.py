@@ -0,0 +1,68 @@
+from typing import Dict, Optional, Tuple
+
+from data.weapon.weapon_enums import WeaponEnum, WeaponAttackEffectEnum, WeaponTileEffectEnum
+
+
+class TileDefinition:
+    """
+    What makes a tile the tile it is, everything but its charge and strength.
+    Definitions are interned: equal ones are the very same object, so they compare with "is".
+    """
+    __slots__ = ("weapon_type", "attack_effect", "tile_effect", "cooldown", "base_strength", "level", "max_level")
+    weapon_type: WeaponEnum
+    attack_effect: Optional[WeaponAttackEffectEnum]
+    tile_effect: Optional[WeaponTileEffectEnum]
+    cooldown: int
+    base_strength: int
+    level: int
+    max_level: int
+
+    def __init__(self,
+                 weapon_type: WeaponEnum,
+                 attack_effect: Optional[WeaponAttackEffectEnum],
+                 tile_effect: Optional[WeaponTileEffectEnum],
+                 cooldown: int,
+                 base_strength: int,
+                 level: int,
+                 max_level: int):
+        self.weapon_type = weapon_type
+        self.attack_effect = attack_effect
+        self.tile_effect = tile_effect
+        self.cooldown = cooldown
+        self.base_strength = base_strength
+        self.level = level
+        self.max_level = max_level
+
+    @staticmethod
+    def of(weapon_type: WeaponEnum,
+           attack_effect: Optional[WeaponAttackEffectEnum],
+           tile_effect: Optional[WeaponTileEffectEnum],
+           cooldown: int,
+           base_strength: int,
+           level: int,
+           max_level: int):
+        key = (weapon_type, attack_effect, tile_effect, cooldown, base_strength, level, max_level)
+        definition = tile_definitions.get(key)
+        if definition is None:
+            definition = tile_definitions.setdefault(key, TileDefinition(*key))
+        return definition
+
+    def get_key(self) -> Tuple:
+        return (self.weapon_type, self.attack_effect, self.tile_effect, self.cooldown, self.base_strength, self.level,
+                self.max_level)
+
+    def with_attack_effect(self, attack_effect: Optional[WeaponAttackEffectEnum]):
+        if attack_effect == self.attack_effect:
+            return self
+        return TileDefinition.of(self.weapon_type, attack_effect, self.tile_effect, self.cooldown,
+                                 self.base_strength, self.level, self.max_level)
+
+    def __repr__(self) -> str:
+        return f"TileDefinition{self.get_key()}"
+
+    def __reduce__(self):
+        # Copies and other processes get the interned definition too.
+        return TileDefinition.of, self.get_key()
+
+
+tile_definitions: Dict[Tuple, TileDefinition] = {}
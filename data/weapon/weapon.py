@@ -1,22 +1,19 @@
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 from constants import WEAPON_TYPE, MAX_LEVEL, LEVEL, BASE_STRENGTH, STRENGTH, COOLDOWN_CHARGE, COOLDOWN, \
     WEAPON_TILE_EFFECT, WEAPON_ATTACK_EFFECT
 from data.mappers import weapon_mapper, weapon_attack_effect_mapper
 from data.snapshot.prediction_error import PredictionError
+from data.snapshot.undo_tracked import UndoTracked
+from data.weapon.tile_definition import TileDefinition
 from data.weapon.weapon_enums import WeaponAttackEffectEnum, WeaponTileEffectEnum, WeaponEnum
 
 
-class Weapon:
-    weapon_type: WeaponEnum
-    attack_effect: Optional[WeaponAttackEffectEnum]
-    tile_effect: Optional[WeaponTileEffectEnum]
-    cooldown: int
+class Weapon(UndoTracked):
+    __slots__ = ("tile", "cooldown_charge", "strength")
+    tile: TileDefinition  # shared by all copies of the tile
     cooldown_charge: int
     strength: int
-    base_strength: int
-    level: int
-    max_level: int
 
     def __init__(self,
                  weapon_type: WeaponEnum,
@@ -28,15 +25,41 @@ class Weapon:
                  max_level: int,
                  attack_effect: Optional[WeaponAttackEffectEnum] = None,
                  tile_effect: Optional[WeaponTileEffectEnum] = None):
-        self.weapon_type = weapon_type
-        self.cooldown = cooldown
+        self.tile = TileDefinition.of(weapon_type, attack_effect, tile_effect, cooldown, base_strength, level,
+                                      max_level)
         self.cooldown_charge = cooldown_charge
         self.strength = strength
-        self.base_strength = base_strength
-        self.level = level
-        self.max_level = max_level
-        self.attack_effect = attack_effect
-        self.tile_effect = tile_effect
+
+    @property
+    def weapon_type(self) -> WeaponEnum:
+        return self.tile.weapon_type
+
+    @property
+    def attack_effect(self) -> Optional[WeaponAttackEffectEnum]:
+        return self.tile.attack_effect
+
+    @property
+    def tile_effect(self) -> Optional[WeaponTileEffectEnum]:
+        return self.tile.tile_effect
+
+    @property
+    def cooldown(self) -> int:
+        return self.tile.cooldown
+
+    @property
+    def base_strength(self) -> int:
+        return self.tile.base_strength
+
+    @property
+    def level(self) -> int:
+        return self.tile.level
+
+    @property
+    def max_level(self) -> int:
+        return self.tile.max_level
+
+    def set_attack_effect(self, attack_effect: Optional[WeaponAttackEffectEnum]) -> None:
+        self.tile = self.tile.with_attack_effect(attack_effect)
 
     @staticmethod
     def signature_move():
@@ -214,16 +237,12 @@ class Weapon:
         return ", ".join(x.debug_print() for x in weapon_list)
 
     def is_equal(self, other, debug=False) -> bool:
+        if self is other:
+            return True
         if not debug:
-            return self.weapon_type == other.weapon_type and \
-                   self.cooldown == other.cooldown and \
+            return self.tile is other.tile and \
                    self.cooldown_charge == other.cooldown_charge and \
-                   self.strength == other.strength and \
-                   self.base_strength == other.base_strength and \
-                   self.level == other.level and \
-                   self.max_level == other.max_level and \
-                   self.attack_effect == other.attack_effect and \
-                   self.tile_effect == other.tile_effect
+                   self.strength == other.strength
         if self.weapon_type != other.weapon_type:
             raise PredictionError(f"Wrong weapon type")
         if self.cooldown != other.cooldown:
@@ -245,16 +264,17 @@ class Weapon:
         return True
 
     def is_same_tile(self, other) -> bool:
-        return self.weapon_type == other.weapon_type and \
-               self.cooldown == other.cooldown and \
-               self.base_strength == other.base_strength and \
-               self.level == other.level and \
-               self.max_level == other.max_level and \
-               self.attack_effect == other.attack_effect and \
-               self.tile_effect == other.tile_effect
+        return self.tile is other.tile
+
+    def get_key(self) -> Tuple:
+        # Equal weapons have equal keys, see is_equal.
+        return self.tile, self.cooldown_charge, self.strength
 
     @staticmethod
     def is_list_equal(first, other) -> bool:
+        # Decks shared between snapshots are the very same list.
+        if first is other:
+            return True
         if len(first) != len(other):
             return False
         for i in range(len(first)):
@@ -318,16 +338,12 @@ class Weapon:
         }
 
     def clone(self):
-        return Weapon(
-            weapon_type=self.weapon_type,
-            attack_effect=self.attack_effect,
-            tile_effect=self.tile_effect,
-            cooldown=self.cooldown,
-            cooldown_charge=self.cooldown_charge,
-            strength=self.strength,
-            base_strength=self.base_strength,
-            level=self.level,
-            max_level=self.max_level)
+        # Skips the keyword arguments of __init__, the hot paths clone thousands of weapons per turn.
+        clone = Weapon.__new__(Weapon)
+        clone.tile = self.tile
+        clone.cooldown_charge = self.cooldown_charge
+        clone.strength = self.strength
+        return clone
 
     def use(self):
         self.cooldown_charge = 0
@@ -30,7 +30,7 @@ class History:
 
     def clone(self, snapshot):
         # TODO actually implement this (or is there even any need?)
-        history = History(snapshot, {})
+        history = History(snapshot, self.map.map_shops, self.map.corrupted_boss_sectors)
         history.room.traps = self.room.traps.copy()
         history.room.corrupted_waves = [wave.clone() for wave in self.room.corrupted_waves]
         history.room.bombs = self.room.bombs.copy()
@@ -1,10 +1,11 @@
 from typing import Dict, List, Optional, Tuple
 
 from data.entity.entity_position import EntityPosition
+from data.snapshot.undo_tracked import UndoTracked
 from data.weapon.weapon import Weapon
 
 
-class CorruptedWave:
+class CorruptedWave(UndoTracked):
     strength: int
     position: EntityPosition
 
@@ -21,7 +22,7 @@ class CorruptedWave:
         )
 
 
-class RoomHistory:
+class RoomHistory(UndoTracked):
     traps: Dict[int, int]  # cell: strength
     thorns: Dict[int, Weapon]  # cell: weapon
     bombs: Dict[int, List[List[int]]]  # cell: time, strength
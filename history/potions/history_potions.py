@@ -15,6 +15,9 @@ class PotionHistory:
     assured_guess_queue: List[Tuple[int, PickupEnum]] = []
 
     def __init__(self, first_snapshot=None):
+        # Per instance, so that replaying several runs in one process does not mix them up.
+        self.current_guess_matrix = {}
+        self.assured_guess_queue = []
         if first_snapshot is not None:
             all_types = [
                 PickupEnum.EDAMAME_BREW,
@@ -357,5 +360,5 @@ class PotionHistory:
                 if potion_id not in reduced_guesses:
                     reduced_guesses[potion_id] = set()
                 reduced_guesses[potion_id].add(potion_type)
-        for potion_id, possible_types in reduced_guesses:
+        for potion_id, possible_types in reduced_guesses.items():
             self.broad_guess(potion_id, possible_types)
@@ -0,0 +1,67 @@
+"""
+Minimal JSON-patch style deltas between two decoded save files.
+Paths are lists of keys/indices rather than JSON pointers, so no escaping is needed.
+"""
+from typing import Any, List
+
+REPLACE = "r"
+ADD = "a"
+REMOVE = "d"
+
+
+def diff(old: Any, new: Any, path: List = None) -> List[List]:
+    path = path or []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append([ADD, path + [key], value])
+            elif old[key] != value:
+                ops.extend(diff(old[key], value, path + [key]))
+        for key in old:
+            if key not in new:
+                ops.append([REMOVE, path + [key]])
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for index in range(common):
+            if old[index] != new[index]:
+                ops.extend(diff(old[index], new[index], path + [index]))
+        for index in range(common, len(new)):
+            ops.append([ADD, path + [index], new[index]])
+        # Remove from the back so that earlier indices stay valid.
+        for index in range(len(old) - 1, common - 1, -1):
+            ops.append([REMOVE, path + [index]])
+        return ops
+    if old == new and type(old) == type(new):
+        return []
+    return [[REPLACE, path, new]]
+
+
+def patch(document: Any, ops: List[List]) -> Any:
+    """
+    Apply the ops without touching the original document.
+    Only containers along the changed paths are copied, everything else is shared.
+    """
+    for op in ops:
+        document = apply_op(document, op[0], op[1], op[2] if len(op) > 2 else None)
+    return document
+
+
+def apply_op(document: Any, kind: str, path: List, value: Any) -> Any:
+    if not path:
+        if kind == REMOVE:
+            raise ValueError("Cannot remove the whole document")
+        return value
+    container = document.copy()
+    key = path[0]
+    if len(path) > 1:
+        container[key] = apply_op(container[key], kind, path[1:], value)
+    elif kind == REMOVE:
+        del container[key]
+    elif kind == ADD and isinstance(container, list):
+        container.insert(key, value)
+    else:
+        container[key] = value
+    return container
@@ -0,0 +1,199 @@
+import json
+import os
+import struct
+import zlib
+from bisect import bisect_right
+from time import time, strftime, localtime
+from typing import Dict, List, Optional, Iterator
+
+from constants import RUN_STATS, TURNS
+from journal.json_delta import diff, patch
+
+JOURNAL_EXTENSION = ".journal"
+INDEX_EXTENSION = ".index"
+RECORD_HEADER = struct.Struct("<ddBI")  # wall time, file mtime, kind, compressed length
+INDEX_ENTRY = struct.Struct("<QIiddB")  # offset, compressed length, turn, wall time, file mtime, kind
+KEYFRAME = 0
+DELTA = 1
+DEFAULT_KEYFRAME_INTERVAL = 32
+
+
+class JournalIndexEntry:
+    offset: int
+    length: int
+    turn: int
+    wall_time: float
+    modified_time: float
+    kind: int
+
+    def __init__(self, offset: int, length: int, turn: int, wall_time: float, modified_time: float, kind: int):
+        self.offset = offset
+        self.length = length
+        self.turn = turn
+        self.wall_time = wall_time
+        self.modified_time = modified_time
+        self.kind = kind
+
+    def to_bytes(self) -> bytes:
+        return INDEX_ENTRY.pack(self.offset, self.length, self.turn, self.wall_time, self.modified_time, self.kind)
+
+    @staticmethod
+    def from_bytes(source: bytes, offset: int = 0):
+        return JournalIndexEntry(*INDEX_ENTRY.unpack_from(source, offset))
+
+
+class JournalRecord:
+    wall_time: float
+    modified_time: float
+    raw_data: Dict
+
+    def __init__(self, wall_time: float, modified_time: float, raw_data: Dict):
+        self.wall_time = wall_time
+        self.modified_time = modified_time
+        self.raw_data = raw_data
+
+    def get_turn(self) -> int:
+        return get_turn(self.raw_data)
+
+
+def get_turn(raw_data: Dict) -> int:
+    return raw_data.get(RUN_STATS, {}).get(TURNS, -1)
+
+
+def new_journal_path(journal_dir: str) -> str:
+    return os.path.join(journal_dir, strftime("run-%Y%m%d-%H%M%S", localtime()))
+
+
+class RunJournalWriter:
+    """
+    Append-only journal of every distinct save payload seen during a run.
+    Every keyframe_interval-th record is a full save, the ones in between only store a delta to the previous save.
+    Records are zlib-compressed JSON; a fixed-size index next to it allows seeking by record or turn.
+    """
+    path: str
+    compression_level: int
+    keyframe_interval: int
+    records_written: int
+    keyframes_written: int
+    bytes_written: int
+    raw_bytes: int
+    last_raw_data: Optional[Dict]
+
+    def __init__(self, path: str, compression_level: int = 6, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        self.path = path
+        self.compression_level = compression_level
+        self.keyframe_interval = max(1, keyframe_interval)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.journal_file = open(path + JOURNAL_EXTENSION, mode='ab')
+        self.index_file = open(path + INDEX_EXTENSION, mode='ab')
+        self.records_written = 0
+        self.keyframes_written = 0
+        self.bytes_written = 0
+        self.raw_bytes = 0
+        self.last_raw_data = None
+
+    def append(self, raw_data: Dict, modified_time: float, wall_time: Optional[float] = None) -> None:
+        wall_time = time() if wall_time is None else wall_time
+        # The first record of every writer is a keyframe, so appending to an existing journal stays decodable.
+        if self.last_raw_data is None or self.records_written % self.keyframe_interval == 0:
+            kind = KEYFRAME
+            payload = raw_data
+            self.keyframes_written += 1
+        else:
+            kind = DELTA
+            payload = diff(self.last_raw_data, raw_data)
+        # Saves are never modified after decoding, so keeping a reference is enough.
+        self.last_raw_data = raw_data
+        compressed = zlib.compress(json.dumps(payload, separators=(',', ':')).encode(), self.compression_level)
+        offset = self.journal_file.tell()
+        self.journal_file.write(RECORD_HEADER.pack(wall_time, modified_time, kind, len(compressed)) + compressed)
+        self.journal_file.flush()
+        entry = JournalIndexEntry(offset, len(compressed), get_turn(raw_data), wall_time, modified_time, kind)
+        self.index_file.write(entry.to_bytes())
+        self.index_file.flush()
+        self.records_written += 1
+        self.bytes_written += RECORD_HEADER.size + len(compressed)
+        self.raw_bytes += len(json.dumps(raw_data, separators=(',', ':')))
+
+    def close(self) -> None:
+        self.journal_file.close()
+        self.index_file.close()
+
+    def pretty_print(self) -> str:
+        ratio = self.raw_bytes / self.bytes_written if self.bytes_written else 0
+        return (f"Journal {self.path}: {self.records_written} saves ({self.keyframes_written} keyframes), "
+                f"{self.bytes_written} bytes, {ratio:.1f}x smaller than raw saves")
+
+
+class RunJournalReader:
+    path: str
+    entries: List[JournalIndexEntry]
+    keyframes: List[int]
+    cached_index: int
+    cached_raw_data: Optional[Dict]
+
+    def __init__(self, path: str):
+        if path.endswith(JOURNAL_EXTENSION):
+            path = path[:-len(JOURNAL_EXTENSION)]
+        self.path = path
+        with open(path + INDEX_EXTENSION, mode='rb') as index_file:
+            index = index_file.read()
+        # A crash mid-write can leave a partial entry at the end, ignore it.
+        total = len(index) // INDEX_ENTRY.size
+        self.entries = [JournalIndexEntry.from_bytes(index, i * INDEX_ENTRY.size) for i in range(total)]
+        self.keyframes = []
+        last_keyframe = -1
+        for i, entry in enumerate(self.entries):
+            if entry.kind == KEYFRAME:
+                last_keyframe = i
+            self.keyframes.append(last_keyframe)
+        self.cached_index = -1
+        self.cached_raw_data = None
+        self.journal_file = open(path + JOURNAL_EXTENSION, mode='rb')
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[JournalRecord]:
+        for i in range(len(self.entries)):
+            yield self.read(i)
+
+    def read_payload(self, index: int):
+        entry = self.entries[index]
+        self.journal_file.seek(entry.offset + RECORD_HEADER.size)
+        return json.loads(zlib.decompress(self.journal_file.read(entry.length)))
+
+    def read(self, index: int) -> JournalRecord:
+        if index < 0:
+            index += len(self.entries)
+        entry = self.entries[index]
+        keyframe = self.keyframes[index]
+        if keyframe < 0:
+            raise ValueError(f"Record {index} of {self.path} has no keyframe before it")
+        # Continue from the last rebuilt record when possible, so sequential reads only apply one delta each.
+        if keyframe <= self.cached_index <= index:
+            start, raw_data = self.cached_index + 1, self.cached_raw_data
+        else:
+            start, raw_data = keyframe + 1, self.read_payload(keyframe)
+        for i in range(start, index + 1):
+            raw_data = patch(raw_data, self.read_payload(i))
+        self.cached_index = index
+        self.cached_raw_data = raw_data
+        return JournalRecord(wall_time=entry.wall_time, modified_time=entry.modified_time, raw_data=raw_data)
+
+    def find_turn(self, turn: int) -> Optional[int]:
+        # Turns never decrease within a run; the last record of a turn is its final state.
+        turns = [entry.turn for entry in self.entries]
+        index = bisect_right(turns, turn) - 1
+        if index < 0 or turns[index] != turn:
+            return None
+        return index
+
+    def read_turn(self, turn: int) -> Optional[JournalRecord]:
+        index = self.find_turn(turn)
+        return None if index is None else self.read(index)
+
+    def close(self) -> None:
+        self.journal_file.close()
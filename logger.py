@@ -3,8 +3,10 @@ Provide easy-to-use, minimal typing required
 overlay for using Colorama in CLI.
 Designed with black command line background in mind.
 """
+import threading
+from contextlib import contextmanager
 from enum import Enum
-from typing import List
+from typing import List, Union, Callable, Iterator
 
 from colorama import Back
 from colorama import Fore
@@ -44,11 +46,15 @@ class Message:
         self.text = text
 
 
+# The text of a message, or a function making it. The function is called when the message gets queued, not when
+# printed: what it describes keeps changing. Nothing is made at all for a log type not shown or while muted.
+LogText = Union[str, Callable[[], str]]
+
+
 class Logger:
     # Remember whether the newest message should begin from a new line or not.
     last_continuous: bool = False
     indent: int = 0
-    queue: List[Message]
     log_levels: List[LogType]
     bright_logs: bool = False
 
@@ -57,7 +63,48 @@ class Logger:
         init()
         self.log_levels = [LogType.DEBUG, LogType.DETAIL]
         # self.log_level = LogType.SPLITS
-        self.queue = []
+        self.local = threading.local()
+
+    @property
+    def queue(self) -> List[Message]:
+        # Every thread queues separately, so background simulations don't mix into the current turn.
+        if not hasattr(self.local, "queue"):
+            self.local.queue = []
+        return self.local.queue
+
+    @queue.setter
+    def queue(self, queue: List[Message]) -> None:
+        self.local.queue = queue
+
+    def is_muted(self) -> bool:
+        return getattr(self.local, "muted", False)
+
+    def is_queued(self, log_type: LogType) -> bool:
+        return log_type in self.log_levels and not self.is_muted()
+
+    @contextmanager
+    def muted(self) -> Iterator[None]:
+        """
+        Drop whatever this thread queues meanwhile, without even formatting it.
+        For work whose messages are rarely shown, and that can be redone when they are.
+        """
+        muted = self.is_muted()
+        self.local.muted = True
+        try:
+            yield
+        finally:
+            self.local.muted = muted
+
+    def queue_message(self, message_type: MessageType, log_type: LogType, text: LogText) -> None:
+        if not self.is_queued(log_type):
+            return
+        if not isinstance(text, str):
+            text = text()
+        self.queue.append(Message(message_type, log_type, text))
+
+    def queue_messages(self, messages: List[Message]) -> None:
+        if not self.is_muted():
+            self.queue.extend(messages)
 
     def line(self) -> None:
         print()
@@ -132,80 +179,80 @@ class Logger:
     def debug_text(self, message: str):
         self.print_message(Message(MessageType.TEXT, LogType.DEBUG, message))
 
-    def queue_debug_text(self, message: str):
-        self.queue.append(Message(MessageType.TEXT, LogType.DEBUG, message))
+    def queue_debug_text(self, message: LogText):
+        self.queue_message(MessageType.TEXT, LogType.DEBUG, message)
 
     def debug_info(self, message: str):
         self.print_message(Message(MessageType.INFO, LogType.DEBUG, message))
 
-    def queue_debug_info(self, message: str):
-        self.queue.append(Message(MessageType.INFO, LogType.DEBUG, message))
+    def queue_debug_info(self, message: LogText):
+        self.queue_message(MessageType.INFO, LogType.DEBUG, message)
 
     def debug_warn(self, message: str):
         self.print_message(Message(MessageType.WARN, LogType.DEBUG, message))
 
-    def queue_debug_warn(self, message: str):
-        self.queue.append(Message(MessageType.WARN, LogType.DEBUG, message))
+    def queue_debug_warn(self, message: LogText):
+        self.queue_message(MessageType.WARN, LogType.DEBUG, message)
 
     def debug_error(self, message: str):
         self.print_message(Message(MessageType.ERROR, LogType.DEBUG, message))
 
-    def queue_debug_error(self, message: str):
-        self.queue.append(Message(MessageType.ERROR, LogType.DEBUG, message))
+    def queue_debug_error(self, message: LogText):
+        self.queue_message(MessageType.ERROR, LogType.DEBUG, message)
 
     def debug_success(self, message: str):
         self.print_message(Message(MessageType.SUCCESS, LogType.DEBUG, message))
 
-    def queue_debug_success(self, message: str):
-        self.queue.append(Message(MessageType.SUCCESS, LogType.DEBUG, message))
+    def queue_debug_success(self, message: LogText):
+        self.queue_message(MessageType.SUCCESS, LogType.DEBUG, message)
 
     def detail_text(self, message: str):
         self.print_message(Message(MessageType.TEXT, LogType.DETAIL, message))
 
-    def queue_detail_text(self, message: str):
-        self.queue.append(Message(MessageType.TEXT, LogType.DETAIL, message))
+    def queue_detail_text(self, message: LogText):
+        self.queue_message(MessageType.TEXT, LogType.DETAIL, message)
 
     def detail_info(self, message: str):
         self.print_message(Message(MessageType.INFO, LogType.DETAIL, message))
 
-    def queue_detail_info(self, message: str):
-        self.queue.append(Message(MessageType.INFO, LogType.DETAIL, message))
+    def queue_detail_info(self, message: LogText):
+        self.queue_message(MessageType.INFO, LogType.DETAIL, message)
 
     def detail_error(self, message: str):
         self.print_message(Message(MessageType.ERROR, LogType.DETAIL, message))
 
-    def queue_detail_error(self, message: str):
-        self.queue.append(Message(MessageType.ERROR, LogType.DETAIL, message))
+    def queue_detail_error(self, message: LogText):
+        self.queue_message(MessageType.ERROR, LogType.DETAIL, message)
 
     def detail_success(self, message: str):
         self.print_message(Message(MessageType.SUCCESS, LogType.DETAIL, message))
 
-    def queue_detail_success(self, message: str):
-        self.queue.append(Message(MessageType.SUCCESS, LogType.DETAIL, message))
+    def queue_detail_success(self, message: LogText):
+        self.queue_message(MessageType.SUCCESS, LogType.DETAIL, message)
 
     def splits_text(self, message: str):
         self.print_message(Message(MessageType.TEXT, LogType.SPLITS, message))
 
-    def queue_splits_text(self, message: str):
-        self.queue.append(Message(MessageType.TEXT, LogType.SPLITS, message))
+    def queue_splits_text(self, message: LogText):
+        self.queue_message(MessageType.TEXT, LogType.SPLITS, message)
 
     def splits_info(self, message: str):
         self.print_message(Message(MessageType.INFO, LogType.SPLITS, message))
 
-    def queue_splits_info(self, message: str):
-        self.queue.append(Message(MessageType.INFO, LogType.SPLITS, message))
+    def queue_splits_info(self, message: LogText):
+        self.queue_message(MessageType.INFO, LogType.SPLITS, message)
 
     def splits_error(self, message: str):
         self.print_message(Message(MessageType.ERROR, LogType.SPLITS, message))
 
-    def queue_splits_error(self, message: str):
-        self.queue.append(Message(MessageType.ERROR, LogType.SPLITS, message))
+    def queue_splits_error(self, message: LogText):
+        self.queue_message(MessageType.ERROR, LogType.SPLITS, message)
 
     def splits_success(self, message: str):
         self.print_message(Message(MessageType.SUCCESS, LogType.SPLITS, message))
 
-    def queue_splits_success(self, message: str):
-        self.queue.append(Message(MessageType.SUCCESS, LogType.SPLITS, message))
+    def queue_splits_success(self, message: LogText):
+        self.queue_message(MessageType.SUCCESS, LogType.SPLITS, message)
 
 
 logger = Logger()
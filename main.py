@@ -5,24 +5,46 @@ from json import JSONDecodeError
 from time import sleep
 
 from compare.compare import compare_snapshots
+from compare.speculation import speculator
+from data.snapshot.enemy_phase_cache import enemy_phase_cache, DEFAULT_CAPACITY
+from data.snapshot.save_reader import save_reader
+from data.snapshot.section_cache import section_cache
 from data.snapshot.snapshot import Snapshot
+from data.snapshot.torn_save_error import TornSaveError
+from data.snapshot.undo_log import undo_log
+from journal.run_journal import RunJournalWriter, new_journal_path, DEFAULT_KEYFRAME_INTERVAL
 from logger import logger, MessageType
 from options import set_options, read_options
 from test_data import test_remade_data
+from watcher.save_watcher import SaveWatcher, DEFAULT_POLL_INTERVAL
 
 
 def get_time(file):
     return os.stat(file).st_mtime
 
 
+def read_first_snapshot(filename: str) -> Snapshot:
+    # Unlike in the loop, there is no previous save to go on with; wait until the game is done writing this one.
+    while True:
+        try:
+            return Snapshot.from_file(filename, True)
+        except TornSaveError as e:
+            logger.debug_error(str(e))
+            sleep(1)
+
+
 def main_loop(too_early=False):
     options = read_options()
     save_file = "RunSaveData.dat"
-    filename = options['save_dir'] + "\\" + save_file
+    filename = os.path.join(options['save_dir'], save_file)
     logger.bright_logs = options['bright_logs']
+    speculator.enabled = options.get('speculate', False)
+    undo_log.enabled = options.get('undo_log', False)
+    undo_log.differential_check = options.get('undo_log_check', False)
+    enemy_phase_cache.capacity = options.get('enemy_phase_cache', DEFAULT_CAPACITY)
 
     try:
-        last_recorded_edited_time = get_time(filename)
+        get_time(filename)
     except FileNotFoundError:
         logger.debug_info("Run not yet started")
         sleep(1)
@@ -31,31 +53,76 @@ def main_loop(too_early=False):
     if too_early:
         logger.debug_success("Run has started")
 
-    previous_snapshot = Snapshot.from_file(filename, True)
+    # Only record the saves, analysis happens later with the replay runner.
+    capture_only = options.get('capture_only', False)
+    if capture_only and not options.get('journal_dir'):
+        raise ValueError("Capture only mode requires journal_dir to be set")
+
+    # Start watching before the first read so that no write is missed; one it already saw comes back as unchanged.
+    watcher = SaveWatcher.create(filename, options.get('poll_interval', DEFAULT_POLL_INTERVAL))
+    previous_snapshot = read_first_snapshot(filename)
+    journal = None
+    if options.get('journal_dir'):
+        journal = RunJournalWriter(new_journal_path(options['journal_dir']),
+                                   keyframe_interval=options.get('journal_keyframe_interval', DEFAULT_KEYFRAME_INTERVAL))
+        journal.append(previous_snapshot.raw_data, get_time(filename))
     # TODO another dev checkup to see if cheat production works well
-    try:
-        with open(filename, mode='r') as source_file:
-            source = source_file.read()
-        raw_data = json.loads(base64.b64decode(source))
-        remade_snapshot = previous_snapshot.to_dict()
-        test_remade_data(raw_data, remade_snapshot)
-    except JSONDecodeError:
-        pass  # don't much care
+    if not capture_only:
+        try:
+            with open(filename, mode='r') as source_file:
+                source = source_file.read()
+            raw_data = json.loads(base64.b64decode(source))
+            remade_snapshot = previous_snapshot.to_dict()
+            test_remade_data(raw_data, remade_snapshot)
+        except JSONDecodeError:
+            pass  # don't much care
 
-    compare_snapshots(None, previous_snapshot)
+    if capture_only:
+        logger.debug_info("Capturing saves only, replay them later for analysis")
+    else:
+        compare_snapshots(None, previous_snapshot)
+        speculator.start(previous_snapshot)
 
     while True:
         try:
-            current_last_edited_time = get_time(filename)
-            if current_last_edited_time != last_recorded_edited_time:
-                last_recorded_edited_time = current_last_edited_time
+            wake_up = watcher.wait_for_write()
+            if wake_up is None:
+                raise FileNotFoundError(filename)
+            logger.debug_text(f"Save file change noticed after {wake_up.latency_ms():.1f} ms")
+            try:
                 new_snapshot = Snapshot.from_file(filename)
-                history = compare_snapshots(previous_snapshot, new_snapshot)
-                previous_snapshot = new_snapshot
-                previous_snapshot.history = history
+            except TornSaveError as e:
+                # Skip this write, the next one will bring the game up to date.
+                logger.debug_error(str(e))
+                continue
+            if new_snapshot is None:
+                logger.debug_text("Save file rewritten without changes")
+                continue
+            if journal is not None:
+                journal.append(new_snapshot.raw_data, wake_up.modified_time)
+            if capture_only:
+                continue
+            history = compare_snapshots(previous_snapshot, new_snapshot)
+            previous_snapshot = new_snapshot
+            previous_snapshot.history = history
+            # Get the next turn simulated while the game waits for the player.
+            speculator.start(previous_snapshot)
         except FileNotFoundError:
+            watcher.close()
             logger.line()
             logger.nice_print([MessageType.INFO], "Run finished")
+            logger.debug_info(watcher.stats.pretty_print())
+            logger.debug_info(save_reader.pretty_print())
+            logger.debug_info(section_cache.pretty_print())
+            if speculator.enabled:
+                logger.debug_info(speculator.pretty_print())
+            if undo_log.enabled:
+                logger.debug_info(undo_log.pretty_print())
+            if enemy_phase_cache.capacity:
+                logger.debug_info(enemy_phase_cache.pretty_print())
+            if journal is not None:
+                journal.close()
+                logger.debug_info(journal.pretty_print())
             break
 
 
@@ -14,6 +14,14 @@ def set_options():
     options = {
         "save_dir": "C:\\Users\\szpot\\AppData\\LocalLow\\Roboatino\\ShogunShowdown",
         "bright_logs": False,
+        "poll_interval": 0.1,
+        "journal_dir": None,  # e.g. "runs" to journal every save
+        "journal_keyframe_interval": 32,
+        "capture_only": False,
+        "speculate": False,
+        "undo_log": False,
+        "undo_log_check": False,
+        "enemy_phase_cache": 0,
     }
     with open("options.json", mode='w') as file:
         file.write(json.dumps(options))
@@ -0,0 +1,176 @@
+"""
+Replay every journal of a directory, spreading whole runs over all cores.
+Usage: python -m replay.batch_analyzer [--workers N] [--stop-at-unresolved] DIRECTORY
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import List, Optional
+
+from data.other_enums import TurnVerdict
+from journal.run_journal import JOURNAL_EXTENSION
+from logger import logger
+from replay.replay_runner import replay_run, ReplayResult
+
+
+class RunSummary:
+    path: str
+    saves: int
+    battle_turns: int
+    resolved: int
+    ambiguous: int
+    unresolved: int
+    errors: int
+    turn_time: float  # spent in battle turns only
+    total_time: float
+    stopped_at_turn: Optional[int]
+
+    def __init__(self, path: str, saves: int = 0, battle_turns: int = 0, resolved: int = 0, ambiguous: int = 0,
+                 unresolved: int = 0, errors: int = 0, turn_time: float = 0, total_time: float = 0,
+                 stopped_at_turn: Optional[int] = None):
+        self.path = path
+        self.saves = saves
+        self.battle_turns = battle_turns
+        self.resolved = resolved
+        self.ambiguous = ambiguous
+        self.unresolved = unresolved
+        self.errors = errors
+        self.turn_time = turn_time
+        self.total_time = total_time
+        self.stopped_at_turn = stopped_at_turn
+
+    @staticmethod
+    def from_result(result: ReplayResult):
+        battle_turns = result.battle_turns()
+        return RunSummary(
+            path=result.path,
+            saves=len(result.reports),
+            battle_turns=len(battle_turns),
+            resolved=result.count(TurnVerdict.SOLVED) + result.count(TurnVerdict.VICTORY),
+            ambiguous=result.count(TurnVerdict.AMBIGUOUS),
+            unresolved=result.count(TurnVerdict.NOT_FOUND),
+            errors=result.errors(),
+            turn_time=sum(report.duration for report in battle_turns),
+            total_time=result.total_time,
+            stopped_at_turn=None if result.stopped_at is None else result.stopped_at.turn,
+        )
+
+    def time_per_turn(self) -> float:
+        return self.turn_time / self.battle_turns if self.battle_turns else 0
+
+    def pretty_print(self) -> str:
+        result = " ".join([
+            os.path.basename(self.path).ljust(24),
+            f"turns {self.battle_turns}".ljust(10),
+            f"resolved {self.resolved}".ljust(13),
+            f"ambiguous {self.ambiguous}".ljust(13),
+            f"unresolved {self.unresolved}".ljust(14),
+            f"{self.time_per_turn() * 1000:.1f} ms/turn",
+        ])
+        if self.errors:
+            result += f", errors {self.errors}"
+        if self.stopped_at_turn is not None:
+            result += f", stopped at turn {self.stopped_at_turn}"
+        return result
+
+
+class BatchReport:
+    summaries: List[RunSummary]
+    wall_time: float
+    workers: int
+
+    def __init__(self, workers: int):
+        self.summaries = []
+        self.wall_time = 0
+        self.workers = workers
+
+    def add(self, summary: RunSummary) -> None:
+        self.summaries.append(summary)
+
+    def total(self, field: str):
+        return sum(getattr(summary, field) for summary in self.summaries)
+
+    def pretty_print(self) -> str:
+        battle_turns = self.total("battle_turns")
+        cpu_time = self.total("total_time")
+        lines = [
+            f"Runs: {len(self.summaries)}, battle turns: {battle_turns}",
+            f"Resolved: {self.total('resolved')}, ambiguous: {self.total('ambiguous')}, "
+            f"unresolved: {self.total('unresolved')}, errors: {self.total('errors')}",
+            f"Runs with unresolved turns: {len([s for s in self.summaries if s.unresolved or s.errors])}",
+        ]
+        if battle_turns:
+            lines.append(f"Time per turn: {self.total('turn_time') / battle_turns * 1000:.1f} ms")
+        if self.wall_time:
+            # Close to the number of workers when the runs scale well.
+            lines.append(f"Wall time: {self.wall_time:.2f} s on {self.workers} workers, "
+                         f"speedup {cpu_time / self.wall_time:.1f}x")
+        return "\n".join(lines)
+
+
+def find_journals(directory: str) -> List[str]:
+    paths = [
+        os.path.join(directory, name[:-len(JOURNAL_EXTENSION)])
+        for name in os.listdir(directory) if name.endswith(JOURNAL_EXTENSION)
+    ]
+    # Longest runs first, so that no worker is left with a big run at the end.
+    return sorted(paths, key=lambda path: os.path.getsize(path + JOURNAL_EXTENSION), reverse=True)
+
+
+def init_worker() -> None:
+    logger.log_levels = []
+    sys.stdout = open(os.devnull, mode='w')
+
+
+def analyze_run(path: str, stop_at_unresolved: bool) -> RunSummary:
+    try:
+        result = replay_run(path, stop_at_unresolved)
+    except Exception:
+        # Broken journal, the other runs still count.
+        return RunSummary(path=path, errors=1)
+    finally:
+        logger.clear_queue()
+    return RunSummary.from_result(result)
+
+
+def analyze_directory(directory: str, workers: Optional[int] = None, stop_at_unresolved: bool = False,
+                      on_summary=None) -> BatchReport:
+    paths = find_journals(directory)
+    workers = workers or os.cpu_count() or 1
+    report = BatchReport(workers)
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(analyze_run, path, stop_at_unresolved) for path in paths]
+        for future in as_completed(futures):
+            summary = future.result()
+            report.add(summary)
+            if on_summary is not None:
+                on_summary(summary)
+    report.wall_time = perf_counter() - start
+    report.summaries.sort(key=lambda summary: summary.path)
+    return report
+
+
+def main(arguments: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m replay.batch_analyzer", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("directory", help="directory with the journals of past runs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--stop-at-unresolved", action="store_true",
+                        help="stop each run at its first unresolved turn")
+    arguments = parser.parse_args(arguments)
+
+    report = analyze_directory(
+        arguments.directory,
+        workers=arguments.workers,
+        stop_at_unresolved=arguments.stop_at_unresolved,
+        on_summary=lambda summary: print(summary.pretty_print(), flush=True),
+    )
+    print()
+    print(report.pretty_print())
+    return 1 if report.total("unresolved") or report.total("errors") else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,119 @@
+"""
+Measure what a simulation's own copy of the state costs on a recorded save: memory, and copies per second.
+Usage: python -m replay.clone_benchmark [--index N] [--count N] JOURNAL
+"""
+import argparse
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import List, Tuple, Optional, Callable
+
+from constants import COMBAT_ROOM, ENEMIES
+from data.game_stats import GameStats
+from data.room.room_battle import BattleRoom
+from data.snapshot.snapshot import Snapshot
+from data.weapon.weapon import Weapon
+from journal.run_journal import RunJournalReader
+from replay.replay_runner import to_payload
+
+DEFAULT_COUNT = 2000
+
+
+class CloneBenchmark:
+    index: int
+    enemies: int
+    deck_size: int
+    bytes_per_simulation: float
+    simulations_per_second: float
+    weapon_clones_per_second: float
+
+    def __init__(self, index: int, enemies: int, deck_size: int, bytes_per_simulation: float,
+                 simulations_per_second: float, weapon_clones_per_second: float):
+        self.index = index
+        self.enemies = enemies
+        self.deck_size = deck_size
+        self.bytes_per_simulation = bytes_per_simulation
+        self.simulations_per_second = simulations_per_second
+        self.weapon_clones_per_second = weapon_clones_per_second
+
+    def pretty_print(self) -> str:
+        return "\n".join([
+            f"Save #{self.index}: {self.enemies} enemies, {self.deck_size} tiles in the deck",
+            f"  memory per simulation: {self.bytes_per_simulation:.0f} bytes",
+            f"  simulation copies per second: {self.simulations_per_second:.0f}",
+            f"  weapon clones per second: {self.weapon_clones_per_second:.0f}",
+        ])
+
+
+def copy_simulation_state(snapshot: Snapshot) -> Tuple[GameStats, List[Weapon], BattleRoom]:
+    # Everything a simulation copies once it changes it, see Simulation.
+    return snapshot.game_stats.clone(), [weapon.clone() for weapon in snapshot.hero_deck], snapshot.room.clone()
+
+
+def measure_memory(snapshot: Snapshot, count: int) -> float:
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        copies = [copy_simulation_state(snapshot) for _ in range(count)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (after - before) / len(copies)
+
+
+def measure_rate(function: Callable[[], object], count: int) -> float:
+    best = None
+    for _ in range(3):
+        start = perf_counter()
+        for _ in range(count):
+            function()
+        duration = perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return count / best
+
+
+def find_largest_battle(reader: RunJournalReader) -> Optional[int]:
+    largest = None
+    largest_enemies = 0
+    for index, record in enumerate(reader):
+        enemies = len(record.raw_data.get(COMBAT_ROOM, {}).get(ENEMIES, []))
+        if enemies > largest_enemies:
+            largest = index
+            largest_enemies = enemies
+    return largest
+
+
+def benchmark(path: str, index: Optional[int] = None, count: int = DEFAULT_COUNT) -> CloneBenchmark:
+    reader = RunJournalReader(path)
+    try:
+        if index is None:
+            index = find_largest_battle(reader)
+            if index is None:
+                raise ValueError(f"No battle found in {path}")
+        snapshot = Snapshot.from_payload(to_payload(reader.read(index).raw_data, None), True)
+    finally:
+        reader.close()
+    weapon = snapshot.hero_deck[0] if snapshot.hero_deck else Weapon.any()
+    return CloneBenchmark(
+        index=index,
+        enemies=len(snapshot.room.enemies),
+        deck_size=len(snapshot.hero_deck),
+        bytes_per_simulation=measure_memory(snapshot, count),
+        simulations_per_second=measure_rate(lambda: copy_simulation_state(snapshot), count),
+        weapon_clones_per_second=measure_rate(weapon.clone, count * 10),
+    )
+
+
+def main(arguments: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m replay.clone_benchmark", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("journal", help="journal path, with or without the .journal extension")
+    parser.add_argument("--index", type=int, default=None, help="save to measure, the largest battle by default")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="copies per measurement")
+    arguments = parser.parse_args(arguments)
+
+    print(benchmark(arguments.journal, arguments.index, arguments.count).pretty_print())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,197 @@
+"""
+Run the analysis over a recorded journal as fast as possible, without watching any file.
+Usage: python -m replay.replay_runner [--keep-going] [--verbose] [--undo-log | --check-undo-log] [--enemy-cache N]
+                                      JOURNAL...
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import traceback
+from time import perf_counter
+from typing import List, Optional, Dict, Iterator
+
+from compare.compare import compare_snapshots
+from data.other_enums import GamePhase, TurnVerdict
+from data.snapshot.enemy_phase_cache import enemy_phase_cache, DEFAULT_CAPACITY
+from data.snapshot.save_payload import SavePayload, get_digest
+from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_log import undo_log
+from journal.run_journal import RunJournalReader
+from logger import logger
+
+UNRESOLVED_VERDICTS = [TurnVerdict.NOT_FOUND]
+
+
+class TurnReport:
+    index: int
+    turn: int
+    game_phase: GamePhase
+    verdict: Optional[TurnVerdict]  # None outside of battle turns
+    duration: float
+    error: Optional[str]
+
+    def __init__(self, index: int, turn: int, game_phase: GamePhase, verdict: Optional[TurnVerdict],
+                 duration: float, error: Optional[str] = None):
+        self.index = index
+        self.turn = turn
+        self.game_phase = game_phase
+        self.verdict = verdict
+        self.duration = duration
+        self.error = error
+
+    def is_unresolved(self) -> bool:
+        return self.error is not None or self.verdict in UNRESOLVED_VERDICTS
+
+    def pretty_print(self) -> str:
+        verdict = self.verdict.name if self.verdict is not None else self.game_phase.name
+        result = f"#{self.index} turn {self.turn}: {verdict} in {self.duration * 1000:.1f} ms"
+        if self.error is not None:
+            result += f"\n{self.error}"
+        return result
+
+
+class ReplayResult:
+    path: str
+    reports: List[TurnReport]
+    stopped_at: Optional[TurnReport]  # first unresolved turn, if the replay stopped there
+    total_time: float
+
+    def __init__(self, path: str):
+        self.path = path
+        self.reports = []
+        self.stopped_at = None
+        self.total_time = 0
+
+    def count(self, verdict: TurnVerdict) -> int:
+        return len([report for report in self.reports if report.verdict == verdict])
+
+    def errors(self) -> int:
+        return len([report for report in self.reports if report.error is not None])
+
+    def battle_turns(self) -> List[TurnReport]:
+        return [report for report in self.reports if report.verdict is not None]
+
+    def slowest(self) -> Optional[TurnReport]:
+        if not self.reports:
+            return None
+        return max(self.reports, key=lambda report: report.duration)
+
+    def pretty_print(self) -> str:
+        lines = [f"Replay {self.path}: {len(self.reports)} saves in {self.total_time:.2f} s"]
+        battle_turns = self.battle_turns()
+        if battle_turns:
+            average = sum(report.duration for report in battle_turns) / len(battle_turns)
+            lines.append(f"  battle turns: {len(battle_turns)}, {average * 1000:.1f} ms on average")
+        lines.append("  " + ", ".join(f"{verdict.name.lower()}: {self.count(verdict)}" for verdict in TurnVerdict))
+        if self.errors():
+            lines.append(f"  errors: {self.errors()}")
+        slowest = self.slowest()
+        if slowest is not None:
+            lines.append(f"  slowest: {slowest.pretty_print()}")
+        if self.stopped_at is not None:
+            lines.append(f"  stopped at {self.stopped_at.pretty_print()}")
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def silenced_logs() -> Iterator[None]:
+    log_levels = logger.log_levels
+    logger.log_levels = []
+    try:
+        with open(os.devnull, mode='w') as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        logger.log_levels = log_levels
+        logger.clear_queue()
+
+
+def to_payload(raw_data: Dict, previous: Optional[SavePayload]) -> SavePayload:
+    digest = get_digest(json.dumps(raw_data, sort_keys=True, separators=(',', ':')).encode())
+    return SavePayload(digest, raw_data, previous)
+
+
+def replay_run(path: str, stop_at_unresolved: bool = True) -> ReplayResult:
+    """
+    Feed every save of the journal through compare_snapshots, exactly as the live loop would.
+    """
+    result = ReplayResult(path)
+    reader = RunJournalReader(path)
+    start = perf_counter()
+    previous_payload = None
+    previous_snapshot = None
+    try:
+        for index, record in enumerate(reader):
+            payload = to_payload(record.raw_data, previous_payload)
+            new_snapshot = Snapshot.from_payload(payload, previous_snapshot is None)
+            turn_start = perf_counter()
+            error = None
+            try:
+                history = compare_snapshots(previous_snapshot, new_snapshot)
+            except Exception:
+                history = None
+                error = traceback.format_exc()
+            report = TurnReport(
+                index=index,
+                turn=record.get_turn(),
+                game_phase=new_snapshot.game_phase,
+                verdict=new_snapshot.verdict,
+                duration=perf_counter() - turn_start,
+                error=error,
+            )
+            result.reports.append(report)
+            if report.is_unresolved() and stop_at_unresolved:
+                result.stopped_at = report
+                break
+            if error is not None:
+                # No history to continue from, start over from this save.
+                previous_snapshot = Snapshot.from_payload(payload, True)
+            elif previous_snapshot is None:
+                # Same as the live loop, the first comparison keeps the freshly made history.
+                previous_snapshot = new_snapshot
+            else:
+                previous_snapshot = new_snapshot
+                previous_snapshot.history = history
+            previous_payload = payload
+    finally:
+        reader.close()
+    result.total_time = perf_counter() - start
+    return result
+
+
+def main(arguments: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m replay.replay_runner", description=__doc__.strip().split("\n")[0])
+    parser.add_argument("journals", nargs="+", help="journal paths, with or without the .journal extension")
+    parser.add_argument("--keep-going", action="store_true", help="do not stop at the first unresolved turn")
+    parser.add_argument("--verbose", action="store_true", help="show the analysis logs while replaying")
+    parser.add_argument("--undo-log", action="store_true", help="simulate in place and roll back instead of cloning")
+    parser.add_argument("--check-undo-log", action="store_true",
+                        help="simulate both in place and with clones, and count the differences")
+    parser.add_argument("--enemy-cache", type=int, default=DEFAULT_CAPACITY,
+                        help="enemy phases remembered across hero actions, 0 (the default) to resolve every one")
+    arguments = parser.parse_args(arguments)
+    undo_log.enabled = arguments.undo_log or arguments.check_undo_log
+    undo_log.differential_check = arguments.check_undo_log
+    enemy_phase_cache.capacity = arguments.enemy_cache
+
+    unresolved = 0
+    for path in arguments.journals:
+        if arguments.verbose:
+            result = replay_run(path, not arguments.keep_going)
+        else:
+            with silenced_logs():
+                result = replay_run(path, not arguments.keep_going)
+        if result.stopped_at is not None or any(report.is_unresolved() for report in result.reports):
+            unresolved += 1
+        print(result.pretty_print())
+    print(f"Runs replayed: {len(arguments.journals)}, with unresolved turns: {unresolved}")
+    if undo_log.enabled:
+        print(undo_log.pretty_print())
+    if enemy_phase_cache.capacity:
+        print(enemy_phase_cache.pretty_print())
+    return 1 if unresolved or undo_log.mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,103 @@
+from typing import Dict, Iterator, List, Optional
+
+from constants import WEAPON_TYPE, WEAPON_ATTACK_EFFECT, WEAPON_TILE_EFFECT, COOLDOWN, COOLDOWN_CHARGE, STRENGTH, \
+    BASE_STRENGTH, LEVEL, MAX_LEVEL, ENEMY, ENTITY_STATE, SHIELD, CURSE, ICE, POISON, HP, MAX_HP, FACING, CELL, \
+    ATTACK_QUEUE, ACTION, PREVIOUS_ACTION, TILE_TO_PLAY, ENEMY_TILE_EFFECT, FIRST_TURN, ELITE_TYPE, PATTERN_INDEX, \
+    VERSION, RUN_IN_PROGRESS, RUN_NUMBER, MAP_SELECTION, RUN_STATS, TURN_AROUNDS, COINS, COMBOS, TURNS, TIME, \
+    COMBAT_ROOMS_CLEARED, SCROLL_PICKUPS, POTION_PICKUPS, HEAL_PICKUPS, FRIENDLY_KILLS, HITS, DAY, CONSUMABLES_USED, \
+    NEW_TILES_PICKED, SKILLS, SKILL_LEVELS, REWARD_ROOM, REWARD, IN_PROGRESS, TILE_UPGRADE, TILE_REWARDS, PRICE, \
+    EXHAUSTED, REROLL_PRICE, SHOP_ROOM, SHOP_DATA, SHOP_ITEM_NAMES, SHOP_ITEMS_SALE, ALREADY_UPGRADED, FREE_POTION, \
+    FREE_POTION_ALREADY_GIVEN, LEFT_SHOP_TYPE, RIGHT_SHOP_TYPE, COMBAT_ROOM, ENEMIES, WAVE_NUMBER, UNTIL_NEXT_WAVE, \
+    PROGRESSION_DATA, PROGRESSION, ROOM_VARIANT, CORRUPTED_BOSS_SECTORS, PICKUPS, PICKUP_LOCATIONS, DECK, POTIONS, \
+    HERO, HERO_ENUM, NAME, SPECIAL_MOVE_COOLDOWN, MAP_SAVE, CURRENT_LOCATION_NAME, CURRENT_LOCATION, \
+    UNCOVERED_LOCATIONS, SHOP_COMPONENT
+from compare.hero_actions import predict_attack_queues, predict_hero_actions
+from data.skill.skill_enums import SkillEnum
+from data.snapshot.save_payload import SavePayload
+from data.snapshot.simulation import Simulation
+from data.snapshot.snapshot import Snapshot
+from data.weapon.weapon import Weapon
+
+
+def weapon(weapon_type: int = 0, cooldown: int = 2, cooldown_charge: int = 2, strength: int = 1) -> Dict:
+    return {WEAPON_TYPE: weapon_type, WEAPON_ATTACK_EFFECT: 0, WEAPON_TILE_EFFECT: 0, COOLDOWN: cooldown,
+            COOLDOWN_CHARGE: cooldown_charge, STRENGTH: strength, BASE_STRENGTH: strength, LEVEL: 0, MAX_LEVEL: 3}
+
+
+def make_weapon(weapon_type: int = 0, cooldown_charge: int = 2, strength: int = 1) -> Weapon:
+    # Same base strength whatever the strength, so that a buffed copy is still the same tile.
+    value = weapon(weapon_type, cooldown_charge=cooldown_charge)
+    value[STRENGTH] = strength
+    return Weapon.from_dict(value)
+
+
+def enemy(cell: int, facing: int = 0, enemy_id: int = 9, hp: int = 2) -> Dict:
+    return {ENEMY: enemy_id, ENTITY_STATE: {SHIELD: False, CURSE: False, ICE: 0, POISON: 0, HP: hp, MAX_HP: 2},
+            FACING: facing, CELL: cell, ATTACK_QUEUE: [], ACTION: 0, PREVIOUS_ACTION: 0, TILE_TO_PLAY: 0,
+            ENEMY_TILE_EFFECT: 0, FIRST_TURN: False, ELITE_TYPE: 0, PATTERN_INDEX: 0}
+
+
+def battle_save(hero_cell: int = 1, enemies: Optional[List[Dict]] = None, deck: Optional[List[Dict]] = None,
+                attack_queue: Optional[List[Dict]] = None, skills: Optional[List[SkillEnum]] = None) -> Dict:
+    """
+    Save of a green combat room with the Wanderer, one turn in.
+    """
+    reward = {IN_PROGRESS: False, TILE_UPGRADE: 0, TILE_REWARDS: [], PRICE: 0, EXHAUSTED: False}
+    return {
+        VERSION: "1.0", RUN_IN_PROGRESS: True, RUN_NUMBER: 0, MAP_SELECTION: False,
+        RUN_STATS: {TURN_AROUNDS: 0, COINS: 0, COMBOS: 0, TURNS: 1, TIME: 3, COMBAT_ROOMS_CLEARED: 0,
+                    SCROLL_PICKUPS: 0, POTION_PICKUPS: 0, HEAL_PICKUPS: 0, FRIENDLY_KILLS: 0, HITS: 0, DAY: 0,
+                    CONSUMABLES_USED: 0, NEW_TILES_PICKED: 0},
+        SKILLS: [skill.value for skill in skills or []], SKILL_LEVELS: [1 for _ in skills or []],
+        REWARD_ROOM: {REWARD: dict(reward), REROLL_PRICE: 0},
+        SHOP_ROOM: {REWARD: dict(reward),
+                    SHOP_DATA: {SHOP_ITEM_NAMES: [], SHOP_ITEMS_SALE: [], ALREADY_UPGRADED: False, FREE_POTION: False,
+                                FREE_POTION_ALREADY_GIVEN: False},
+                    LEFT_SHOP_TYPE: "", RIGHT_SHOP_TYPE: ""},
+        COMBAT_ROOM: {ENEMIES: enemies if enemies is not None else [enemy(cell=3), enemy(cell=4)], WAVE_NUMBER: 0,
+                      UNTIL_NEXT_WAVE: 5},
+        PROGRESSION_DATA: {PROGRESSION: 0, ROOM_VARIANT: 0, CORRUPTED_BOSS_SECTORS: []},
+        PICKUPS: [], PICKUP_LOCATIONS: [],
+        DECK: deck if deck is not None else [weapon(0), weapon(1, cooldown=3, cooldown_charge=3)],
+        POTIONS: [],
+        HERO: {HERO_ENUM: 0, NAME: "Wanderer",
+               ENTITY_STATE: {SHIELD: False, CURSE: False, ICE: 0, POISON: 0, HP: 5, MAX_HP: 5},
+               FACING: 1, CELL: hero_cell, ATTACK_QUEUE: attack_queue or [], SPECIAL_MOVE_COOLDOWN: 3},
+        MAP_SAVE: {CURRENT_LOCATION_NAME: "Green combat", CURRENT_LOCATION: "green-combat-1", UNCOVERED_LOCATIONS: [],
+                   SHOP_COMPONENT: {}},
+    }
+
+
+def battle_snapshot(**kwargs) -> Snapshot:
+    return Snapshot.from_payload(SavePayload("test", battle_save(**kwargs)), True)
+
+
+# Turns to start from, in which what occupies the cells changes.
+PREVIOUS_SAVES = [
+    dict(hero_cell=1, enemies=[enemy(cell=2, hp=1), enemy(cell=4, facing=1, hp=1)],
+         deck=[weapon(0), weapon(1, cooldown=3, cooldown_charge=1), weapon(2)], attack_queue=[weapon(0)]),
+    dict(hero_cell=2, enemies=[enemy(cell=0, facing=1), enemy(cell=3), enemy(cell=4, hp=1)],
+         deck=[weapon(0), weapon(0, cooldown_charge=0), weapon(3)], attack_queue=[weapon(0), weapon(3)]),
+    dict(hero_cell=0, enemies=[enemy(cell=3, facing=1)], deck=[weapon(2), weapon(6)]),
+]
+
+
+def get_new_snapshots(previous_snapshot: Snapshot) -> Iterator[Snapshot]:
+    """
+    A save for every outcome the hero actions may have, plus one that none of them explains.
+    """
+    turn_around_is_free = previous_snapshot.skills.has_skill(SkillEnum.TWO_FACED_DANGER)
+    outcomes = predict_hero_actions(Simulation.of(previous_snapshot), predict_attack_queues(previous_snapshot),
+                                    turn_around_is_free)
+    for outcome in outcomes:
+        for simulated_order in (outcome.enemy_attack_order or {}).values():
+            save = simulated_order.to_dict()
+            potential_deck = simulated_order.predictions.potential_hero_deck
+            if potential_deck is not None:
+                # Executed tiles may go back to several slots, the simulation keeps the deck from before; take one.
+                deck = potential_deck.recharged_deck[:]
+                for used_weapon, slots in zip(potential_deck.used_weapons, potential_deck.slots):
+                    deck[slots[0]] = used_weapon
+                save[DECK] = [weapon.to_dict() for weapon in deck]
+            yield Snapshot.from_payload(SavePayload(outcome.name, save))
+    yield battle_snapshot(hero_cell=4, enemies=[], skills=list(previous_snapshot.skills.skills))
@@ -0,0 +1,28 @@
+import pytest
+
+from compare.compare_battle import simulate_hero_actions, get_initial_simulation, get_results_summary
+from compare.hero_actions import ActionFilter, predict_attack_queues, predict_hero_actions
+from data.skill.skill_enums import SkillEnum
+from history.potions.potion_simulation import PotionSimulation
+from tests.saves import battle_snapshot, get_new_snapshots, PREVIOUS_SAVES
+
+
+@pytest.mark.parametrize("skills", [[], [SkillEnum.TWO_FACED_DANGER]])
+@pytest.mark.parametrize("previous_save", PREVIOUS_SAVES)
+def test_filter_keeps_every_answer(previous_save, skills):
+    previous_snapshot = battle_snapshot(skills=skills, **previous_save)
+    turn_around_is_free = bool(skills)
+    ruled_out = 0
+    for new_snapshot in get_new_snapshots(previous_snapshot):
+        predictions = predict_attack_queues(previous_snapshot)
+        initial_simulation = get_initial_simulation(previous_snapshot, new_snapshot, PotionSimulation())
+        action_filter = ActionFilter(initial_simulation, new_snapshot, predictions)
+        outcomes = predict_hero_actions(initial_simulation, predictions, turn_around_is_free, action_filter)
+        filtered = simulate_hero_actions(initial_simulation, new_snapshot, predictions, outcomes)
+        unfiltered = simulate_hero_actions(
+            get_initial_simulation(previous_snapshot, new_snapshot, PotionSimulation()), new_snapshot, predictions)
+
+        assert get_results_summary(filtered) == get_results_summary(unfiltered)
+        ruled_out += sum(action_filter.stats.ruled_out.values())
+    # Not vacuous: the filter did leave actions out.
+    assert ruled_out
@@ -0,0 +1,41 @@
+from copy import deepcopy
+
+from compare.compare_battle import battle_update
+from constants import ENTITY_STATE, HERO, HP
+from data.other_enums import TurnVerdict
+from data.skill.skill_enums import SkillEnum
+from data.snapshot.save_payload import SavePayload
+from data.snapshot.snapshot import Snapshot
+from tests.saves import battle_snapshot, enemy, get_new_snapshots, weapon
+
+
+def test_queue_orders_ending_the_same_are_not_ambiguous():
+    # Both tiles miss, in either order, whether the hero turned around first or not.
+    previous_save = dict(hero_cell=1, enemies=[enemy(cell=4, facing=1)], deck=[weapon(0), weapon(2)],
+                         attack_queue=[weapon(0), weapon(2)], skills=[SkillEnum.TWO_FACED_DANGER])
+    new_snapshot = next(new_snapshot for new_snapshot in get_new_snapshots(battle_snapshot(**previous_save))
+                        if new_snapshot.payload.digest.startswith("turn + execute") and
+                        "," in new_snapshot.payload.digest)
+
+    battle_update(battle_snapshot(**previous_save), new_snapshot)
+
+    assert new_snapshot.verdict == TurnVerdict.SOLVED
+
+
+def test_unexplained_turn_shows_every_simulation(capsys):
+    previous_save = dict(hero_cell=1, enemies=[enemy(cell=4, facing=1)], deck=[weapon(0), weapon(2)],
+                         attack_queue=[weapon(0)])
+    waited = next(new_snapshot for new_snapshot in get_new_snapshots(battle_snapshot(**previous_save))
+                  if new_snapshot.payload.digest == "wait")
+    save = deepcopy(waited.payload.raw_data)
+    # Nothing takes the hero's health.
+    save[HERO][ENTITY_STATE][HP] = 1
+    new_snapshot = Snapshot.from_payload(SavePayload("unexplained", save))
+
+    battle_update(battle_snapshot(**previous_save), new_snapshot)
+
+    assert new_snapshot.verdict == TurnVerdict.NOT_FOUND
+    output = capsys.readouterr().out
+    # Executing, which the queue still there rules out at first, gets simulated and shown as well.
+    assert 'Start simulation None:"execute' in output
+    assert 'Simulation "execute' in output
@@ -0,0 +1,81 @@
+import pytest
+
+from data.snapshot.copy_on_write import read_section
+from data.snapshot.simulation import Simulation
+from data.snapshot.undo_log import dump_state, get_undo_sections
+from tests.saves import battle_snapshot
+
+
+def change_everything(simulation: Simulation) -> None:
+    simulation.room.hero.hp.hp -= 1
+    simulation.room.hero.position.flip()
+    simulation.room.enemies[0].state.poison = 3
+    simulation.room.enemies.pop()
+    simulation.room.pickups[2] = {}
+    simulation.hero_deck[0].cooldown_charge = 0
+    simulation.hero_deck.append(simulation.hero_deck[1].clone())
+    simulation.hero_potion_ids.append(1)
+    simulation.game_stats.turns += 1
+    simulation.history.room.set_trap(2, 1)
+
+
+def test_child_write_leaves_parent_unchanged():
+    snapshot = battle_snapshot()
+    parent = Simulation.of(snapshot)
+    # The parent owns its room, the rest it shares with the snapshot.
+    parent.room.hero.position.cell = 2
+    snapshot_state = dump_state(get_undo_sections(snapshot))
+    parent_room = dump_state(vars(parent)["room"])
+
+    child = Simulation.of(parent)
+    change_everything(child)
+
+    assert dump_state(get_undo_sections(snapshot)) == snapshot_state
+    assert dump_state(vars(parent)["room"]) == parent_room
+    assert child.room.hero.position.cell == 2
+
+
+def test_sibling_writes_stay_apart():
+    snapshot = battle_snapshot()
+    first = Simulation.of(snapshot)
+    second = Simulation.of(snapshot)
+    change_everything(first)
+
+    assert dump_state(get_undo_sections(second)) == dump_state(get_undo_sections(snapshot))
+
+
+def test_frozen_simulation_is_read_only():
+    snapshot = battle_snapshot()
+    parent = Simulation.of(snapshot)
+    Simulation.of(parent)
+    state = dump_state(get_undo_sections(snapshot))
+
+    assert parent.room.hero.position.cell == 1
+    assert len(parent.room.enemies) == 2
+    with pytest.raises(TypeError):
+        parent.room.hero.hp.hp = 1
+    with pytest.raises(TypeError):
+        parent.hero_deck[0].cooldown_charge = 0
+    with pytest.raises(TypeError):
+        parent.room.enemies[0] = None
+    with pytest.raises(AttributeError):
+        parent.room.enemies.pop()
+    with pytest.raises(TypeError):
+        parent.history.room.traps[2] = 1
+    assert dump_state(get_undo_sections(snapshot)) == state
+
+
+def test_read_section_does_not_copy():
+    snapshot = battle_snapshot()
+    simulation = Simulation.of(snapshot)
+
+    hero_deck = read_section(simulation, "hero_deck")
+
+    assert len(hero_deck) == 2
+    assert "hero_deck" not in vars(simulation)
+    with pytest.raises(TypeError):
+        hero_deck[0].strength = 9
+    # Once the simulation has its own copy, that is what gets read.
+    simulation.hero_deck[0].strength = 9
+    assert read_section(simulation, "hero_deck")[0].strength == 9
+    assert snapshot.hero_deck[0].strength == 1
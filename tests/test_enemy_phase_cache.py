@@ -0,0 +1,38 @@
+from data.snapshot.enemy_phase_cache import enemy_phase_cache
+from data.snapshot.simulation import Simulation
+from data.snapshot.undo_log import dump_state, get_undo_sections
+from tests.saves import battle_snapshot, enemy
+
+
+def resolve_enemies(snapshot):
+    simulation = Simulation.of(snapshot)
+    simulation.simulate_enemies(previous_hero_cell=1)
+    return simulation
+
+
+def test_hits_leave_the_entry_unchanged():
+    snapshot = battle_snapshot(enemies=[enemy(cell=2), enemy(cell=4, facing=1)])
+    enemy_phase_cache.capacity = 16
+    enemy_phase_cache.clear()
+    hits = enemy_phase_cache.hits
+    try:
+        resolved = resolve_enemies(snapshot)
+        expected = dump_state(get_undo_sections(resolved))
+        reused = resolve_enemies(snapshot)
+        assert enemy_phase_cache.hits == hits + 1
+        assert dump_state(get_undo_sections(reused)) == expected
+
+        # Whatever comes after the enemy phase must not reach the entry.
+        reused.game_stats.turns += 1
+        reused.hero_deck[0].cooldown_charge = 0
+        reused.room.hero.hp.hp = 1
+        reused.room.hero.attack_queue.append(reused.hero_deck[1].clone())
+        reused_again = resolve_enemies(snapshot)
+        assert enemy_phase_cache.hits == hits + 2
+        assert dump_state(get_undo_sections(reused_again)) == expected
+        assert dump_state(get_undo_sections(resolved)) == expected
+    finally:
+        enemy_phase_cache.capacity = 0
+        enemy_phase_cache.clear()
+
+    assert dump_state(get_undo_sections(resolve_enemies(snapshot))) == expected
@@ -0,0 +1,49 @@
+import random
+from itertools import permutations
+from typing import List, Optional, Set
+
+from data.snapshot.permutate_queues import get_distinct_orders
+from data.weapon.weapon import Weapon
+from tests.saves import make_weapon
+
+
+def get_keys(orders: List[List[Weapon]]) -> List[tuple]:
+    return [tuple(weapon.get_key() for weapon in order) for order in orders]
+
+
+def enumerate_orders(weapons: List[Weapon], max_length: int, required: Optional[Weapon] = None) -> List[Set[tuple]]:
+    # Every permutation, with the copies of equal weapons told apart, then the repeated ones dropped.
+    orders = []
+    for length in range(1, max_length + 1):
+        keys = {tuple(weapon.get_key() for weapon in order) for order in permutations(weapons, length)}
+        orders.append({key for key in keys if required is None or required.get_key() in key})
+    return orders
+
+
+def assert_same_orders(weapons: List[Weapon], max_length: int, required: Optional[Weapon] = None) -> None:
+    orders = get_keys(get_distinct_orders(weapons, max_length, required))
+
+    assert len(orders) == len(set(orders))
+    lengths = [len(order) for order in orders]
+    assert lengths == sorted(lengths)
+    # Within a length, the order of the orders is free.
+    assert [{key for key in orders if len(key) == length} for length in range(1, max_length + 1)] == \
+           enumerate_orders(weapons, max_length, required)
+
+
+def test_equal_weapons_give_each_order_once():
+    first, second = make_weapon(0), make_weapon(1)
+    orders = get_keys(get_distinct_orders([first, make_weapon(0), second], 3))
+
+    assert orders.count((first.get_key(), first.get_key(), second.get_key())) == 1
+    assert_same_orders([first, make_weapon(0), second], 3)
+    assert_same_orders([first, make_weapon(0), second], 3, required=second)
+
+
+def test_orders_agree_with_the_permutations():
+    for seed in range(300):
+        generator = random.Random(seed)
+        weapons = [make_weapon(generator.randrange(3), generator.randint(1, 2), generator.randint(1, 2))
+                   for _ in range(generator.randint(1, 5))]
+        max_length = generator.randint(1, min(len(weapons), 3))
+        assert_same_orders(weapons, max_length, generator.choice(weapons + [None]))
@@ -0,0 +1,77 @@
+import random
+from typing import List, Optional
+
+from data.snapshot.potential_deck import PotentialDeck
+from data.weapon.weapon import Weapon
+from tests.saves import make_weapon
+
+
+def get_slots(recharged_deck: List[Weapon], used_weapons: List[Weapon]) -> List[List[int]]:
+    return [[index for index, deck_weapon in enumerate(recharged_deck) if deck_weapon.is_same_tile(used)]
+            for used in used_weapons]
+
+
+def enumerate_match(recharged_deck: List[Weapon], used_weapons: List[Weapon], slots: List[List[int]],
+                    actual_deck: List[Weapon]) -> Optional[List[Weapon]]:
+    # Every deck the used tiles can make, put back one after the other, as they were listed before PotentialDeck.
+    decks = [recharged_deck]
+    for index, deck_indices in enumerate(slots):
+        decks = [deck[:slot] + [used_weapons[index]] + deck[slot + 1:] for deck in decks for slot in deck_indices]
+    return next((deck for deck in decks if Weapon.is_list_equal(actual_deck, deck)), None)
+
+
+def assert_same_match(recharged_deck: List[Weapon], used_weapons: List[Weapon], actual_deck: List[Weapon]) -> None:
+    slots = get_slots(recharged_deck, used_weapons)
+    expected = enumerate_match(recharged_deck, used_weapons, slots, actual_deck)
+    matched = PotentialDeck(recharged_deck, used_weapons, slots).match(actual_deck)
+    if expected is None:
+        assert matched is None
+    else:
+        assert matched is not None and Weapon.is_list_equal(matched, expected)
+
+
+def test_earlier_tile_hidden_under_a_later_one():
+    recharged_deck = [make_weapon(0), make_weapon(1), make_weapon(0)]
+    used_weapons = [make_weapon(0, cooldown_charge=0), make_weapon(0, cooldown_charge=1)]
+    slots = get_slots(recharged_deck, used_weapons)
+    # Both went to the first slot, the second covers the first.
+    actual_deck = [make_weapon(0, cooldown_charge=1), make_weapon(1), make_weapon(0)]
+
+    matched = PotentialDeck(recharged_deck, used_weapons, slots).match(actual_deck)
+
+    assert matched is not None and Weapon.is_list_equal(matched, actual_deck)
+    assert_same_match(recharged_deck, used_weapons, actual_deck)
+    # The earlier one alone can't be seen, the later one is always somewhere.
+    assert PotentialDeck(recharged_deck, used_weapons, slots).match(
+        [make_weapon(0, cooldown_charge=0), make_weapon(1), make_weapon(0)]) is None
+
+
+def test_duplicate_tiles_fill_any_slot():
+    charged, half, empty = make_weapon(0), make_weapon(0, cooldown_charge=1), make_weapon(0, cooldown_charge=0)
+    recharged_deck = [charged, charged, charged]
+    used_weapons = [empty, empty, half]
+    for actual_deck in ([empty, half, empty], [half, charged, empty], [empty, empty, charged]):
+        assert_same_match(recharged_deck, used_weapons, actual_deck)
+
+
+def test_match_agrees_with_the_enumeration():
+    for seed in range(3000):
+        generator = random.Random(seed)
+        weapon_types = generator.sample(range(4), generator.randint(1, 3))
+        deck_types = [generator.choice(weapon_types) for _ in range(generator.randint(1, 6))]
+        recharged_deck = [make_weapon(weapon_type, generator.randint(0, 2), generator.randint(1, 2))
+                          for weapon_type in deck_types]
+        used_weapons = [make_weapon(generator.choice(deck_types), generator.randint(0, 1), generator.randint(1, 2))
+                        for _ in range(generator.randint(0, 4))]
+        if generator.random() < .6:
+            # A deck the queue can make.
+            actual_deck = recharged_deck[:]
+            for used in used_weapons:
+                slot = generator.choice(get_slots(recharged_deck, [used])[0])
+                actual_deck[slot] = used
+        else:
+            actual_deck = recharged_deck[:]
+            for _ in range(generator.randint(0, 3)):
+                slot = generator.randrange(len(actual_deck))
+                actual_deck[slot] = make_weapon(deck_types[slot], generator.randint(0, 2), generator.randint(1, 2))
+        assert_same_match(recharged_deck, used_weapons, actual_deck)
@@ -0,0 +1,53 @@
+from threading import Event
+
+import compare.speculation
+from compare.hero_actions import predict_hero_actions
+from compare.speculation import Speculation
+from data.snapshot.lazy_section import LazySection
+from data.snapshot.snapshot import Snapshot
+from data.snapshot.undo_log import dump_state, get_undo_sections
+from tests.saves import battle_snapshot, PREVIOUS_SAVES
+
+
+def get_outcomes_summary(outcomes):
+    return [(outcome.name, [dump_state(get_undo_sections(simulated_order))
+                            for simulated_order in (outcome.enemy_attack_order or {}).values()])
+            for outcome in outcomes]
+
+
+def test_background_thread_does_not_read_the_snapshot(monkeypatch):
+    started = Event()
+    released = Event()
+
+    def predict_once_released(*arguments):
+        started.set()
+        released.wait()
+        return predict_hero_actions(*arguments)
+
+    monkeypatch.setattr(compare.speculation, "predict_hero_actions", predict_once_released)
+    expected = Speculation(battle_snapshot(**PREVIOUS_SAVES[0]))
+    released.set()
+    expected.wait()
+    released.clear()
+    snapshot = battle_snapshot(**PREVIOUS_SAVES[0])
+
+    speculation = Speculation(snapshot)
+    try:
+        started.wait()
+        assert set(snapshot.decoded) == {name for name, value in vars(Snapshot).items()
+                                         if isinstance(value, LazySection)}
+        # The main thread goes on with the snapshot meanwhile.
+        snapshot.room.hero.hp.hp -= 1
+        snapshot.room.hero.position.flip()
+        snapshot.room.enemies[0].state.poison = 3
+        snapshot.room.enemies.pop()
+        snapshot.hero_deck[0].cooldown_charge = 0
+        snapshot.hero_potion_ids.append(1)
+        snapshot.game_stats.turns += 1
+        snapshot.history.room.set_trap(2, 1)
+    finally:
+        released.set()
+        speculation.wait()
+
+    assert speculation.error is None
+    assert get_outcomes_summary(speculation.take()) == get_outcomes_summary(expected.take())
@@ -0,0 +1,76 @@
+from copy import deepcopy
+from threading import Thread
+
+import pytest
+
+from compare.compare_battle import simulate_hero_actions_in_place, simulate_hero_actions, get_initial_simulation, \
+    get_results_summary
+from compare.hero_actions import predict_attack_queues
+from data.snapshot.simulation import Simulation
+from data.snapshot.undo_log import undo_log, dump_state, get_undo_sections, get_mutable_containers
+from data.snapshot.undo_tracked import recording, UndoTracked
+from history.potions.potion_simulation import PotionSimulation
+from tests.saves import battle_snapshot, get_new_snapshots, PREVIOUS_SAVES
+
+
+@pytest.mark.parametrize("previous_save", PREVIOUS_SAVES)
+def test_rollback_restores_the_state(previous_save):
+    previous_snapshot = battle_snapshot(**previous_save)
+    new_snapshot = battle_snapshot(hero_cell=4, enemies=[])
+    initial_simulation = Simulation.of(previous_snapshot)
+    initial_simulation.hero_potion_ids = []
+    clone = deepcopy(get_undo_sections(initial_simulation))
+    total_writes = undo_log.total_writes
+
+    simulate_hero_actions_in_place(initial_simulation, new_snapshot, predict_attack_queues(previous_snapshot))
+
+    assert undo_log.total_writes > total_writes
+    assert dump_state(get_undo_sections(initial_simulation)) == dump_state(clone)
+    assert dump_state(get_undo_sections(previous_snapshot)) == dump_state(clone)
+    assert not undo_log.is_recording()
+
+
+def test_other_threads_are_not_recorded():
+    simulation = Simulation.of(battle_snapshot())
+    hero = simulation.room.hero
+    undo_log.start()
+    try:
+        undo_log.checkpoint(get_mutable_containers(simulation))
+        recorded_elsewhere = []
+
+        def simulate_elsewhere() -> None:
+            recorded_elsewhere.append(undo_log.is_recording())
+            simulation.hero_deck[0].strength = 5
+            # A recording of its own, started and stopped while the other one goes on.
+            undo_log.start()
+            simulation.hero_deck[1].strength = 6
+            recorded_elsewhere.append(len(recording.writes))
+            undo_log.stop()
+
+        thread = Thread(target=simulate_elsewhere)
+        thread.start()
+        thread.join()
+        hero.hp.hp = 1
+        assert len(recording.writes) == 1
+        undo_log.rollback()
+    finally:
+        undo_log.stop()
+
+    assert recorded_elsewhere == [False, 1]
+    assert hero.hp.hp == 5
+    assert simulation.hero_deck[0].strength == 5
+    assert simulation.hero_deck[1].strength == 6
+    # Nobody records anymore, writes are plain again.
+    assert "__setattr__" not in vars(UndoTracked)
+
+
+@pytest.mark.parametrize("previous_save", PREVIOUS_SAVES)
+def test_in_place_gives_the_same_results(previous_save):
+    previous_snapshot = battle_snapshot(**previous_save)
+    for new_snapshot in get_new_snapshots(previous_snapshot):
+        predictions = predict_attack_queues(previous_snapshot)
+        cloned = simulate_hero_actions(get_initial_simulation(previous_snapshot, new_snapshot, PotionSimulation()),
+                                       new_snapshot, predictions)
+        in_place = simulate_hero_actions_in_place(
+            get_initial_simulation(previous_snapshot, new_snapshot, PotionSimulation()), new_snapshot, predictions)
+        assert get_results_summary(in_place) == get_results_summary(cloned)
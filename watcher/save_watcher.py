@@ -0,0 +1,145 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from time import sleep, time
+from typing import Optional, Tuple, List
+
+from logger import logger
+from watcher.wake_up import WakeUp, WakeUpStats
+
+# Subset of inotify flags from <sys/inotify.h>.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; name follows
+INOTIFY_BUFFER_SIZE = 64 * 1024
+
+DEFAULT_POLL_INTERVAL = 0.1
+
+
+class SaveWatcher:
+    filename: str
+    stats: WakeUpStats
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.stats = WakeUpStats()
+
+    @staticmethod
+    def create(filename: str, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        if sys.platform.startswith("linux"):
+            try:
+                return InotifySaveWatcher(filename)
+            except OSError as e:
+                logger.debug_warn(f"inotify unavailable ({e}), falling back to polling every {poll_interval}s")
+        return PollingSaveWatcher(filename, poll_interval)
+
+    def wait_for_write(self) -> Optional[WakeUp]:
+        """
+        Block until the save file has been completely written.
+        Returns None once the file is gone, i.e. the run has finished.
+        """
+        raise TypeError("Waiting not allowed on the base class")
+
+    def close(self) -> None:
+        pass
+
+    def wake_up(self) -> Optional[WakeUp]:
+        try:
+            modified_time = os.stat(self.filename).st_mtime
+        except FileNotFoundError:
+            return None
+        wake_up = WakeUp(modified_time=modified_time, woken_time=time())
+        self.stats.record(wake_up)
+        return wake_up
+
+
+class PollingSaveWatcher(SaveWatcher):
+    poll_interval: float
+    last_signature: Optional[Tuple[int, int]]
+
+    def __init__(self, filename: str, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__(filename)
+        self.poll_interval = poll_interval
+        self.last_signature = self.get_signature()
+
+    def get_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def wait_for_write(self) -> Optional[WakeUp]:
+        changed = False
+        while True:
+            sleep(self.poll_interval)
+            signature = self.get_signature()
+            if signature is None:
+                return None
+            if signature != self.last_signature:
+                # Still being written to, wait for it to settle.
+                self.last_signature = signature
+                changed = True
+            elif changed:
+                # Unchanged for a whole interval - presume the writer is done.
+                return self.wake_up()
+
+
+class InotifySaveWatcher(SaveWatcher):
+    file_descriptor: int
+    directory: str
+    basename: bytes
+
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.directory = os.path.dirname(os.path.abspath(filename))
+        self.basename = os.fsencode(os.path.basename(filename))
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.file_descriptor = libc.inotify_init1(IN_CLOEXEC)
+        if self.file_descriptor < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch the directory, not the file, so that atomic replaces are noticed too.
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+        if libc.inotify_add_watch(self.file_descriptor, os.fsencode(self.directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.file_descriptor)
+            raise OSError(errno, f"inotify_add_watch failed for {self.directory}")
+
+    def read_events(self) -> List[int]:
+        buffer = os.read(self.file_descriptor, INOTIFY_BUFFER_SIZE)
+        masks = []
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, name_length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = buffer[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if name == self.basename:
+                masks.append(mask)
+        return masks
+
+    def wait_for_write(self) -> Optional[WakeUp]:
+        while True:
+            # One read returns everything queued so far, so bursts of writes coalesce into one wake-up.
+            masks = self.read_events()
+            written = False
+            for mask in masks:
+                if mask & (IN_DELETE | IN_MOVED_FROM) and not os.path.exists(self.filename):
+                    return None
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    written = True
+            if written:
+                wake_up = self.wake_up()
+                if wake_up is not None:
+                    return wake_up
+
+    def close(self) -> None:
+        os.close(self.file_descriptor)
@@ -0,0 +1,47 @@
+from typing import Optional
+
+
+class WakeUp:
+    modified_time: float
+    woken_time: float
+
+    def __init__(self, modified_time: float, woken_time: float):
+        self.modified_time = modified_time
+        self.woken_time = woken_time
+
+    def latency(self) -> float:
+        # The file system might round modification times, never report negative latency.
+        return max(self.woken_time - self.modified_time, 0.0)
+
+    def latency_ms(self) -> float:
+        return self.latency() * 1000
+
+
+class WakeUpStats:
+    total_wake_ups: int
+    total_latency: float
+    max_latency: float
+    last_wake_up: Optional[WakeUp]
+
+    def __init__(self):
+        self.total_wake_ups = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_wake_up = None
+
+    def record(self, wake_up: WakeUp) -> None:
+        latency = wake_up.latency()
+        self.total_wake_ups += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.last_wake_up = wake_up
+
+    def average_latency(self) -> float:
+        if not self.total_wake_ups:
+            return 0.0
+        return self.total_latency / self.total_wake_ups
+
+    def pretty_print(self) -> str:
+        return f"Save file wake-ups: {self.total_wake_ups}, " \
+               f"average latency {self.average_latency() * 1000:.1f} ms, " \
+               f"max latency {self.max_latency * 1000:.1f} ms"